@@ -0,0 +1,164 @@
+"""Offline benchmarks for ingest, embedding, reranking, redaction and the query path.
+
+    python -m benchmarks.run
+    python -m benchmarks.run --suites query redact --queries 100
+    python -m benchmarks.run --baseline benchmarks/results/<earlier>.json
+
+Nothing leaves the machine: OpenAI is replaced by the local stub
+(src/scripts/openai_stub.py) and Weaviate by the embedded local store in a
+temporary directory. Inputs are synthetic and seeded (benchmarks/synthetic.py),
+so runs with the same arguments measure the same work. Results are written as
+JSON; ``--baseline`` prints the change against an earlier run.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+import time
+from typing import Any, Dict, Iterator, List, Tuple
+
+SUITES = ("ingest", "embed", "rerank", "redact", "query")
+
+# Leaf names compared against a baseline, and whether higher is better
+_COMPARED = {"_per_s": True, "_ms": False, "seconds": False}
+
+
+def git_commit() -> str | None:
+    git = shutil.which("git")
+    if git is None:
+        return None
+    try:
+        argv = [git, "rev-parse", "--short", "HEAD"]
+        out = subprocess.run(argv, capture_output=True, text=True, timeout=10)  # noqa: S603 - fixed argv
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def flatten(data: Any, prefix: str = "") -> Iterator[Tuple[str, float]]:
+    if isinstance(data, dict):
+        for key, value in data.items():
+            yield from flatten(value, f"{prefix}.{key}" if prefix else str(key))
+    elif isinstance(data, (int, float)) and not isinstance(data, bool):
+        yield prefix, float(data)
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Relative change of every latency/throughput leaf present in both runs; ``better`` says which way it moved."""
+    before = dict(flatten(baseline.get("results", {})))
+    rows = []
+    for key, value in flatten(current.get("results", {})):
+        leaf = key.rsplit(".", 1)[-1]
+        higher_is_better = next((h for suffix, h in _COMPARED.items() if leaf.endswith(suffix)), None)
+        old = before.get(key)
+        if higher_is_better is None or old is None or old == 0:
+            continue
+        change = (value - old) / old
+        rows.append({
+            "metric": key,
+            "baseline": old,
+            "current": value,
+            "change": round(change, 4),
+            "better": change > 0 if higher_is_better else change < 0,
+        })
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the offline benchmark suite and write the results as JSON")
+    parser.add_argument("--suites", nargs="+", default=list(SUITES), choices=SUITES)
+    parser.add_argument("--output", default=None, help="Results JSON (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--baseline", default=None, help="Earlier results JSON to compare against")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--pages", type=int, default=24, help="Pages per synthetic PDF")
+    parser.add_argument("--documents", type=int, default=2, help="Timed PDFs per ingest variant")
+    parser.add_argument("--image-every", type=int, default=4, help="Every Nth page of the scanned PDFs is image-only")
+    parser.add_argument("--corpus", type=int, default=1000, help="Synthetic chunks for the embed/rerank/redact/query suites")
+    parser.add_argument("--queries", type=int, default=40)
+    parser.add_argument(
+        "--embeddings",
+        choices=["stub", "local"],
+        default="stub",
+        help="stub: OpenAI code paths against the local stub; local: the configured local models (must be cached)",
+    )
+    parser.add_argument("--dimensions", type=int, default=3072, help="Stub embedding size (text-embedding-3-large: 3072)")
+    parser.add_argument("--stub-latency", type=float, default=0.0, help="Seconds the stub adds to every OpenAI call")
+    parser.add_argument("--presidio", action="store_true", help="Redact PERSON with Presidio (needs the spaCy model)")
+    args = parser.parse_args()
+
+    # Settings require an API key at import; the stub never checks it
+    os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+    from benchmarks import suites
+    from benchmarks.synthetic import synthetic_chunks, synthetic_queries
+    from src.core.config import settings
+
+    chunks = synthetic_chunks(args.corpus, args.seed)
+    texts = [str(c["content"]) for c in chunks]
+    queries = synthetic_queries(args.queries, args.seed)
+    results: Dict[str, Any] = {}
+    started = time.perf_counter()
+    with tempfile.TemporaryDirectory(prefix="veritas-bench-") as workdir:
+        with suites.offline_backends(
+            workdir, args.embeddings, args.dimensions, args.stub_latency, args.presidio
+        ) as (registry, stub):
+            if "ingest" in args.suites:
+                results["ingest"] = suites.bench_ingest(
+                    registry, workdir, args.pages, args.documents, args.image_every, args.seed
+                )
+            if "embed" in args.suites:
+                results["embed"] = suites.bench_embed(registry, texts, queries)
+            if "rerank" in args.suites:
+                results["rerank"] = suites.bench_rerank(registry, texts, queries, args.seed)
+            if "redact" in args.suites:
+                results["redact"] = suites.bench_redact(texts, args.presidio)
+            if "query" in args.suites:
+                suites.load_corpus(registry, workdir, chunks)
+                results["query"] = suites.bench_query(registry, chunks, queries)
+            stub_stats = stub.state.stats()
+
+    report = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "seconds": round(time.perf_counter() - started, 2),
+            "args": vars(args),
+            "settings": {
+                name: getattr(settings, name)
+                for name in (
+                    "CHUNK_STRATEGY", "CHUNK_TOKENS", "RERANK_TOP_N", "RERANKER_BACKEND", "EMBEDDING_BACKEND",
+                    "INGEST_WORKERS", "INGEST_PIPELINE_DEPTH", "OCR_DPI", "OPENAI_EMBED_BATCH_TOKENS",
+                    "OPENAI_EMBED_CONCURRENCY",
+                )
+            },
+            "stub": stub_stats,
+        },
+        "results": results,
+    }
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        report["comparison"] = {"baseline": args.baseline, "changes": compare(baseline, report)}
+
+    output = args.output or os.path.join("benchmarks", "results", time.strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    print(json.dumps(results, indent=2))
+    for row in report.get("comparison", {}).get("changes", []):
+        if abs(row["change"]) >= 0.05:
+            mark = "+" if row["better"] else "-"
+            print(f"{mark} {row['metric']:<55} {row['baseline']:>12.3f} -> {row['current']:>12.3f} ({row['change']:+.1%})")
+    print(f"\nWrote {output}")
+
+
+if __name__ == "__main__":
+    main()
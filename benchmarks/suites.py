@@ -0,0 +1,273 @@
+"""The benchmark suites. Each returns a JSON-ready dict of timings and throughput.
+
+Latencies are in milliseconds and summarized as count/mean/p50/p95/p99/max;
+throughputs are per second. Every suite runs one untimed warm-up first.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import random
+import time
+from contextlib import contextmanager
+from functools import partial
+from typing import Any, Callable, Dict, Iterator, List
+
+import numpy as np
+
+from benchmarks.synthetic import synthetic_pages, write_pdf
+from src.core import tracing
+from src.core.config import settings
+from src.core.registry import ModelRegistry
+from src.scripts.openai_stub import StubServer, StubState
+from src.services import ingestion_service
+from src.services.ingestion_service import IngestionService, chunk_uuid
+from src.services.local_store import LocalVectorStore
+from src.services.pii_service import PIIRedactionService
+from src.services.rag_service import RAGService
+
+logger = logging.getLogger("benchmarks")
+
+
+def summarize(seconds: List[float]) -> Dict[str, float]:
+    if not seconds:
+        return {"count": 0}
+    ms = np.asarray(seconds) * 1000
+    return {
+        "count": len(seconds),
+        "mean_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "max_ms": round(float(ms.max()), 3),
+    }
+
+
+def timed(fn: Callable[[], Any]) -> tuple[Any, float]:
+    started = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - started
+
+
+class TraceCollector:
+    """Collects the traces finished while active, for per-stage breakdowns."""
+
+    def __init__(self) -> None:
+        self.traces: List[tracing.Trace] = []
+
+    def __enter__(self) -> "TraceCollector":
+        tracing.add_listener(self.traces.append)
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        tracing.remove_listener(self.traces.append)
+
+    def stage_seconds(self, root: str) -> Dict[str, List[float]]:
+        """Span durations by stage name over every ``root`` trace (the root itself as ``total``)."""
+        stages: Dict[str, List[float]] = {}
+        for trace in self.traces:
+            if trace.root.name != root:
+                continue
+            for span in trace.spans:
+                if span.end is not None:
+                    name = "total" if span is trace.root else span.name
+                    stages.setdefault(name, []).append(span.end - span.start)
+        return stages
+
+
+def ocr_available() -> bool:
+    try:
+        import pytesseract
+
+        pytesseract.get_tesseract_version()
+    except Exception:
+        return False
+    return True
+
+
+@contextmanager
+def offline_backends(
+    workdir: str, embeddings: str = "stub", dimensions: int = 3072, stub_latency: float = 0.0, presidio: bool = False
+) -> Iterator[tuple[ModelRegistry, StubServer]]:
+    """A registry on an embedded store in ``workdir`` with OpenAI served by the local stub.
+
+    ``embeddings="stub"`` also embeds and reranks through the stub (the OpenAI
+    code paths); ``"local"`` uses the configured local models, which must
+    already be in the Hugging Face cache. Settings are restored on exit.
+    """
+    stub = StubServer(state=StubState(dimensions=dimensions, latency=stub_latency)).start()
+    use_stub = embeddings == "stub"
+    overrides = {
+        "VECTOR_STORE": "local",
+        "OPENAI_BASE_URL": stub.base_url,
+        "USE_OPENAI_EMBEDDINGS": use_stub,
+        "USE_OPENAI_RERANKER": use_stub,
+        # Measure the work itself, not cache hits
+        "EMBEDDING_CACHE_ENABLED": False,
+        "ANSWER_CACHE_ENABLED": False,
+        "PRECOMPUTE_REDACTION": True,
+        "ENABLE_PRESIDIO": presidio,
+        "INGEST_JOBS_PATH": os.path.join(workdir, "jobs.sqlite"),
+    }
+    previous = {name: getattr(settings, name) for name in overrides}
+    previous_env = os.environ.get("ENABLE_PRESIDIO")
+    for name, value in overrides.items():
+        setattr(settings, name, value)
+    os.environ["ENABLE_PRESIDIO"] = str(presidio).lower()
+    registry = ModelRegistry(logger=logger)
+    registry.set("vector_store", LocalVectorStore(os.path.join(workdir, "store")))
+    try:
+        yield registry, stub
+    finally:
+        registry.close()
+        stub.shutdown()
+        stub.server_close()
+        for name, value in previous.items():
+            setattr(settings, name, value)
+        if previous_env is None:
+            os.environ.pop("ENABLE_PRESIDIO", None)
+        else:
+            os.environ["ENABLE_PRESIDIO"] = previous_env
+
+
+def bench_ingest(
+    registry: ModelRegistry, workdir: str, pages: int, documents: int, image_every: int, seed: int
+) -> Dict[str, Any]:
+    """``ingest_document`` on synthetic PDFs: all-text, and with every ``image_every``-th page a scan."""
+    kinds = {"text": set(), "scanned": set(range(0, pages, max(1, image_every)))}
+    out: Dict[str, Any] = {}
+    for kind, image_pages in kinds.items():
+        if image_pages and not ocr_available():
+            out[kind] = {"skipped": "tesseract is not installed"}
+            continue
+        paths = []
+        for d in range(documents + 1):  # the first document is the warm-up
+            path = os.path.join(workdir, f"{kind}-{d}.pdf")
+            write_pdf(path, synthetic_pages(pages, seed + d), image_pages)
+            paths.append(path)
+        service = IngestionService(registry=registry)
+        _ingest(service, paths[0])
+        seconds = 0.0
+        chunks = ocr_pages = 0
+        with TraceCollector() as traces:
+            for path in paths[1:]:
+                _, elapsed = timed(partial(_ingest, service, path))
+                seconds += elapsed
+                chunks += service._last_chunks_count
+                ocr_pages += service._last_ocr_pages
+        _, unchanged = timed(partial(_ingest, service, paths[1]))
+        stages = traces.stage_seconds("ingest")
+        out[kind] = {
+            "documents": documents,
+            "pages": documents * pages,
+            "image_pages": documents * len(image_pages),
+            "ocr_pages": ocr_pages,
+            "chunks": chunks,
+            "seconds": round(seconds, 3),
+            "pages_per_s": round(documents * pages / seconds, 2),
+            "chunks_per_s": round(chunks / seconds, 2),
+            # Wall time per stage summed over the documents; the pipeline overlaps
+            # extract, embed and write, so these add up to more than the total
+            "stage_seconds": {name: round(sum(values), 3) for name, values in sorted(stages.items())},
+            "reingest_unchanged_ms": round(unchanged * 1000, 3),
+        }
+    return out
+
+
+def _ingest(service: IngestionService, path: str) -> None:
+    result = service.ingest_document(path)
+    if result != path:
+        raise RuntimeError(result)
+
+
+def bench_embed(registry: ModelRegistry, texts: List[str], queries: List[str]) -> Dict[str, Any]:
+    """``IngestionService._embed_many`` over the corpus in ingest-sized batches, and ``RAGService._embed`` per query."""
+    ingest = IngestionService(registry=registry)
+    batch_size = ingestion_service.EMBED_BATCH_SIZE
+    ingest._embed_many(texts[:batch_size])
+    batches = []
+    for start in range(0, len(texts), batch_size):
+        batches.append(timed(partial(ingest._embed_many, texts[start:start + batch_size]))[1])
+    rag = RAGService(registry=registry)
+    rag._embed(queries[0])
+    per_query = [timed(partial(rag._embed, q))[1] for q in queries]
+    return {
+        "model": ingest.embedding_model_name,
+        "embed_many": {
+            "texts": len(texts),
+            "batch_size": batch_size,
+            "texts_per_s": round(len(texts) / sum(batches), 1),
+            "batch": summarize(batches),
+        },
+        "embed_query": summarize(per_query),
+    }
+
+
+def bench_rerank(registry: ModelRegistry, texts: List[str], queries: List[str], seed: int) -> Dict[str, Any]:
+    """``RAGService._rerank`` on RERANK_TOP_N candidates per query (no stored vectors, so the
+    OpenAI path embeds the query and candidates as the cold path does)."""
+    rag = RAGService(registry=registry)
+    rng = random.Random(seed)
+    top_n = settings.RERANK_TOP_N
+    candidates = [rng.sample(texts, min(top_n, len(texts))) for _ in queries]
+    rag._rerank(queries[0], candidates[0])
+    latencies = [timed(partial(rag._rerank, q, docs))[1] for q, docs in zip(queries, candidates)]
+    return {
+        "backend": "openai-cosine" if rag.use_openai_reranker else settings.RERANKER_BACKEND,
+        "candidates": top_n,
+        "pairs_per_s": round(len(queries) * top_n / sum(latencies), 1),
+        "latency": summarize(latencies),
+    }
+
+
+def bench_redact(texts: List[str], presidio: bool, batch_size: int = 32) -> Dict[str, Any]:
+    """``redact_text`` per chunk and ``redact_many`` in batches, with memoization off."""
+    service = PIIRedactionService(logger=logger, cache_size=0, enable_presidio=presidio)
+    service.redact_text(texts[0])
+    per_text = [timed(partial(service.redact_text, t))[1] for t in texts]
+    _, batched = timed(lambda: [service.redact_many(texts[i:i + batch_size]) for i in range(0, len(texts), batch_size)])
+    return {
+        "mode": "presidio" if service.presidio_enabled else "regex",
+        "texts": len(texts),
+        "redact_text": summarize(per_text),
+        "texts_per_s": round(len(texts) / sum(per_text), 1),
+        "batched_texts_per_s": round(len(texts) / batched, 1),
+        "ner_texts": service.ner_texts,
+    }
+
+
+def load_corpus(registry: ModelRegistry, workdir: str, chunks: List[Dict[str, Any]]) -> None:
+    """Write the synthetic chunks into a fresh store as ingest would (embedded, with redacted
+    variants), so the query suite searches the same corpus whichever suites ran before it."""
+    registry.set("vector_store", LocalVectorStore(os.path.join(workdir, "query-store")))
+    ingest = IngestionService(registry=registry)
+    batch_size = ingestion_service.EMBED_BATCH_SIZE
+    pii = registry.pii_service
+    for start in range(0, len(chunks), batch_size):
+        batch = [dict(c) for c in chunks[start:start + batch_size]]
+        for prop, texts in pii.redact_variants([str(c["content"]) for c in batch]).items():
+            for chunk, text in zip(batch, texts):
+                chunk[prop] = text
+        vectors = ingest._embed_many([str(c["content"]) for c in batch])
+        registry.vector_store.write_objects({chunk_uuid(c): (c, v) for c, v in zip(batch, vectors)})
+    registry.vector_store.save()
+
+
+def bench_query(registry: ModelRegistry, chunks: List[Dict[str, Any]], queries: List[str]) -> Dict[str, Any]:
+    """The full ``RAGService.query`` path (answer cache off), unfiltered and filtered to one source."""
+    rag = RAGService(registry=registry)
+    source = str(chunks[0]["source"])
+    rag.query(queries[0])
+    out: Dict[str, Any] = {"corpus_chunks": len(registry.vector_store)}
+    for name, filter_source in (("unfiltered", None), ("filtered", source)):
+        with TraceCollector() as traces:
+            latencies = [timed(partial(rag.query, q, source=filter_source))[1] for q in queries]
+        stages = traces.stage_seconds("query")
+        out[name] = {
+            "latency": summarize(latencies),
+            "queries_per_s": round(len(queries) / sum(latencies), 2),
+            "stage_mean_ms": {
+                stage: round(float(np.mean(values)) * 1000, 3) for stage, values in sorted(stages.items())
+            },
+        }
+    return out
@@ -0,0 +1,114 @@
+"""Seeded synthetic compliance documents: PDFs (text and image-only pages), chunks and questions.
+
+Everything is derived from ``random.Random(seed)``, so a given seed and size
+produce byte-identical inputs on every run and machine.
+"""
+from __future__ import annotations
+
+import random
+from typing import Dict, List
+
+import fitz  # PyMuPDF
+
+TOPICS = [
+    ("Data retention", "personal data", "retained", "deleted after {n} days"),
+    ("Access control", "production systems", "accessed", "reviewed every {n} days"),
+    ("Encryption", "backups", "encrypted", "rotated every {n} days"),
+    ("Incident response", "security incidents", "reported", "escalated within {n} hours"),
+    ("Vendor management", "processors", "assessed", "re-certified every {n} months"),
+    ("Audit logging", "administrative actions", "logged", "kept for {n} months"),
+    ("Data transfers", "transfers outside the EEA", "documented", "re-assessed every {n} months"),
+    ("Training", "staff with data access", "trained", "refreshed every {n} months"),
+]
+SUBJECTS = ["The controller", "The processor", "Each business unit", "The security team", "The Data Protection Officer"]
+VERBS = ["shall ensure that", "must verify that", "is responsible for ensuring that", "shall document how"]
+FILLER = [
+    "This obligation applies to all environments, including test and staging.",
+    "Exceptions require written approval and are recorded in the risk register.",
+    "Evidence of compliance is kept available for the supervisory authority.",
+    "Where a third party is involved, the contract sets out equivalent terms.",
+    "Deviations are reported to the steering committee at its next meeting.",
+]
+NAMES = ["Maria Garcia", "John Doe", "Wei Zhang", "Aisha Khan", "Lars Nilsen", "Priya Patel"]
+
+
+def _clause(rng: random.Random, article: int, number: int) -> str:
+    _, obj, verb, rule = rng.choice(TOPICS)
+    sentences = [
+        f"{article}.{number} {rng.choice(SUBJECTS)} {rng.choice(VERBS)} {obj} are {verb} and {rule.format(n=rng.choice([7, 30, 72, 90, 12]))}."
+    ]
+    sentences += rng.sample(FILLER, k=rng.randint(1, 3))
+    if rng.random() < 0.15:
+        name = rng.choice(NAMES)
+        email = f"{name.split()[0].lower()}.{name.split()[1].lower()}@example.com"
+        sentences.append(f"Questions go to {name} ({email}).")
+    return " ".join(sentences)
+
+
+def synthetic_pages(pages: int, seed: int) -> List[str]:
+    """Page texts of a policy document: numbered articles with headings and clauses."""
+    rng = random.Random(seed)
+    out: List[str] = []
+    article = 0
+    for _ in range(pages):
+        lines: List[str] = []
+        for _ in range(rng.randint(2, 3)):
+            article += 1
+            lines.append(f"Article {article} - {rng.choice(TOPICS)[0]}")
+            lines += [_clause(rng, article, n) for n in range(1, rng.randint(3, 5))]
+        out.append("\n".join(lines))
+    return out
+
+
+def write_pdf(path: str, pages: List[str], image_pages: set[int] | None = None, dpi: int = 110) -> None:
+    """Write ``pages`` as an A4 PDF; pages whose index is in ``image_pages`` carry only a
+    rendered image of the text (no text layer), as a scan would, so extraction must OCR them."""
+    image_pages = image_pages or set()
+    doc = fitz.open()
+    try:
+        for i, text in enumerate(pages):
+            if i not in image_pages:
+                page = doc.new_page()
+                page.insert_textbox(page.rect + (50, 50, -50, -50), text, fontsize=9)
+                continue
+            scratch = fitz.open()
+            source = scratch.new_page()
+            source.insert_textbox(source.rect + (50, 50, -50, -50), text, fontsize=9)
+            pixmap = source.get_pixmap(dpi=dpi, alpha=False)
+            scratch.close()
+            page = doc.new_page()
+            page.insert_image(page.rect, pixmap=pixmap)
+        doc.set_metadata({"title": "Synthetic compliance policy", "author": "Benchmark Generator"})
+        doc.save(path)
+    finally:
+        doc.close()
+
+
+def synthetic_chunks(count: int, seed: int, sources: int = 20) -> List[Dict[str, object]]:
+    """Chunk dicts shaped like ingest output, spread over ``sources`` documents."""
+    rng = random.Random(seed)
+    chunks: List[Dict[str, object]] = []
+    for i in range(count):
+        article = rng.randint(1, 60)
+        chunks.append({
+            "content": " ".join(_clause(rng, article, n) for n in range(1, rng.randint(2, 4))),
+            "source": f"policy-{i % sources:02d}.pdf",
+            "page_number": rng.randint(1, 80),
+            "section": f"Article {article}",
+        })
+    return chunks
+
+
+def synthetic_queries(count: int, seed: int) -> List[str]:
+    rng = random.Random(seed)
+    templates = [
+        "How long are {obj} {verb}?",
+        "Who is responsible for ensuring {obj} are {verb}?",
+        "What does the policy say about {topic}?",
+        "How often must {obj} be reviewed?",
+    ]
+    queries = []
+    for _ in range(count):
+        topic, obj, verb, _ = rng.choice(TOPICS)
+        queries.append(rng.choice(templates).format(topic=topic.lower(), obj=obj, verb=verb))
+    return queries
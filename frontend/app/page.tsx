@@ -42,7 +42,18 @@ export default function HomePage() {
       form.append('file', file)
       const res = await fetch(`${API_BASE}/api/v1/ingest`, { method: 'POST', body: form })
       if (!res.ok) throw new Error(await res.text())
-      const data = await res.json()
+      let job = await res.json()
+      // Ingestion runs as a background job: poll until it finishes
+      while (job.status === 'queued' || job.status === 'running') {
+        const p = job.progress || {}
+        setStatus(`Ingesting (${job.stage}): pages ${p.pages_extracted}/${p.pages_total}, chunks ${p.chunks_embedded}/${p.chunks_total}`)
+        await new Promise((resolve) => setTimeout(resolve, 1000))
+        const poll = await fetch(`${API_BASE}/api/v1/ingest/${job.job_id}`)
+        if (!poll.ok) throw new Error(await poll.text())
+        job = await poll.json()
+      }
+      if (job.status !== 'succeeded') throw new Error(job.error || `ingest ${job.status}`)
+      const data = job.result
       const chunksCount = typeof data.chunks_count === 'number' ? data.chunks_count : data.chunks
       const ocrPagesCount = typeof data.ocr_pages_count === 'number' ? data.ocr_pages_count : data.ocr_pages
       setStatus(`Ingested: ${data.document_id} (chunks: ${chunksCount}, ocr pages: ${ocrPagesCount})`)
@@ -1,72 +1,135 @@
-from fastapi import APIRouter, Depends, File, UploadFile, HTTPException
-from fastapi.responses import JSONResponse
+import json
 import os
+from collections.abc import AsyncIterator
+from uuid import uuid4
+
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
+from fastapi.responses import JSONResponse, StreamingResponse
+from openai import OpenAIError
+
+from src.core.concurrency import iterate_io, query_slots
+from src.core.registry import get_registry
 from src.models.api import (
+    IngestJobStatus,
+    IngestRequest,
     QueryRequest,
     QueryResponse,
-    IngestRequest,
-    IngestResponse,
+    TraceSpan,
 )
+from src.services.ingest_jobs import IngestJobQueue, IngestQueueFull
 from src.services.rag_service import RAGService
-from src.services.ingestion_service import IngestionService
 
 router = APIRouter()
 
 
 def get_rag_service() -> RAGService:
-    # Isolate DI to avoid FastAPI trying to parse class __init__ annotations
-    return RAGService()
+    # Isolate DI to avoid FastAPI trying to parse class __init__ annotations.
+    # Models and clients come from the process-wide registry, so this is cheap.
+    return RAGService(registry=get_registry())
+
 
+def get_ingest_jobs() -> IngestJobQueue:
+    return get_registry().ingest_jobs
 
-@router.post("/ingest", response_model=IngestResponse)
+
+@router.post("/ingest", response_model=IngestJobStatus, status_code=202)
 async def ingest(
     request: IngestRequest | None = None,
     file: UploadFile | None = File(default=None),
-    service: IngestionService = Depends(),
-) -> IngestResponse:
-    """Ingest a document into the vector store. Supports either file_path JSON or direct file upload."""
+    jobs: IngestJobQueue = Depends(get_ingest_jobs),
+) -> JSONResponse:
+    """Queue a document for ingestion. Supports either file_path JSON or direct file upload.
+
+    Returns a job immediately; poll ``GET /ingest/{job_id}`` for progress and the result.
+    """
     if file is None and request is None:
         raise HTTPException(status_code=400, detail="Provide either 'file' upload or 'file_path' in body")
 
     file_path: str
+    source: str | None = None
     if file is not None:
-        # Save uploaded file to a temp path under /app/data/uploads
+        # Each upload gets its own file under /app/data/uploads, so a re-upload of the
+        # same name never overwrites a file a queued job is still reading; the job
+        # deletes it when it finishes and the document keeps the uploaded name
         uploads_dir = "/app/data/uploads"
         os.makedirs(uploads_dir, exist_ok=True)
-        file_path = os.path.join(uploads_dir, file.filename)
+        source = os.path.basename(file.filename or "upload.pdf")
+        file_path = os.path.join(uploads_dir, f"{uuid4().hex}-{source}")
         contents = await file.read()
-        with open(file_path, "wb") as f:
+        with open(file_path, "xb") as f:
             f.write(contents)
     else:
         file_path = request.file_path  # type: ignore[assignment]
 
     try:
-        result = service.ingest_document(file_path)
-    except Exception as exc:
-        raise HTTPException(status_code=500, detail=f"Ingestion error: {exc}")
-
-    chunks = getattr(service, "_last_chunks_count", 0)
-    ocr_pages = getattr(service, "_last_ocr_pages", 0)
-    msg = "Success" if chunks > 0 else "No text extracted"
-    # Return basename as the document_id so subsequent queries filter correctly
-    doc_id = os.path.basename(result)
-    # Back-compat: return both new and old keys so the frontend never sees undefined
-    return JSONResponse(
-        content={
-            "message": msg,
-            "document_id": doc_id,
-            "chunks_count": chunks,
-            "ocr_pages_count": ocr_pages,
-            "chunks": chunks,
-            "ocr_pages": ocr_pages,
-        }
-    )
+        job = jobs.submit(file_path, source=source, delete_after=file is not None)
+    except IngestQueueFull as exc:
+        raise HTTPException(
+            status_code=503, detail="Ingest queue is full, retry later", headers={"Retry-After": "30"}
+        ) from exc
+    return JSONResponse(status_code=202, content=IngestJobStatus(**job).model_dump())
+
+
+@router.get("/ingest/{job_id}", response_model=IngestJobStatus)
+def ingest_status(job_id: str, jobs: IngestJobQueue = Depends(get_ingest_jobs)) -> IngestJobStatus:
+    """Stage-level progress of an ingest job, with the result once it has finished."""
+    job = jobs.status(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown ingest job {job_id}")
+    return IngestJobStatus(**job)
+
+
+@router.delete("/ingest/{job_id}", response_model=IngestJobStatus)
+def cancel_ingest(job_id: str, jobs: IngestJobQueue = Depends(get_ingest_jobs)) -> IngestJobStatus:
+    """Cancel a queued or running ingest job (running jobs stop at the next checkpoint)."""
+    job = jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown ingest job {job_id}")
+    return IngestJobStatus(**job)
 
 
 @router.post("/query", response_model=QueryResponse)
-def query(request: QueryRequest, service: RAGService = Depends(get_rag_service)) -> QueryResponse:
+async def query(request: QueryRequest, service: RAGService = Depends(get_rag_service)) -> QueryResponse:
     """Query the compliance documents."""
-    answer, citations, trace_id, groundedness = service.query(
-        request.query, source=request.source, strict_privacy=request.strict_privacy
+    async with query_slots():
+        try:
+            answer, citations, trace_id, groundedness = await service.aquery(
+                request.query, source=request.source, strict_privacy=request.strict_privacy
+            )
+        except OpenAIError as exc:
+            raise HTTPException(status_code=502, detail=f"Answer service error: {exc}") from exc
+    trace = service.last_trace
+    return QueryResponse(
+        answer=answer,
+        citations=citations,
+        trace_id=trace_id,
+        groundedness=groundedness,
+        cache=service.last_cache_info,
+        spans=[TraceSpan(**s) for s in trace.to_dicts()] if request.debug and trace is not None else None,
+    )
+
+
+@router.post("/query/stream")
+async def query_stream(request: QueryRequest, service: RAGService = Depends(get_rag_service)) -> StreamingResponse:
+    """Stream a query answer as server-sent events: citations, token..., done.
+
+    The stream holds a query slot until it ends, like ``/query``; each step of
+    the blocking pipeline runs on the I/O executor, not the request threadpool.
+    """
+
+    async def events() -> AsyncIterator[str]:
+        async with query_slots():
+            stream = service.query_stream(
+                request.query, source=request.source, strict_privacy=request.strict_privacy, debug=request.debug
+            )
+            try:
+                async for event, data in iterate_io(stream):
+                    yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+            except Exception as exc:
+                yield f"event: error\ndata: {json.dumps({'detail': f'Query error: {exc}'})}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
-    return QueryResponse(answer=answer, citations=citations, trace_id=trace_id, groundedness=groundedness)
\ No newline at end of file
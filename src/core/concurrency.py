@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, TypeVar
+
+from src.core.config import settings
+
+T = TypeVar("T")
+
+# Bounded pools for blocking work on the async request path:
+# - cpu: local embedding, reranking and PII redaction
+# - io: blocking network clients (Weaviate, OpenAI in sync mode)
+# - ingest: whole-document ingests, kept apart so they never starve queries
+_POOL_SIZES: Dict[str, Callable[[], int]] = {
+    "cpu": lambda: settings.CPU_EXECUTOR_WORKERS,
+    "io": lambda: settings.IO_EXECUTOR_WORKERS,
+    "ingest": lambda: settings.MAX_CONCURRENT_INGESTS,
+}
+
+_executors: Dict[str, ThreadPoolExecutor] = {}
+_executors_lock = threading.Lock()
+_query_slots: asyncio.Semaphore | None = None
+
+
+def get_executor(name: str) -> ThreadPoolExecutor:
+    executor = _executors.get(name)
+    if executor is None:
+        with _executors_lock:
+            executor = _executors.get(name)
+            if executor is None:
+                executor = ThreadPoolExecutor(max_workers=max(1, _POOL_SIZES[name]()), thread_name_prefix=name)
+                _executors[name] = executor
+    return executor
+
+
+async def run_in(name: str, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a blocking callable on the named bounded executor without blocking the loop.
+
+    The callable runs in a copy of the caller's context, so its spans join the request's trace.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(get_executor(name), context.run, functools.partial(fn, *args, **kwargs))
+
+
+async def run_cpu(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    return await run_in("cpu", fn, *args, **kwargs)
+
+
+async def run_io(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    return await run_in("io", fn, *args, **kwargs)
+
+
+async def iterate_io(iterator: Iterator[T]) -> AsyncIterator[T]:
+    """Drive a blocking iterator from async code, one ``next`` at a time on the I/O executor.
+
+    Closing or cancelling the async iterator waits for the step in progress,
+    then closes ``iterator`` (a generator sees ``GeneratorExit``).
+    """
+    step: asyncio.Future[Any] | None = None
+    try:
+        while True:
+            step = asyncio.ensure_future(run_io(next, iterator, _END))
+            item = await asyncio.shield(step)
+            step = None
+            if item is _END:
+                return
+            yield item
+    finally:
+        if step is not None:
+            # A generator cannot be closed while another thread is running it
+            await asyncio.wait([step])
+        close = getattr(iterator, "close", None)
+        if close is not None:
+            close()
+
+
+def query_slots() -> asyncio.Semaphore:
+    """Caps concurrently executing queries per worker (MAX_CONCURRENT_QUERIES)."""
+    global _query_slots
+    if _query_slots is None:
+        _query_slots = asyncio.Semaphore(settings.MAX_CONCURRENT_QUERIES)
+    return _query_slots
+
+
+def shutdown_executors() -> None:
+    global _query_slots
+    with _executors_lock:
+        for executor in _executors.values():
+            executor.shutdown(wait=False, cancel_futures=True)
+        _executors.clear()
+    _query_slots = None
+
+
+_END = object()
+
+
+def prefetch(iterable: Iterable[T], depth: int, name: str = "prefetch") -> Iterator[T]:
+    """Iterate ``iterable`` on a background thread, at most ``depth`` items ahead of the consumer.
+
+    Chaining these gives a pipeline whose stages overlap while the bounded
+    queues between them cap memory. The producer's exceptions are re-raised
+    in the consumer; closing the returned generator stops the producer after
+    its current item, closes ``iterable`` and waits for the thread.
+    """
+    items: queue.Queue[tuple[bool, Any]] = queue.Queue(maxsize=max(1, depth))
+    stop = threading.Event()
+    thread = threading.Thread(
+        target=contextvars.copy_context().run, args=(_produce, iterable, items, stop), name=name, daemon=True
+    )
+    thread.start()
+    try:
+        yield from _consume(items)
+    finally:
+        stop.set()
+        thread.join()
+
+
+def _put(items: queue.Queue[tuple[bool, Any]], stop: threading.Event, item: tuple[bool, Any]) -> bool:
+    """Block until ``item`` is queued (True) or the consumer has stopped (False)."""
+    while not stop.is_set():
+        try:
+            items.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _produce(iterable: Iterable[Any], items: queue.Queue[tuple[bool, Any]], stop: threading.Event) -> None:
+    """Producer thread of ``prefetch``: items as ``(True, item)``, then ``(False, _END)`` or ``(False, exc)``."""
+    iterator = iter(iterable)
+    try:
+        for item in iterator:
+            if not _put(items, stop, (True, item)):
+                return
+        _put(items, stop, (False, _END))
+    except BaseException as exc:
+        _put(items, stop, (False, exc))
+    finally:
+        close = getattr(iterator, "close", None)
+        if close is not None:
+            close()
+
+
+def _consume(items: queue.Queue[tuple[bool, Any]]) -> Iterator[Any]:
+    """Consumer side of ``prefetch``: yield items until the end marker, re-raising the producer's exception."""
+    while True:
+        ok, item = items.get()
+        if ok:
+            yield item
+        elif item is _END:
+            return
+        else:
+            raise item
@@ -1,17 +1,103 @@
 from pydantic_settings import BaseSettings
 
+
 class Settings(BaseSettings):
     PROJECT_NAME: str = "Compliance Copilot"
     API_V1_STR: str = "/api/v1"
     WEAVIATE_URL: str = "http://weaviate:8080"
+    # Chunk store: weaviate, local (embedded NumPy + BM25 index saved under
+    # LOCAL_STORE_PATH), or auto (weaviate when WEAVIATE_URL is set, else local)
+    VECTOR_STORE: str = "auto"
+    LOCAL_STORE_PATH: str = "data/local_store"
     EMBEDDING_MODEL: str = "BAAI/bge-large-en-v1.5"
     RERANKER_MODEL: str = "BAAI/bge-reranker-large"
     OPENAI_API_KEY: str
+    # Alternative API endpoint for both OpenAI clients, e.g. the local stub
+    # (python -m src.scripts.openai_stub) in tests and offline runs
+    OPENAI_BASE_URL: str | None = None
     USE_OPENAI_EMBEDDINGS: bool = False
     USE_OPENAI_RERANKER: bool = False
+    # Local embedding runtime: torch | int8 | onnx | onnx-int8 (re-ingest when switching
+    # EMBEDDING_MODEL; a smaller model such as BAAI/bge-small-en-v1.5 changes the dimension)
+    EMBEDDING_BACKEND: str = "torch"
+    # OpenAI embeddings: inputs are packed into requests of at most OPENAI_EMBED_BATCH_TOKENS
+    # tokens, OPENAI_EMBED_CONCURRENCY requests run at once under per-minute request and
+    # token limits (0 = unlimited), and 429/5xx responses are retried with backoff
+    OPENAI_EMBED_BATCH_TOKENS: int = 4_096
+    OPENAI_EMBED_BATCH_INPUTS: int = 256
+    OPENAI_EMBED_CONCURRENCY: int = 4
+    OPENAI_EMBED_RPM: int = 3_000
+    OPENAI_EMBED_TPM: int = 1_000_000
+    OPENAI_EMBED_MAX_RETRIES: int = 6
+    # Load models and clients in the app lifespan instead of on the first request
+    WARMUP_ON_STARTUP: bool = True
+    # PDF extraction: worker processes (0 = one per CPU) and OCR render resolution
+    INGEST_WORKERS: int = 0
+    OCR_DPI: int = 72
+    # Chunking: structured (token budget from the embedding tokenizer, split at headings
+    # and clauses, may span pages) or recursive (the old 800/120-character per-page split)
+    CHUNK_STRATEGY: str = "structured"
+    CHUNK_TOKENS: int = 256
+    CHUNK_OVERLAP_TOKENS: int = 32
+    CHUNK_MIN_TOKENS: int = 48
+    CHUNK_CROSS_PAGES: bool = True
+    # Local reranking: prune to the top-N hybrid hits, score length-sorted batches and
+    # truncate pairs to RERANK_MAX_LENGTH tokens; backend torch | int8 | onnx | onnx-int8
+    RERANK_TOP_N: int = 20
+    RERANK_BATCH_SIZE: int = 16
+    RERANK_MAX_LENGTH: int = 512
+    RERANKER_BACKEND: str = "torch"
+    # Where ONNX exports of local models are cached (ONNX backends only)
+    ONNX_CACHE_DIR: str = "data/onnx"
+    # Model memory across gunicorn workers: none (one copy per worker), preload (load in
+    # the master before fork, shared copy-on-write) or server (one model-server process
+    # behind a Unix socket serves embedding and reranking to every worker). The socket
+    # defaults to models.sock in a private (0700) directory: $XDG_RUNTIME_DIR/veritas,
+    # else veritas-<uid> in the temp directory
+    MODEL_SHARING: str = "none"
+    MODEL_SERVER_SOCKET: str = ""
+    MODEL_SERVER_CONNECT_TIMEOUT: float = 300.0
+    # Persistent embedding cache shared by ingest and query (SQLite, LRU-bounded)
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_PATH: str = "data/embedding_cache.sqlite"
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 200_000
+    # Async request path: bounded executors and per-worker concurrency limits
+    CPU_EXECUTOR_WORKERS: int = 4
+    IO_EXECUTOR_WORKERS: int = 32
+    MAX_CONCURRENT_QUERIES: int = 32
+    MAX_CONCURRENT_INGESTS: int = 1
+    # PERSON detection with Presidio/spaCy NER (emails and IPs always use patterns); false
+    # uses a regex heuristic and never loads Presidio. Re-read from the environment per service.
+    ENABLE_PRESIDIO: bool = True
+    # Store PII-redacted variants of each chunk at ingest so queries skip NER
+    PRECOMPUTE_REDACTION: bool = True
+    # Answer cache in front of RAGService.query; a similarity > 0 also serves
+    # near-duplicate questions (cosine similarity of the query embeddings)
+    ANSWER_CACHE_ENABLED: bool = True
+    ANSWER_CACHE_PATH: str = "data/answer_cache.sqlite"
+    ANSWER_CACHE_MAX_ENTRIES: int = 5_000
+    ANSWER_CACHE_TTL_SECONDS: int = 86_400
+    ANSWER_CACHE_SIMILARITY: float = 0.0
+    # Background ingest jobs: max running + waiting per worker, and the shared job store
+    INGEST_QUEUE_SIZE: int = 8
+    # Streaming ingest: embedding batches buffered between pipeline stages (bounds memory)
+    INGEST_PIPELINE_DEPTH: int = 2
+    INGEST_JOBS_PATH: str = "data/ingest_jobs.sqlite"
+    # Per-stage spans for each query and ingest, keyed by the returned trace_id; finished
+    # traces go to none, jsonl (appended to TRACE_JSONL_PATH), otlp (OTLP/HTTP JSON to a
+    # local collector) or both
+    TRACE_EXPORT: str = "none"
+    TRACE_JSONL_PATH: str = "data/traces.jsonl"
+    TRACE_OTLP_ENDPOINT: str = "http://localhost:4318/v1/traces"
+    TRACE_SERVICE_NAME: str = "compliance-copilot"
+    # Prometheus /metrics (with several gunicorn workers also set PROMETHEUS_MULTIPROC_DIR);
+    # each worker samples its model and process memory every METRICS_SAMPLE_SECONDS
+    METRICS_ENABLED: bool = True
+    METRICS_SAMPLE_SECONDS: float = 15.0
 
     class Config:
         case_sensitive = True
         env_file = ".env"
 
-settings = Settings()
\ No newline at end of file
+
+settings = Settings()
@@ -0,0 +1,211 @@
+"""Prometheus metrics (prometheus_client), served by ``/metrics``.
+
+Stage latencies come from finished traces (``observe_trace``); counters are
+incremented where the event happens. With several gunicorn workers, set
+PROMETHEUS_MULTIPROC_DIR before the app starts: each worker then records
+into memory-mapped files there and a scrape of any worker reports all of
+them (prometheus_client's multiprocess mode). Gauges that describe a worker
+are kept per worker (``pid`` label) and dropped when the worker exits.
+"""
+from __future__ import annotations
+
+import itertools
+import logging
+import os
+import threading
+from typing import Any
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+logger = logging.getLogger("uvicorn.error")
+
+# Seconds; ingest stages on long documents land in the upper buckets
+LATENCY_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    120.0,
+    300.0,
+)
+
+CONTENT_TYPE = CONTENT_TYPE_LATEST
+
+# Query and ingest stages (fed from finished traces)
+QUERY_STAGE_SECONDS = Histogram(
+    "veritas_query_stage_seconds",
+    "Query latency per pipeline stage; stage=total is the whole query",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+INGEST_STAGE_SECONDS = Histogram(
+    "veritas_ingest_stage_seconds",
+    "Ingest latency per pipeline stage; stage=total is the whole document",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+# Ingest volume
+CHUNKS_INGESTED = Counter(
+    "veritas_chunks_ingested_total", "Chunks embedded and written to the store"
+)
+PAGES_EXTRACTED = Counter("veritas_pages_extracted_total", "PDF pages extracted")
+OCR_PAGES = Counter("veritas_ocr_pages_total", "PDF pages that needed OCR")
+INGEST_JOBS = Counter(
+    "veritas_ingest_jobs_total", "Finished ingest jobs by outcome", ["status"]
+)
+# Query paths
+RETRIEVALS = Counter(
+    "veritas_retrievals_total",
+    "Retrievals by the strategy that answered (none = every strategy came back empty); fallback=true when the primary missed",
+    ["strategy", "fallback"],
+)
+CACHE_REQUESTS = Counter(
+    "veritas_cache_requests_total",
+    "Cache lookups (answer cache per query, embedding cache per text)",
+    ["cache", "result"],
+)
+PII_ENTITIES = Counter(
+    "veritas_pii_entities_redacted_total",
+    "PII entities replaced by the redactor (memoized repeats are not recounted)",
+    ["entity"],
+)
+# Capacity
+REQUESTS_IN_FLIGHT = Gauge(
+    "veritas_requests_in_flight",
+    "HTTP requests being served",
+    ["route"],
+    multiprocess_mode="livesum",
+)
+INGESTS_RUNNING = Gauge(
+    "veritas_ingests_running",
+    "Ingest jobs currently running",
+    multiprocess_mode="livesum",
+)
+MODEL_MEMORY = Gauge(
+    "veritas_model_memory_bytes",
+    "Weights and buffers of the models loaded in a worker",
+    ["model"],
+    multiprocess_mode="liveall",
+)
+RESIDENT_MEMORY = Gauge(
+    "veritas_process_resident_memory_bytes",
+    "Resident set size of a worker",
+    multiprocess_mode="liveall",
+)
+
+
+def observe_trace(trace: Any) -> None:
+    """Trace listener: one observation per span into the query or ingest stage histogram.
+
+    Repeated stages (per-batch embed/write) are observed once per batch.
+    """
+    histogram = {"query": QUERY_STAGE_SECONDS, "ingest": INGEST_STAGE_SECONDS}.get(
+        trace.root.name
+    )
+    if histogram is None:
+        return
+    for span in list(trace.spans):
+        if span.end is None:
+            continue
+        stage = "total" if span is trace.root else span.name
+        histogram.labels(stage=stage).observe(span.end - span.start)
+
+
+def model_memory_bytes(model: Any) -> int | None:
+    """Bytes held by a model's parameters and buffers, or None when it cannot tell.
+
+    Covers torch modules (SentenceTransformer, CrossEncoder's ``.model``)
+    and the ONNX wrappers' ``model_bytes``; remote models (MODEL_SHARING=server)
+    live in the model server and report nothing.
+    """
+    if getattr(model, "model_bytes", None) is not None:
+        return int(model.model_bytes)
+    module = model if hasattr(model, "parameters") else getattr(model, "model", None)
+    if module is None or not hasattr(module, "parameters"):
+        return None
+    tensors = itertools.chain(
+        module.parameters(), module.buffers() if hasattr(module, "buffers") else ()
+    )
+    return int(sum(t.numel() * t.element_size() for t in tensors))
+
+
+def resident_memory_bytes() -> int | None:
+    try:
+        with open("/proc/self/statm", encoding="ascii") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def sample_memory(registry: Any) -> None:
+    """Model and process memory of this worker into the per-worker gauges."""
+    for name in ("embedding_model", "reranker"):
+        if registry.is_loaded(name):
+            size = model_memory_bytes(getattr(registry, name))
+            if size is not None:
+                MODEL_MEMORY.labels(model=name).set(size)
+    rss = resident_memory_bytes()
+    if rss is not None:
+        RESIDENT_MEMORY.set(rss)
+
+
+def multiproc_dir() -> str | None:
+    return os.environ.get("PROMETHEUS_MULTIPROC_DIR") or None
+
+
+def render() -> bytes:
+    """The text exposition of this worker's metrics, or of every worker's in multiprocess mode."""
+    if multiproc_dir() is None:
+        return generate_latest(REGISTRY)
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry)
+
+
+class MemorySampler:
+    """Background thread sampling this worker's memory gauges every ``interval`` seconds.
+
+    Each worker records its own values, so a scrape served by any worker sees all of them.
+    """
+
+    def __init__(self, registry: Any, interval: float) -> None:
+        self.registry = registry
+        self.interval = interval
+        self._stop = threading.Event()
+        self.sample()
+        self._thread = threading.Thread(
+            target=self._run, name="metrics-sampler", daemon=True
+        )
+        self._thread.start()
+
+    def sample(self) -> None:
+        try:
+            sample_memory(self.registry)
+        except Exception:
+            logger.exception("Sampling memory metrics failed")
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def close(self) -> None:
+        self._stop.set()
+        self._thread.join(timeout=5)
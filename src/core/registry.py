@@ -0,0 +1,319 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, TypeVar
+
+import weaviate
+from openai import AsyncOpenAI, OpenAI
+from tenacity import retry, stop_after_attempt, wait_fixed
+from weaviate.connect import ConnectionParams
+
+from src.core.config import settings
+
+T = TypeVar("T")
+
+
+@retry(stop=stop_after_attempt(10), wait=wait_fixed(2))
+def connect_weaviate() -> weaviate.WeaviateClient:
+    weaviate_url = os.environ.get("WEAVIATE_URL", "").strip()
+    if weaviate_url:
+        client = weaviate.WeaviateClient(ConnectionParams.from_url(weaviate_url))
+        client.connect()
+        return client
+    # docker-compose fallback
+    client = weaviate.WeaviateClient(ConnectionParams.from_params(
+        http_host="weaviate",
+        http_port=8080,
+        http_secure=False,
+        grpc_host="weaviate",
+        grpc_port=50051,
+        grpc_secure=False,
+    ))
+    client.connect()
+    return client
+
+
+def vector_store_backend() -> str:
+    """Resolve VECTOR_STORE; ``auto`` means Weaviate only when WEAVIATE_URL is configured."""
+    backend = settings.VECTOR_STORE.strip().lower()
+    if backend == "auto":
+        configured = os.environ.get("WEAVIATE_URL", "").strip() or "WEAVIATE_URL" in settings.model_fields_set
+        return "weaviate" if configured else "local"
+    if backend not in ("weaviate", "local"):
+        raise ValueError(f"Unknown VECTOR_STORE {settings.VECTOR_STORE!r} (expected weaviate, local or auto)")
+    return backend
+
+
+class ModelRegistry:
+    """Holds the heavy models and clients shared by every service in a worker.
+
+    Each component is built lazily on first access (or eagerly via ``warmup``),
+    exactly once per process, and its load time is recorded in ``load_times``.
+
+    Components:
+    - weaviate_client: connected ``weaviate.WeaviateClient``
+    - vector_store: chunk store used by both services (Weaviate or embedded)
+    - openai_client: ``OpenAI`` client
+    - async_openai_client: ``AsyncOpenAI`` client for the async query path
+    - openai_embedder: batched, concurrent, rate-limited OpenAI embeddings for ingest
+    - embedding_model: local sentence encoder, torch/int8/ONNX per EMBEDDING_BACKEND (unless USE_OPENAI_EMBEDDINGS)
+    - reranker: local cross-encoder, torch/int8/ONNX per RERANKER_BACKEND (unless USE_OPENAI_RERANKER)
+    - model_server: ``ModelServerClient``; with MODEL_SHARING=server the two models above are its proxies
+    - embedding_cache: on-disk ``EmbeddingCache`` shared by ingest and query
+    - answer_cache: on-disk ``AnswerCache`` in front of queries, invalidated by ingest
+    - ingest_jobs: background ``IngestJobQueue`` behind /ingest
+    - pii_service: ``PIIRedactionService`` (spaCy/Presidio engines unless ENABLE_PRESIDIO=false)
+    - chunker: ingest-time ``Chunker`` (loads only the embedding tokenizer)
+    """
+
+    def __init__(self, logger: logging.Logger | None = None) -> None:
+        self.logger = logger or logging.getLogger("uvicorn.error")
+        self._lock = threading.RLock()
+        self._components: Dict[str, Any] = {}
+        self.load_times: Dict[str, float] = {}
+
+    def _get_or_load(self, name: str, loader: Callable[[], T]) -> T:
+        component = self._components.get(name)
+        if component is not None:
+            return component  # type: ignore[no-any-return]
+        with self._lock:
+            component = self._components.get(name)
+            if component is None:
+                start = time.perf_counter()
+                component = loader()
+                elapsed = time.perf_counter() - start
+                self._components[name] = component
+                self.load_times[name] = elapsed
+                self.logger.info("Registry loaded %s in %.2fs", name, elapsed)
+        return component  # type: ignore[no-any-return]
+
+    def set(self, name: str, component: Any) -> None:
+        """Register a prebuilt component (e.g. a stub in tests)."""
+        with self._lock:
+            self._components[name] = component
+            self.load_times.setdefault(name, 0.0)
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._components
+
+    @property
+    def weaviate_client(self) -> weaviate.WeaviateClient:
+        return self._get_or_load("weaviate_client", connect_weaviate)
+
+    @property
+    def vector_store(self) -> Any:
+        def _load() -> Any:
+            if vector_store_backend() == "local":
+                from src.services.local_store import LOCAL_STORE
+                return LOCAL_STORE
+            from src.services.vector_store import WeaviateVectorStore
+            return WeaviateVectorStore(self.weaviate_client)
+        return self._get_or_load("vector_store", _load)
+
+    @property
+    def openai_client(self) -> OpenAI:
+        return self._get_or_load(
+            "openai_client", lambda: OpenAI(api_key=settings.OPENAI_API_KEY, base_url=settings.OPENAI_BASE_URL)
+        )
+
+    @property
+    def async_openai_client(self) -> AsyncOpenAI:
+        return self._get_or_load(
+            "async_openai_client",
+            lambda: AsyncOpenAI(api_key=settings.OPENAI_API_KEY, base_url=settings.OPENAI_BASE_URL),
+        )
+
+    @property
+    def openai_embedder(self) -> Any:
+        def _load() -> Any:
+            from src.services.chunking import openai_token_counter
+            from src.services.openai_embeddings import OpenAIEmbedder, RateLimiter
+            return OpenAIEmbedder(
+                # The embedder does its own retrying, with backoff shared across batches
+                self.openai_client.with_options(max_retries=0),
+                openai_token_counter(),
+                batch_tokens=settings.OPENAI_EMBED_BATCH_TOKENS,
+                batch_inputs=settings.OPENAI_EMBED_BATCH_INPUTS,
+                concurrency=settings.OPENAI_EMBED_CONCURRENCY,
+                rate_limiter=RateLimiter(settings.OPENAI_EMBED_RPM, settings.OPENAI_EMBED_TPM),
+                max_retries=settings.OPENAI_EMBED_MAX_RETRIES,
+            )
+        return self._get_or_load("openai_embedder", _load)
+
+    @property
+    def model_server(self) -> Any:
+        def _load() -> Any:
+            from src.services.model_server import ModelServerClient, socket_path
+            return ModelServerClient(socket_path(), connect_timeout=settings.MODEL_SERVER_CONNECT_TIMEOUT)
+        return self._get_or_load("model_server", _load)
+
+    @property
+    def embedding_model(self) -> Any:
+        def _load() -> Any:
+            if settings.MODEL_SHARING == "server":
+                from src.services.model_server import RemoteEncoder
+                return RemoteEncoder(self.model_server)
+            from src.services.embeddings import load_sentence_encoder
+            return load_sentence_encoder(settings.EMBEDDING_MODEL, backend=settings.EMBEDDING_BACKEND)
+        return self._get_or_load("embedding_model", _load)
+
+    @property
+    def reranker(self) -> Any:
+        def _load() -> Any:
+            if settings.MODEL_SHARING == "server":
+                from src.services.model_server import RemoteCrossEncoder
+                return RemoteCrossEncoder(self.model_server)
+            from src.services.reranking import load_cross_encoder
+            return load_cross_encoder(
+                settings.RERANKER_MODEL, backend=settings.RERANKER_BACKEND, max_length=settings.RERANK_MAX_LENGTH
+            )
+        return self._get_or_load("reranker", _load)
+
+    @property
+    def embedding_cache(self) -> Any:
+        def _load() -> Any:
+            from src.services.embedding_cache import EmbeddingCache
+            return EmbeddingCache(settings.EMBEDDING_CACHE_PATH, max_entries=settings.EMBEDDING_CACHE_MAX_ENTRIES)
+        return self._get_or_load("embedding_cache", _load)
+
+    @property
+    def answer_cache(self) -> Any:
+        def _load() -> Any:
+            from src.services.answer_cache import AnswerCache
+            return AnswerCache(
+                settings.ANSWER_CACHE_PATH,
+                max_entries=settings.ANSWER_CACHE_MAX_ENTRIES,
+                ttl_seconds=settings.ANSWER_CACHE_TTL_SECONDS,
+            )
+        return self._get_or_load("answer_cache", _load)
+
+    @property
+    def ingest_jobs(self) -> Any:
+        def _load() -> Any:
+            from src.services.ingest_jobs import IngestJobQueue, IngestJobStore
+            from src.services.ingestion_service import IngestionService
+            return IngestJobQueue(
+                IngestJobStore(settings.INGEST_JOBS_PATH),
+                service_factory=lambda: IngestionService(registry=self),
+                max_pending=settings.INGEST_QUEUE_SIZE,
+                logger=self.logger,
+            )
+        return self._get_or_load("ingest_jobs", _load)
+
+    @property
+    def pii_service(self) -> Any:
+        def _load() -> Any:
+            from src.services.pii_service import PIIRedactionService
+            return PIIRedactionService(logger=self.logger)
+        return self._get_or_load("pii_service", _load)
+
+    @property
+    def chunker(self) -> Any:
+        def _load() -> Any:
+            from src.services.chunking import Chunker
+            return Chunker(settings.CHUNK_STRATEGY)
+        return self._get_or_load("chunker", _load)
+
+    def _load_components(self, names: list[str]) -> None:
+        """Load the named components through their properties (each loads at most once)."""
+        for name in names:
+            getattr(self, name)
+
+    def warmup(self) -> Dict[str, float]:
+        """Load every component the current settings require and return load times."""
+        names = ["vector_store", "openai_client", "async_openai_client"]
+        if not settings.USE_OPENAI_EMBEDDINGS:
+            names.append("embedding_model")
+        if not settings.USE_OPENAI_RERANKER:
+            names.append("reranker")
+        if settings.EMBEDDING_CACHE_ENABLED:
+            names.append("embedding_cache")
+        if settings.ANSWER_CACHE_ENABLED:
+            names.append("answer_cache")
+        names.append("pii_service")
+        self._load_components(names)
+        summary = ", ".join(f"{k}={v:.2f}s" for k, v in self.load_times.items())
+        self.logger.info("Registry warmup complete | %s", summary)
+        return dict(self.load_times)
+
+    def preload_models(self) -> Dict[str, float]:
+        """Load the fork-safe local models (and the PII engines) ahead of a pre-fork server.
+
+        Called in the gunicorn master with MODEL_SHARING=preload; workers inherit
+        the loaded weights copy-on-write. ONNX Runtime sessions own thread pools
+        that do not survive fork, so ONNX-backed models are left to the workers.
+        """
+        names: list[str] = []
+        if not settings.USE_OPENAI_EMBEDDINGS:
+            if settings.EMBEDDING_BACKEND.startswith("onnx"):
+                self.logger.warning("Not preloading the ONNX embedding model; use MODEL_SHARING=server to share it")
+            else:
+                names.append("embedding_model")
+        if not settings.USE_OPENAI_RERANKER:
+            if settings.RERANKER_BACKEND.startswith("onnx"):
+                self.logger.warning("Not preloading the ONNX reranker; use MODEL_SHARING=server to share it")
+            else:
+                names.append("reranker")
+        names.append("pii_service")
+        self._load_components(names)
+        return dict(self.load_times)
+
+    async def aclose(self) -> None:
+        """Close async clients, then everything else (see ``close``)."""
+        client = self._components.get("async_openai_client")
+        if client is not None:
+            try:
+                await client.close()
+            except Exception as exc:
+                self.logger.warning("Error closing async_openai_client: %s", exc)
+        self.close()
+
+    def close(self) -> None:
+        """Close clients and caches and drop every component."""
+        with self._lock:
+            # ingest_jobs first (it may still be writing), vector_store before its client
+            for name in (
+                "ingest_jobs",
+                "vector_store",
+                "weaviate_client",
+                "openai_embedder",
+                "openai_client",
+                "model_server",
+                "embedding_cache",
+                "answer_cache",
+            ):
+                client = self._components.get(name)
+                if client is None:
+                    continue
+                try:
+                    client.close()
+                except Exception as exc:
+                    self.logger.warning("Error closing %s: %s", name, exc)
+            self._components.clear()
+            self.load_times.clear()
+
+
+_registry: ModelRegistry | None = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> ModelRegistry:
+    """Return the process-wide registry, creating it on first use."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelRegistry()
+    return _registry
+
+
+def reset_registry() -> None:
+    """Close and discard the process-wide registry."""
+    global _registry
+    with _registry_lock:
+        if _registry is not None:
+            _registry.close()
+        _registry = None
@@ -0,0 +1,335 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List
+from uuid import uuid4
+
+import requests
+
+from src.core.config import settings
+
+logger = logging.getLogger("uvicorn.error")
+
+# Spans kept per trace; a very long ingest records the rest only as a count
+MAX_SPANS = 2_000
+
+TRACE_EXPORTS = ("none", "jsonl", "otlp", "both")
+
+
+@dataclass
+class Span:
+    name: str
+    span_id: str
+    parent_id: str | None
+    start_ns: int  # wall clock, for export
+    start: float  # perf_counter, for durations
+    end: float | None = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    error: str | None = None
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end if self.end is not None else time.perf_counter()) - self.start) * 1000
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+
+class Trace:
+    """The spans of one query or ingest, keyed by the ``trace_id`` returned to the caller.
+
+    Spans may be opened from several threads at once (pipeline stages,
+    executor work); parents come from the active span in the calling context.
+    """
+
+    def __init__(self, name: str, trace_id: str | None = None, **attributes: Any) -> None:
+        self.trace_id = trace_id or str(uuid4())
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self.root = Span(name, _span_id(), None, time.time_ns(), time.perf_counter(), attributes=dict(attributes))
+        self.spans: List[Span] = [self.root]
+
+    def open(self, name: str, parent: Span | None = None, **attributes: Any) -> Span:
+        span = Span(name, _span_id(), (parent or self.root).span_id, time.time_ns(), time.perf_counter(), attributes=attributes)
+        with self._lock:
+            if len(self.spans) < MAX_SPANS:
+                self.spans.append(span)
+            else:
+                self.dropped += 1
+        return span
+
+    def record(self, name: str, seconds: float, parent: Span | None = None, **attributes: Any) -> Span:
+        """Add an already-measured span that ended just now (e.g. work spread across a generator)."""
+        span = self.open(name, parent, **attributes)
+        span.start_ns -= int(seconds * 1e9)
+        span.start -= seconds
+        span.end = time.perf_counter()
+        return span
+
+    @contextmanager
+    def activate(self, parent: Span | None = None) -> Iterator["Trace"]:
+        """Make this trace current, so ``span()`` calls in this context attach to it."""
+        token = _active.set((self, parent or self.root))
+        try:
+            yield self
+        finally:
+            _active.reset(token)
+
+    def finish(self, error: str | None = None) -> None:
+        if self.root.end is not None:
+            return
+        self.root.end = time.perf_counter()
+        self.root.error = error
+        if self.dropped:
+            self.root.set(dropped_spans=self.dropped)
+        for listener in list(_listeners):
+            try:
+                listener(self)
+            except Exception:
+                logger.warning("Trace listener failed", exc_info=True)
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """Spans as plain dicts: offsets and durations in ms from the trace start."""
+        with self._lock:
+            spans = list(self.spans)
+        return [
+            {
+                "name": s.name,
+                "span_id": s.span_id,
+                "parent_id": s.parent_id,
+                "start_ms": round((s.start - self.root.start) * 1000, 3),
+                "duration_ms": round(s.duration_ms, 3),
+                "attributes": dict(s.attributes),
+                **({"error": s.error} if s.error else {}),
+            }
+            for s in spans
+        ]
+
+
+_active: ContextVar[tuple[Trace, Span] | None] = ContextVar("trace", default=None)
+_listeners: List[Callable[[Trace], None]] = []
+
+
+def _span_id() -> str:
+    return os.urandom(8).hex()
+
+
+def add_listener(listener: Callable[[Trace], None]) -> None:
+    """Call ``listener(trace)`` for every finished trace (exporters, metrics)."""
+    if listener not in _listeners:
+        _listeners.append(listener)
+
+
+def remove_listener(listener: Callable[[Trace], None]) -> None:
+    if listener in _listeners:
+        _listeners.remove(listener)
+
+
+def current_trace() -> Trace | None:
+    active = _active.get()
+    return active[0] if active else None
+
+
+@contextmanager
+def start_trace(name: str, **attributes: Any) -> Iterator[Trace]:
+    """Open a trace, make it current and finish (and export) it on exit."""
+    trace = Trace(name, **attributes)
+    with trace.activate():
+        try:
+            yield trace
+        except BaseException as exc:
+            trace.finish(error=f"{type(exc).__name__}: {exc}")
+            raise
+    trace.finish()
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span | None]:
+    """Time a stage as a child of the current span; a no-op outside a trace.
+
+    Must not wrap a ``yield``: the current span is held in a context variable.
+    """
+    active = _active.get()
+    if active is None:
+        yield None
+        return
+    trace, parent = active
+    current = trace.open(name, parent, **attributes)
+    token = _active.set((trace, current))
+    try:
+        yield current
+    except BaseException as exc:
+        current.error = f"{type(exc).__name__}: {exc}"
+        raise
+    finally:
+        current.end = time.perf_counter()
+        _active.reset(token)
+
+
+def record(name: str, seconds: float, **attributes: Any) -> None:
+    """Add an already-measured child of the current span, if any."""
+    active = _active.get()
+    if active is not None:
+        active[0].record(name, seconds, active[1], **attributes)
+
+
+def annotate(**attributes: Any) -> None:
+    """Set attributes on the current span, if any."""
+    active = _active.get()
+    if active is not None:
+        active[1].set(**attributes)
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def otlp_payload(traces: List[Trace], service_name: str) -> Dict[str, Any]:
+    """OTLP/HTTP JSON ``ExportTraceServiceRequest`` for finished traces."""
+    spans = []
+    for trace in traces:
+        trace_hex = trace.trace_id.replace("-", "")
+        for s in list(trace.spans):
+            end = s.end if s.end is not None else trace.root.end or s.start
+            spans.append({
+                "traceId": trace_hex,
+                "spanId": s.span_id,
+                **({"parentSpanId": s.parent_id} if s.parent_id else {}),
+                "name": s.name,
+                "kind": 2 if s.parent_id is None else 1,  # SERVER for the root, INTERNAL below it
+                "startTimeUnixNano": str(s.start_ns),
+                "endTimeUnixNano": str(s.start_ns + int((end - s.start) * 1e9)),
+                "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in s.attributes.items()],
+                "status": {"code": 2, "message": s.error} if s.error else {"code": 1},
+            })
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": service_name}}]},
+            "scopeSpans": [{"scope": {"name": "src.core.tracing"}, "spans": spans}],
+        }]
+    }
+
+
+class TraceExporter:
+    """Writes finished traces as JSON lines and/or posts them to an OTLP/HTTP collector.
+
+    Export runs on a background thread behind a bounded queue, so requests
+    never wait on disk or the collector; traces are dropped when it is full.
+    """
+
+    def __init__(
+        self,
+        jsonl_path: str | None = None,
+        otlp_endpoint: str | None = None,
+        service_name: str = "compliance-copilot",
+        max_queue: int = 1_000,
+        batch_size: int = 64,
+    ) -> None:
+        self.jsonl_path = jsonl_path
+        self.otlp_endpoint = otlp_endpoint
+        self.service_name = service_name
+        self.batch_size = batch_size
+        self.dropped = 0
+        self._queue: queue.Queue[Trace | None] = queue.Queue(maxsize=max_queue)
+        if jsonl_path:
+            os.makedirs(os.path.dirname(os.path.abspath(jsonl_path)), exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="trace-export", daemon=True)
+        self._thread.start()
+
+    def __call__(self, trace: Trace) -> None:
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            batch = [item] if item is not None else []
+            while item is not None and len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not None:
+                    batch.append(item)
+            if batch:
+                self._export(batch)  # type: ignore[arg-type]
+            if item is None:
+                return
+
+    def _export(self, traces: List[Trace]) -> None:
+        if self.jsonl_path:
+            try:
+                with open(self.jsonl_path, "a", encoding="utf-8") as f:
+                    for trace in traces:
+                        record = {
+                            "trace_id": trace.trace_id,
+                            "name": trace.root.name,
+                            "start_unix_ns": trace.root.start_ns,
+                            "duration_ms": round(trace.root.duration_ms, 3),
+                            "spans": trace.to_dicts(),
+                        }
+                        f.write(json.dumps(record, default=str) + "\n")
+            except OSError as exc:
+                logger.warning("Trace export to %s failed: %s", self.jsonl_path, exc)
+        if self.otlp_endpoint:
+            try:
+                response = requests.post(self.otlp_endpoint, json=otlp_payload(traces, self.service_name), timeout=5.0)
+                response.raise_for_status()
+            except requests.RequestException as exc:
+                logger.warning("Trace export to %s failed: %s", self.otlp_endpoint, exc)
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Flush what is queued and stop the export thread."""
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+
+_exporter: TraceExporter | None = None
+_exporter_lock = threading.Lock()
+
+
+def configure_export() -> TraceExporter | None:
+    """Start the exporter TRACE_EXPORT asks for (once per process)."""
+    global _exporter
+    mode = settings.TRACE_EXPORT.strip().lower()
+    if mode not in TRACE_EXPORTS:
+        raise ValueError(f"Unknown TRACE_EXPORT {settings.TRACE_EXPORT!r} (expected one of {', '.join(TRACE_EXPORTS)})")
+    if mode == "none":
+        return None
+    with _exporter_lock:
+        if _exporter is None:
+            _exporter = TraceExporter(
+                jsonl_path=settings.TRACE_JSONL_PATH if mode in ("jsonl", "both") else None,
+                otlp_endpoint=settings.TRACE_OTLP_ENDPOINT if mode in ("otlp", "both") else None,
+                service_name=settings.TRACE_SERVICE_NAME,
+            )
+            add_listener(_exporter)
+        return _exporter
+
+
+def shutdown_export() -> None:
+    global _exporter
+    with _exporter_lock:
+        if _exporter is not None:
+            remove_listener(_exporter)
+            _exporter.close()
+            _exporter = None
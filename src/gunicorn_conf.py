@@ -0,0 +1,72 @@
+"""Gunicorn hooks for sharing model memory across workers (see MODEL_SHARING).
+
+    gunicorn -c src/gunicorn_conf.py -k uvicorn.workers.UvicornWorker -w 2 src.main:app
+"""
+from __future__ import annotations
+
+import gc
+import multiprocessing
+import os
+import secrets
+import time
+from typing import Any
+
+from src.core.config import settings
+
+preload_app = settings.MODEL_SHARING == "preload"
+
+_model_server: Any = None
+
+
+def on_starting(server: Any) -> None:
+    global _model_server
+    metrics_dir = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if metrics_dir:
+        # Files left by a previous run's workers would be summed into this run's totals
+        os.makedirs(metrics_dir, exist_ok=True)
+        for entry in os.listdir(metrics_dir):
+            if entry.endswith(".db"):
+                os.remove(os.path.join(metrics_dir, entry))
+    if settings.MODEL_SHARING != "server":
+        return
+    from src.services.model_server import AUTHKEY_ENV, serve, socket_path
+
+    # Workers are forked after this point and inherit the key
+    os.environ.setdefault(AUTHKEY_ENV, secrets.token_hex(16))
+    path = socket_path()
+    _model_server = multiprocessing.get_context("spawn").Process(target=serve, args=(path,), name="model-server", daemon=True)
+    _model_server.start()
+    deadline = time.monotonic() + settings.MODEL_SERVER_CONNECT_TIMEOUT
+    while not os.path.exists(path):
+        if not _model_server.is_alive():
+            raise RuntimeError("Model server exited during startup")
+        if time.monotonic() > deadline:
+            raise RuntimeError("Model server did not start in time")
+        time.sleep(0.5)
+    server.log.info("Model server ready on %s (pid %s)", path, _model_server.pid)
+
+
+def when_ready(server: Any) -> None:
+    if settings.MODEL_SHARING != "preload":
+        return
+    from src.core.registry import get_registry
+
+    load_times = get_registry().preload_models()
+    # Move everything allocated so far out of the collector's reach, so collections
+    # in the workers do not write to (and un-share) the inherited pages
+    gc.freeze()
+    server.log.info("Preloaded models before fork | %s", ", ".join(f"{k}={v:.2f}s" for k, v in load_times.items()))
+
+
+def child_exit(server: Any, worker: Any) -> None:
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        # Drop the worker's live gauges; its counters and histograms keep counting in the totals
+        multiprocess.mark_process_dead(worker.pid)
+
+
+def on_exit(server: Any) -> None:
+    if _model_server is not None and _model_server.is_alive():
+        _model_server.terminate()
+        _model_server.join(timeout=10)
@@ -1,10 +1,74 @@
-from fastapi import FastAPI
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import Any
+
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
+from starlette.routing import Match
 from src.api.v1 import endpoints
+from src.core import metrics
 from src.core.config import settings
+from src.core.concurrency import shutdown_executors
+from src.core.registry import get_registry, reset_registry
+from src.core.tracing import add_listener, configure_export, remove_listener, shutdown_export
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    # Load models/clients once per worker and release them on shutdown
+    configure_export()
+    registry = get_registry()
+    if settings.METRICS_ENABLED:
+        add_listener(metrics.observe_trace)
+    if settings.WARMUP_ON_STARTUP:
+        registry.warmup()
+    # Started after warmup, so the first sample already sees the loaded models
+    sampler = metrics.MemorySampler(registry, settings.METRICS_SAMPLE_SECONDS) if settings.METRICS_ENABLED else None
+    app.state.registry = registry
+    app.state.memory_sampler = sampler
+    yield
+    if sampler is not None:
+        sampler.close()
+    app.state.memory_sampler = None
+    remove_listener(metrics.observe_trace)
+    # Stops and waits for this worker's ingest jobs before their store closes
+    await registry.aclose()
+    reset_registry()
+    shutdown_executors()
+    shutdown_export()
+
+
+class InFlightMiddleware:
+    """Counts requests in flight per route. Plain ASGI rather than an http
+    middleware, so a streamed response counts until its last byte is sent."""
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
 
-app = FastAPI(title=settings.PROJECT_NAME)
+    async def __call__(self, scope: Any, receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        route = _route_path(scope)
+        in_flight = metrics.REQUESTS_IN_FLIGHT.labels(route=route)
+        in_flight.inc()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            in_flight.dec()
+
+
+def _route_path(scope: Any) -> str:
+    # The route template, so ids in paths do not each become a series
+    for route in app.router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", "other")
+    return "other"
+
+
+app = FastAPI(title=settings.PROJECT_NAME, lifespan=lifespan)
 
 # CORS for local Next.js dev server
 app.add_middleware(
@@ -19,9 +83,20 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+if settings.METRICS_ENABLED:
+    app.add_middleware(InFlightMiddleware)
 
 @app.get("/health")
 def health() -> JSONResponse:
     return JSONResponse({"status": "ok"})
 
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics() -> Response:
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    sampler = getattr(app.state, "memory_sampler", None)
+    if sampler is not None:
+        sampler.sample()
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
 app.include_router(endpoints.router, prefix=settings.API_V1_STR)
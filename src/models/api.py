@@ -1,3 +1,5 @@
+from typing import Any
+
 from pydantic import BaseModel
 
 
@@ -10,12 +12,38 @@ class IngestResponse(BaseModel):
     document_id: str
     chunks_count: int
     ocr_pages_count: int
+    inserted_count: int = 0
+    failed_count: int = 0
+    deleted_count: int = 0
+    unchanged: bool = False
+    extraction_seconds: float = 0.0
+    trace_id: str | None = None
+
+
+class IngestProgress(BaseModel):
+    pages_total: int = 0
+    pages_extracted: int = 0
+    ocr_pages: int = 0
+    chunks_total: int = 0
+    chunks_embedded: int = 0
+    objects_written: int = 0
+
+
+class IngestJobStatus(BaseModel):
+    job_id: str
+    document_id: str
+    status: str  # queued | running | succeeded | failed | cancelled
+    stage: str
+    progress: IngestProgress
+    result: IngestResponse | None = None
+    error: str | None = None
 
 
 class QueryRequest(BaseModel):
     query: str
     source: str | None = None
     strict_privacy: bool = True
+    debug: bool = False  # return the per-stage spans with the answer
 
 
 class Citation(BaseModel):
@@ -23,10 +51,31 @@ class Citation(BaseModel):
     page_number: int
     text: str
     score: float
+    page_end: int | None = None  # last page, for chunks spanning a page break
+    section: str | None = None  # heading path, e.g. "Chapter IV > Article 32"
+
+
+class CacheInfo(BaseModel):
+    hit: bool = False
+    match: str | None = None  # exact | similar
+    similarity: float | None = None
+    age_seconds: float | None = None
+
+
+class TraceSpan(BaseModel):
+    name: str
+    span_id: str
+    parent_id: str | None = None
+    start_ms: float  # offset from the start of the trace
+    duration_ms: float
+    attributes: dict[str, Any] = {}
+    error: str | None = None
 
 
 class QueryResponse(BaseModel):
     answer: str
     citations: list[Citation]
     trace_id: str
-    groundedness: float
\ No newline at end of file
+    groundedness: float
+    cache: CacheInfo = CacheInfo()
+    spans: list[TraceSpan] | None = None  # only when the request set debug
\ No newline at end of file
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import argparse
+from typing import Any, Dict, List, Tuple
+
+from src.core.registry import get_registry
+from src.services.pii_service import REDACTION_VARIANTS
+
+
+def flush(store: Any, pii_service: Any, pending: List[Tuple[str, Dict[str, Any], Any]]) -> int:
+    """Redact a batch of objects and write them back under the same uuid and vector."""
+    variants = pii_service.redact_variants([str(props.get("content", "")) for _, props, _ in pending])
+    objects = {}
+    for i, (uuid, props, vector) in enumerate(pending):
+        for prop, texts in variants.items():
+            props[prop] = texts[i]
+        objects[uuid] = (props, vector)
+    failed = store.write_objects(objects)
+    if failed:
+        print(f"  {len(failed)} objects failed to write; re-run to retry them")
+    return len(pending) - len(failed)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Store precomputed redacted variants on already-ingested chunks")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--force", action="store_true", help="Recompute variants even where they already exist")
+    args = parser.parse_args()
+
+    registry = get_registry()
+    store = registry.vector_store
+    store.create_schema()  # adds any missing variant properties
+    pii_service = registry.pii_service
+
+    scanned = updated = 0
+    pending: List[Tuple[str, Dict[str, Any], Any]] = []
+    try:
+        for uuid, props, vector in store.iter_objects():
+            scanned += 1
+            if not args.force and all(props.get(p) is not None for p in REDACTION_VARIANTS.values()):
+                continue
+            pending.append((uuid, props, vector))
+            if len(pending) >= args.batch_size:
+                updated += flush(store, pii_service, pending)
+                pending = []
+                print(f"Scanned {scanned} | updated {updated}")
+        if pending:
+            updated += flush(store, pii_service, pending)
+        store.save()
+    finally:
+        registry.close()
+    print(f"\nDone: scanned {scanned} chunks, stored redacted variants for {updated}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+
+from src.core.config import settings
+from src.core.registry import get_registry
+from src.services.chunking import CHUNK_STRATEGIES, Chunker, load_token_counter
+from src.services.extraction import iter_pages
+
+
+def run_strategy(
+    strategy: str, documents: Dict[str, List[str]], count_tokens: Any, embedder: Any, batch_size: int
+) -> Dict[str, Any]:
+    chunker = Chunker(strategy, count_tokens=count_tokens)
+    started = time.perf_counter()
+    chunks = [chunk for pages in documents.values() for chunk in chunker.split(pages)]
+    chunk_s = time.perf_counter() - started
+
+    tokens = np.asarray(count_tokens([c.text for c in chunks]) if chunks else [0])
+    result: Dict[str, Any] = {
+        "strategy": strategy,
+        "chunks": len(chunks),
+        "chunk_seconds": round(chunk_s, 3),
+        "tokens_mean": round(float(tokens.mean()), 1),
+        "tokens_p95": int(np.percentile(tokens, 95)),
+        "tokens_max": int(tokens.max()),
+        "tokens_total": int(tokens.sum()),
+        "cross_page_chunks": sum(1 for c in chunks if c.page_end > c.page_start),
+        "with_section": sum(1 for c in chunks if c.section),
+    }
+    if embedder is not None and chunks:
+        started = time.perf_counter()
+        embedder.encode([c.text for c in chunks], batch_size=batch_size, normalize_embeddings=True)
+        result["embed_seconds"] = round(time.perf_counter() - started, 2)
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compare chunking strategies on PDFs: chunk counts, token lengths and embedding time"
+    )
+    parser.add_argument("pdfs", nargs="+")
+    parser.add_argument("--strategies", nargs="+", default=list(CHUNK_STRATEGIES), choices=CHUNK_STRATEGIES)
+    parser.add_argument("--no-embed", action="store_true", help="Skip timing the local embedding model")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--output", default=None, help="Write the results as JSON")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    documents = {
+        path: [page.text for page in iter_pages(path, workers=settings.INGEST_WORKERS, ocr_dpi=settings.OCR_DPI)]
+        for path in args.pdfs
+    }
+    pages = sum(len(p) for p in documents.values())
+    print(f"Extracted {len(documents)} documents, {pages} pages in {time.perf_counter() - started:.2f}s")
+    print(
+        f"structured: CHUNK_TOKENS={settings.CHUNK_TOKENS} overlap={settings.CHUNK_OVERLAP_TOKENS} "
+        f"min={settings.CHUNK_MIN_TOKENS} cross_pages={settings.CHUNK_CROSS_PAGES}\n"
+    )
+
+    count_tokens = load_token_counter()
+    registry = get_registry()
+    embedder = None if args.no_embed or settings.USE_OPENAI_EMBEDDINGS else registry.embedding_model
+    results = []
+    try:
+        for strategy in args.strategies:
+            result = run_strategy(strategy, documents, count_tokens, embedder, args.batch_size)
+            results.append(result)
+            embed = f" embed={result['embed_seconds']:.2f}s" if "embed_seconds" in result else ""
+            print(
+                f"{strategy:<11} chunks={result['chunks']:<6} tokens mean={result['tokens_mean']:<7} "
+                f"p95={result['tokens_p95']:<5} max={result['tokens_max']:<5} total={result['tokens_total']:<8} "
+                f"cross_page={result['cross_page_chunks']:<5} chunk={result['chunk_seconds']:.3f}s{embed}"
+            )
+    finally:
+        registry.close()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"documents": len(documents), "pages": pages, "results": results}, f, indent=2)
+        print(f"\nWrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
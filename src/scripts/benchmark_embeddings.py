@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+
+from src.core.config import settings
+from src.core.registry import get_registry
+from src.services.embeddings import EMBEDDING_BACKENDS, load_sentence_encoder
+
+
+def load_corpus(max_docs: int) -> List[str]:
+    """Chunk texts already in the configured vector store."""
+    registry = get_registry()
+    try:
+        texts = []
+        for _, props, _ in registry.vector_store.iter_objects():
+            content = str(props.get("content", "")).strip()
+            if content:
+                texts.append(content)
+            if len(texts) >= max_docs:
+                break
+        return texts
+    finally:
+        registry.close()
+
+
+def load_queries(path: str | None, corpus: List[str], count: int) -> List[str]:
+    """Questions from an evaluation CSV, or else the first sentence of evenly spaced chunks."""
+    if path:
+        import pandas as pd
+
+        return [str(q).strip() for q in pd.read_csv(path)["question"].tolist()][:count]
+    step = max(1, len(corpus) // count)
+    return [re.split(r"(?<=[.!?])\s+", text)[0][:200] for text in corpus[::step]][:count]
+
+
+def run_backend(model_name: str, backend: str, corpus: List[str], queries: List[str], batch_size: int) -> Dict[str, Any]:
+    started = time.perf_counter()
+    model = load_sentence_encoder(model_name, backend)
+    load_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    doc_vectors = np.asarray(model.encode(corpus, batch_size=batch_size, normalize_embeddings=True), dtype=np.float32)
+    docs_per_s = len(corpus) / (time.perf_counter() - started)
+
+    latencies = []
+    query_vectors = []
+    for q in queries:
+        started = time.perf_counter()
+        query_vectors.append(model.encode(q, normalize_embeddings=True))
+        latencies.append((time.perf_counter() - started) * 1000)
+    return {
+        "model": model_name,
+        "backend": backend,
+        "dim": int(doc_vectors.shape[1]),
+        "load_s": round(load_s, 2),
+        "docs_per_s": round(docs_per_s, 1),
+        "query_p50_ms": round(float(np.percentile(latencies, 50)), 2),
+        "query_p95_ms": round(float(np.percentile(latencies, 95)), 2),
+        "_ranking": np.asarray(query_vectors, dtype=np.float32) @ doc_vectors.T,
+    }
+
+
+def recall_at_k(baseline: np.ndarray, candidate: np.ndarray, k: int) -> float:
+    """Mean overlap between each query's top-k documents under the baseline and the candidate."""
+    k = min(k, baseline.shape[1])
+    base_top = np.argsort(-baseline, axis=1)[:, :k]
+    cand_top = np.argsort(-candidate, axis=1)[:, :k]
+    return float(np.mean([len(set(b) & set(c)) / k for b, c in zip(base_top, cand_top)]))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compare embedding backends against fp32 torch: top-k recall, throughput and query latency"
+    )
+    parser.add_argument("--model", default=settings.EMBEDDING_MODEL, help="Baseline model (default: EMBEDDING_MODEL)")
+    parser.add_argument("--backends", nargs="+", default=[b for b in EMBEDDING_BACKENDS if b != "torch"])
+    parser.add_argument("--small-model", default=None, help="Also benchmark a smaller model, e.g. BAAI/bge-small-en-v1.5")
+    parser.add_argument("--questions", default=None, help="CSV with a 'question' column (default: derived from chunks)")
+    parser.add_argument("--max-docs", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--output", default=None, help="Write the results as JSON")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.max_docs)
+    if not corpus:
+        raise SystemExit("The vector store is empty; ingest some documents first")
+    queries = load_queries(args.questions, corpus, args.queries)
+    print(f"Corpus: {len(corpus)} chunks | queries: {len(queries)} | recall@{args.k} vs {args.model} (torch)\n")
+
+    runs = [(args.model, "torch")] + [(args.model, b) for b in args.backends if b != "torch"]
+    if args.small_model:
+        runs += [(args.small_model, b) for b in dict.fromkeys(["torch", *args.backends])]
+    results = []
+    baseline: np.ndarray | None = None
+    for model_name, backend in runs:
+        result = run_backend(model_name, backend, corpus, queries, args.batch_size)
+        ranking = result.pop("_ranking")
+        if baseline is None:
+            baseline = ranking
+        result[f"recall@{args.k}"] = round(recall_at_k(baseline, ranking, args.k), 3)
+        results.append(result)
+        print(
+            f"{model_name:<32} {backend:<10} dim={result['dim']:<5} load={result['load_s']:>6.2f}s "
+            f"docs/s={result['docs_per_s']:>8.1f} query p50={result['query_p50_ms']:>7.2f}ms "
+            f"p95={result['query_p95_ms']:>7.2f}ms recall@{args.k}={result[f'recall@{args.k}']:.3f}"
+        )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"corpus": len(corpus), "queries": len(queries), "k": args.k, "results": results}, f, indent=2)
+        print(f"\nWrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import random
+import time
+from typing import Any, Dict, List, Tuple
+
+from src.services.pii_service import PIIRedactionService, may_contain_person
+
+FIRST_NAMES = ["John", "Maria", "Wei", "Aisha", "Lars", "Priya", "Carlos", "Fatima", "Olga", "Kwame"]
+LAST_NAMES = ["Doe", "Garcia", "Zhang", "Khan", "Nilsen", "Patel", "Silva", "Haddad", "Ivanova", "Mensah"]
+CLEAN = [
+    "The controller shall implement appropriate technical and organisational measures.",
+    "Personal data shall be kept for no longer than is necessary for the purposes of processing.",
+    "Access logs are retained for ninety days and reviewed quarterly.",
+    "Article 32 requires encryption of personal data at rest and in transit.",
+    "records of processing activities must be available to the supervisory authority on request.",
+    "a data protection impact assessment is required before high-risk processing begins.",
+    "The Data Protection Officer reports to the Audit Committee every quarter.",
+    "Transfers outside the European Economic Area follow the Standard Contractual Clauses.",
+]
+PII = [
+    "{name} approved the retention schedule on behalf of the board.",
+    "Requests should be sent to {email} within thirty days.",
+    "The breach originated from {ip} and was contained within an hour.",
+    "Contact {name} ({email}) if the audit log shows access from {ip}.",
+    "Minutes were taken by {name}.",
+]
+
+TIERS = ("regex", "tiered", "presidio")
+
+
+def synthetic_corpus(size: int, pii_fraction: float, seed: int) -> List[Tuple[str, Dict[str, List[str]]]]:
+    """(text, planted values by entity) pairs; most compliance text has no PII at all."""
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(size):
+        if rng.random() >= pii_fraction:
+            corpus.append((f"{rng.choice(CLEAN)} (ref {i})", {}))
+            continue
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        name = f"{first} {last}"
+        email = f"{first.lower()}.{last.lower()}{i}@example.com"
+        ip = f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}"
+        template = rng.choice(PII)
+        planted = {
+            entity: [value]
+            for entity, value, key in (("PERSON", name, "{name}"), ("EMAIL_ADDRESS", email, "{email}"), ("IP_ADDRESS", ip, "{ip}"))
+            if key in template
+        }
+        corpus.append((template.format(name=name, email=email, ip=ip), planted))
+    return corpus
+
+
+def build_tier(tier: str, batch_size: int) -> PIIRedactionService:
+    quiet = logging.getLogger("benchmark_pii")
+    quiet.setLevel(logging.WARNING)
+    # No memoization, so every pass does the full work
+    return PIIRedactionService(
+        logger=quiet,
+        cache_size=0,
+        batch_size=batch_size,
+        enable_presidio=tier != "regex",
+        person_gate=tier != "presidio",
+    )
+
+
+def run_tier(service: PIIRedactionService, texts: List[str], batch_size: int) -> Tuple[List[str], float]:
+    started = time.perf_counter()
+    out: List[str] = []
+    for start in range(0, len(texts), batch_size):
+        out.extend(service.redact_many(texts[start:start + batch_size]))
+    return out, time.perf_counter() - started
+
+
+def score(corpus: List[Tuple[str, Dict[str, List[str]]]], redacted: List[str]) -> Dict[str, Any]:
+    """Recall per entity (planted values no longer present) and how much clean text was left alone."""
+    found: Dict[str, List[int]] = {}
+    clean_kept = clean_total = 0
+    for (text, planted), out in zip(corpus, redacted):
+        if not planted:
+            clean_total += 1
+            clean_kept += int(out == text)
+        for entity, values in planted.items():
+            hits = found.setdefault(entity, [0, 0])
+            hits[0] += sum(1 for v in values if v not in out)
+            hits[1] += len(values)
+    result: Dict[str, Any] = {f"recall_{e.lower()}": round(h / max(t, 1), 3) for e, (h, t) in sorted(found.items())}
+    result["clean_unchanged"] = round(clean_kept / max(clean_total, 1), 3)
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compare PII redaction tiers: regex only, regex + gated Presidio, Presidio on every text"
+    )
+    parser.add_argument("--size", type=int, default=2000, help="Synthetic texts to redact")
+    parser.add_argument("--pii-fraction", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--tiers", nargs="+", default=list(TIERS), choices=TIERS)
+    parser.add_argument("--output", default=None, help="Write the results as JSON")
+    args = parser.parse_args()
+
+    corpus = synthetic_corpus(args.size, args.pii_fraction, args.seed)
+    texts = [t for t, _ in corpus]
+    gated = sum(1 for t in texts if may_contain_person(t))
+    print(f"{len(texts)} texts, {sum(1 for _, p in corpus if p)} with planted PII, {gated} pass the NER gate\n")
+
+    results = []
+    for tier in args.tiers:
+        try:
+            service = build_tier(tier, args.batch_size)
+        except Exception as exc:
+            print(f"{tier:<9} skipped: {type(exc).__name__}: {exc}")
+            continue
+        run_tier(service, texts[: args.batch_size], args.batch_size)  # warm up the pipeline
+        service.ner_texts = service.ner_skipped = 0
+        redacted, seconds = run_tier(service, texts, args.batch_size)
+        result = {
+            "tier": tier,
+            "seconds": round(seconds, 3),
+            "texts_per_s": round(len(texts) / max(seconds, 1e-9), 1),
+            "ner_texts": service.ner_texts,
+            **score(corpus, redacted),
+        }
+        results.append(result)
+        print(
+            f"{tier:<9} {result['texts_per_s']:>10.1f} texts/s  ner={result['ner_texts']:<6} "
+            + "  ".join(f"{k}={v}" for k, v in result.items() if k.startswith(("recall", "clean")))
+        )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"texts": len(texts), "pii_fraction": args.pii_fraction, "results": results}, f, indent=2)
+        print(f"\nWrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
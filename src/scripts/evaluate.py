@@ -1,48 +1,173 @@
 from __future__ import annotations
 
 import argparse
+import json
 import os
-from typing import Any, Dict, List
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List, Tuple
 
+import numpy as np
 import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
 
-from datasets import Dataset
-from ragas.evaluation import evaluate
-from ragas.metrics import faithfulness, answer_relevancy, context_precision
-from ragas.llms import LangchainLLMWrapper
-from langchain_openai import ChatOpenAI
+LATENCY_PERCENTILES = (50, 95, 99)
 
 
-def call_query(api_base: str, question: str, source: str | None, strict_privacy: bool) -> Dict[str, Any]:
+def make_session(parallelism: int) -> requests.Session:
+    """One keep-alive connection pool shared by every worker thread."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, parallelism))
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def call_query(
+    session: requests.Session, api_base: str, question: str, source: str | None, strict_privacy: bool
+) -> Tuple[Dict[str, Any], float]:
+    """POST one question; returns the response JSON and the wall-clock latency in ms."""
     url = f"{api_base.rstrip('/')}/api/v1/query"
     payload: Dict[str, Any] = {"query": question, "strict_privacy": strict_privacy}
     if source:
         payload["source"] = source
-    resp = requests.post(url, json=payload, timeout=120)
+    started = time.perf_counter()
+    resp = session.post(url, json=payload, timeout=120)
     resp.raise_for_status()
-    return resp.json()
+    out = resp.json()
+    return out, (time.perf_counter() - started) * 1000
+
+
+def load_checkpoint(path: str) -> Dict[int, Dict[str, Any]]:
+    """Answered questions from an earlier (possibly interrupted) run, keyed by row index."""
+    done: Dict[int, Dict[str, Any]] = {}
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # a line cut short by the interruption
+            done[int(record["index"])] = record
+    return done
+
 
+def collect_answers(
+    df_questions: pd.DataFrame,
+    api_base: str,
+    source: str | None,
+    strict_privacy: bool,
+    parallelism: int = 4,
+    checkpoint: str | None = None,
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """Ask every question, ``parallelism`` at a time, appending each answer to ``checkpoint``.
 
-def build_dataset(df_questions: pd.DataFrame, api_base: str, source: str | None, strict_privacy: bool) -> Dataset:
-    records: List[Dict[str, Any]] = []
-    for idx, row in df_questions.iterrows():
-        q = str(row["question"]).strip()
-        gt = str(row["ground_truth_answer"]).strip()
-        out = call_query(api_base, q, source=source, strict_privacy=strict_privacy)
-        answer = str(out.get("answer", "")).strip()
+    Questions already in the checkpoint (same row and text) are not asked
+    again; their records are marked ``resumed`` and left out of the latency
+    figures. Failed questions are reported but not checkpointed, so a re-run
+    retries them. Returns the records in CSV order and run statistics.
+    """
+    done = load_checkpoint(checkpoint) if checkpoint else {}
+    todo: List[Tuple[int, str, str]] = []
+    records: Dict[int, Dict[str, Any]] = {}
+    for idx, row in enumerate(df_questions.itertuples(index=False)):
+        q = str(row.question).strip()
+        gt = str(row.ground_truth_answer).strip()
+        previous = done.get(idx)
+        if previous is not None and previous.get("question") == q:
+            records[idx] = {**previous, "resumed": True}
+        else:
+            todo.append((idx, q, gt))
+
+    session = make_session(parallelism)
+    errors: Dict[int, str] = {}
+    out_file = open(checkpoint, "a", encoding="utf-8") if checkpoint else None
+
+    def ask(idx: int, q: str, gt: str) -> Dict[str, Any]:
+        out, latency_ms = call_query(session, api_base, q, source=source, strict_privacy=strict_privacy)
         citations = out.get("citations", []) or []
-        contexts = [str(c.get("text", "")) for c in citations if str(c.get("text", "")).strip()]
-        records.append({
+        return {
+            "index": idx,
             "question": q,
-            "answer": answer,
-            "contexts": contexts,
+            "answer": str(out.get("answer", "")).strip(),
+            "contexts": [str(c.get("text", "")) for c in citations if str(c.get("text", "")).strip()],
             "ground_truth": gt,
-        })
-    return Dataset.from_pandas(pd.DataFrame.from_records(records))
+            "latency_ms": round(latency_ms, 2),
+            "cache_hit": bool((out.get("cache") or {}).get("hit", False)),
+            "trace_id": out.get("trace_id", ""),
+        }
+
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, parallelism), thread_name_prefix="evaluate") as pool:
+            futures = {pool.submit(ask, *item): item[0] for item in todo}
+            for future in as_completed(futures):
+                idx = futures[future]
+                try:
+                    record = future.result()
+                except Exception as exc:
+                    errors[idx] = f"{type(exc).__name__}: {exc}"
+                    continue
+                records[idx] = record
+                if out_file is not None:
+                    out_file.write(json.dumps(record) + "\n")
+                    out_file.flush()
+    finally:
+        if out_file is not None:
+            out_file.close()
+        session.close()
+    elapsed = time.perf_counter() - started
+
+    answered = len(todo) - len(errors)
+    stats = {
+        "questions": len(df_questions),
+        "resumed": len(records) - answered,
+        "answered": answered,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "throughput_qps": round(answered / elapsed, 3) if elapsed > 0 and answered else 0.0,
+        "parallelism": parallelism,
+    }
+    return [records[i] for i in sorted(records)], stats
+
+
+def latency_summary(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """p50/p95/p99/mean/max latency in ms, overall and split by answer-cache hits.
+
+    Records resumed from a checkpoint were timed by an earlier run and are skipped.
+    """
+
+    def summarize_ms(values: List[float]) -> Dict[str, float]:
+        if not values:
+            return {}
+        arr = np.asarray(values, dtype=np.float64)
+        out = {f"p{p}_ms": round(float(np.percentile(arr, p)), 1) for p in LATENCY_PERCENTILES}
+        out.update(mean_ms=round(float(arr.mean()), 1), max_ms=round(float(arr.max()), 1), count=len(values))
+        return out
+
+    timed = [r for r in records if "latency_ms" in r and not r.get("resumed")]
+    return {
+        "all": summarize_ms([r["latency_ms"] for r in timed]),
+        "uncached": summarize_ms([r["latency_ms"] for r in timed if not r.get("cache_hit")]),
+        "cached": summarize_ms([r["latency_ms"] for r in timed if r.get("cache_hit")]),
+    }
+
 
+def build_dataset(records: List[Dict[str, Any]]) -> Any:
+    from datasets import Dataset
+
+    columns = ("question", "answer", "contexts", "ground_truth")
+    return Dataset.from_pandas(pd.DataFrame.from_records([{c: r[c] for c in columns} for r in records]))
+
+
+def run_ragas(ds: Any, model_name: str) -> pd.DataFrame:
+    from langchain_openai import ChatOpenAI
+    from ragas.evaluation import evaluate
+    from ragas.llms import LangchainLLMWrapper
+    from ragas.metrics import answer_relevancy, context_precision, faithfulness
 
-def run_ragas(ds: Dataset, model_name: str) -> pd.DataFrame:
     # OPENAI_API_KEY must be set in env
     base_llm = ChatOpenAI(model=model_name, temperature=0.0)
     llm = LangchainLLMWrapper(base_llm)
@@ -72,6 +197,32 @@ def check_quality_gate(aggregates: Dict[str, float], threshold: float = 0.85) ->
     return all(score >= threshold for score in aggregates.values())
 
 
+def check_latency_gate(
+    latency: Dict[str, Any],
+    max_p95_ms: float | None = None,
+    baseline: Dict[str, Any] | None = None,
+    tolerance: float = 0.2,
+) -> Tuple[bool, List[str]]:
+    """Fail if p95 exceeds ``max_p95_ms`` or any percentile regressed more than ``tolerance`` past the baseline.
+
+    Both sides use the uncached latencies when available, so cache hits don't
+    hide a slower pipeline. Returns (passed, reasons for failing).
+    """
+    current = latency.get("uncached") or latency.get("all") or {}
+    failures: List[str] = []
+    if max_p95_ms is not None and current.get("p95_ms", 0.0) > max_p95_ms:
+        failures.append(f"p95 {current['p95_ms']:.0f} ms > {max_p95_ms:.0f} ms")
+    if baseline:
+        reference = baseline.get("uncached") or baseline.get("all") or {}
+        for p in LATENCY_PERCENTILES:
+            key = f"p{p}_ms"
+            if key in current and reference.get(key):
+                limit = reference[key] * (1 + tolerance)
+                if current[key] > limit:
+                    failures.append(f"{key[:-3]} {current[key]:.0f} ms > baseline {reference[key]:.0f} ms +{tolerance:.0%}")
+    return not failures, failures
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(description="Evaluate RAG pipeline with Ragas")
     parser.add_argument("--csv", required=True, help="Path to golden_dataset.csv (columns: question, ground_truth_answer)")
@@ -81,10 +232,22 @@ def main() -> None:
     parser.add_argument("--strict-privacy", action="store_true", default=True)
     parser.add_argument("--no-strict-privacy", action="store_true", dest="no_strict_privacy")
     parser.add_argument("--threshold", type=float, default=0.85)
+    parser.add_argument("--parallelism", type=int, default=4, help="Questions in flight at once")
+    parser.add_argument(
+        "--checkpoint",
+        default=None,
+        help="Answers JSONL of an unfinished run to resume from and append to (default: next to the CSV); "
+        "removed once every question is answered and the report is written",
+    )
+    parser.add_argument("--fresh", action="store_true", help="Discard the checkpoint and ask every question again")
+    parser.add_argument("--skip-ragas", action="store_true", help="Only measure latency and throughput")
+    parser.add_argument("--max-p95-ms", type=float, default=None, help="Latency gate: absolute p95 limit")
+    parser.add_argument("--latency-baseline", default=None, help="Earlier _report.json to compare latency against")
+    parser.add_argument("--latency-tolerance", type=float, default=0.2, help="Allowed slowdown vs the baseline")
     args = parser.parse_args()
 
     strict_privacy = not args.no_strict_privacy
-    if not os.environ.get("OPENAI_API_KEY"):
+    if not args.skip_ragas and not os.environ.get("OPENAI_API_KEY"):
         raise SystemExit("OPENAI_API_KEY is required for Ragas LLM-based metrics")
 
     df_q = pd.read_csv(args.csv)
@@ -92,26 +255,72 @@ def main() -> None:
     if not expected_cols.issubset(set(df_q.columns)):
         raise SystemExit(f"CSV must contain columns: {expected_cols}")
 
-    print(f"Building evaluation dataset from {len(df_q)} questions …")
-    ds = build_dataset(df_q, api_base=args.api_base, source=args.source, strict_privacy=strict_privacy)
-    print("Running Ragas metrics (faithfulness, answer_relevancy, context_precision) …")
-    df_scores = run_ragas(ds, model_name=args.model)
+    stem = os.path.splitext(args.csv)[0]
+    checkpoint = args.checkpoint or stem + "_answers.jsonl"
+    if args.fresh and os.path.exists(checkpoint):
+        os.remove(checkpoint)
 
-    aggregates = summarize(df_scores)
-    print("\nAggregate Scores:")
-    for k, v in aggregates.items():
-        print(f"- {k}: {v:.3f}")
+    print(f"Asking {len(df_q)} questions, {args.parallelism} at a time (checkpoint: {checkpoint}) …")
+    records, stats = collect_answers(
+        df_q,
+        api_base=args.api_base,
+        source=args.source,
+        strict_privacy=strict_privacy,
+        parallelism=args.parallelism,
+        checkpoint=checkpoint,
+    )
+    print(
+        f"Answered {stats['answered']} in {stats['seconds']:.1f}s ({stats['throughput_qps']:.2f} q/s), "
+        f"resumed {stats['resumed']}, failed {len(stats['errors'])}"
+    )
+    for idx, error in sorted(stats["errors"].items()):
+        print(f"  row {idx}: {error}")
 
-    ok = check_quality_gate(aggregates, threshold=args.threshold)
-    print(f"\nQuality Gate (>= {args.threshold:.2f} across all): {'PASS' if ok else 'FAIL'}")
+    latency = latency_summary(records)
+    print("\nLatency (ms):")
+    for group, values in latency.items():
+        if values:
+            print(f"- {group:<8} " + "  ".join(f"{k[:-3]}={values[k]:.0f}" for k in values if k.endswith("_ms")))
 
-    # Save a simple report CSV next to input
-    out_path = os.path.splitext(args.csv)[0] + "_ragas_report.csv"
-    df_scores.to_csv(out_path, index=False)
-    print(f"\nPer-sample scores written to: {out_path}")
+    report: Dict[str, Any] = {"run": stats, "latency": latency}
+    if not args.skip_ragas:
+        if not records:
+            raise SystemExit("No answers to score")
+        print("\nRunning Ragas metrics (faithfulness, answer_relevancy, context_precision) …")
+        df_scores = run_ragas(build_dataset(records), model_name=args.model)
+        df_scores["latency_ms"] = [r.get("latency_ms") for r in records]
 
+        aggregates = summarize(df_scores)
+        report["scores"] = aggregates
+        print("\nAggregate Scores:")
+        for k, v in aggregates.items():
+            print(f"- {k}: {v:.3f}")
 
-if __name__ == "__main__":
-    main()
+        ok = check_quality_gate(aggregates, threshold=args.threshold)
+        print(f"\nQuality Gate (>= {args.threshold:.2f} across all): {'PASS' if ok else 'FAIL'}")
+
+        # Save a simple report CSV next to input
+        out_path = stem + "_ragas_report.csv"
+        df_scores.to_csv(out_path, index=False)
+        print(f"\nPer-sample scores written to: {out_path}")
+
+    if args.max_p95_ms is not None or args.latency_baseline:
+        baseline = None
+        if args.latency_baseline:
+            with open(args.latency_baseline, encoding="utf-8") as f:
+                baseline = json.load(f).get("latency")
+        ok, reasons = check_latency_gate(latency, args.max_p95_ms, baseline, args.latency_tolerance)
+        print(f"\nLatency Gate: {'PASS' if ok else 'FAIL'}" + "".join(f"\n  {r}" for r in reasons))
 
+    report_path = stem + "_report.json"
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Run report (use as --latency-baseline next time): {report_path}")
 
+    # The checkpoint only exists to resume an unfinished run: the next run asks everything again
+    if not stats["errors"] and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+
+
+if __name__ == "__main__":
+    main()
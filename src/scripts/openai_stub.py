@@ -0,0 +1,237 @@
+"""A local stand-in for the OpenAI embeddings and chat endpoints, for tests and offline runs.
+
+    python -m src.scripts.openai_stub --port 8099 --error-rate 0.1
+    OPENAI_BASE_URL=http://127.0.0.1:8099/v1 USE_OPENAI_EMBEDDINGS=true ...
+
+Vectors are deterministic per text (unit length, seeded from its hash), so
+repeated runs embed identically. Like the real API it rejects requests over
+the input-count limit, and it can inject 429/500 errors and latency. Chat
+completions (plain or streamed) answer by quoting the first source in the
+prompt, so citations survive a round trip.
+"""
+from __future__ import annotations
+
+import argparse
+import base64
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+
+import numpy as np
+
+from src.services.openai_embeddings import MAX_INPUTS_PER_REQUEST
+
+
+def stub_vector(text: str, dimensions: int) -> np.ndarray:
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    vector = np.random.default_rng(seed).standard_normal(dimensions).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+# A context passage runs until the next passage or a blank line
+_PROMPT_SOURCE = re.compile(
+    r"Source: (?P<source>[^,\n]+), Page: (?P<page>\d+)[^\n]*\nContent: (?P<content>.*?)(?=\nSource: |\n\s*\n|\Z)", re.S
+)
+
+
+def stub_answer(messages: List[Dict[str, Any]]) -> str:
+    """The first context passage in the prompt, quoted with its citation."""
+    prompt = "\n".join(str(m.get("content", "")) for m in messages)
+    match = _PROMPT_SOURCE.search(prompt)
+    if match is None:
+        return "No answer found in the provided context."
+    passage = " ".join(match["content"].split())
+    return f"{passage} [Source: {match['source']}, Page: {match['page']}]"
+
+
+class StubState:
+    """Configuration and counters shared by the request handlers."""
+
+    def __init__(self, dimensions: int = 3072, error_rate: float = 0.0, latency: float = 0.0, seed: int = 0) -> None:
+        self.dimensions = dimensions
+        self.error_rate = error_rate
+        self.latency = latency
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.chat_requests = 0
+        self.errors = 0
+        self.inputs = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.fail_next: List[int] = []  # status codes to return for the next requests, in order
+        self.lock = threading.Lock()
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "chat_requests": self.chat_requests,
+                "errors": self.errors,
+                "inputs": self.inputs,
+                "max_in_flight": self.max_in_flight,
+            }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "StubServer"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _reply(self, status: int, body: Dict[str, Any], headers: Dict[str, str] | None = None) -> None:
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _error(self, status: int, message: str, headers: Dict[str, str] | None = None) -> None:
+        self._reply(status, {"error": {"message": message, "type": "stub_error", "code": status}}, headers)
+
+    def do_POST(self) -> None:
+        path = self.path.rstrip("/")
+        if path not in ("/v1/embeddings", "/embeddings", "/v1/chat/completions", "/chat/completions"):
+            self._error(404, f"Unknown path {self.path}")
+            return
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if path.endswith("/chat/completions"):
+            self._chat(request)
+            return
+        texts = request.get("input")
+        texts = [texts] if isinstance(texts, str) else list(texts or [])
+        state = self.server.state
+        with state.lock:
+            state.requests += 1
+            state.in_flight += 1
+            state.max_in_flight = max(state.max_in_flight, state.in_flight)
+            forced = state.fail_next.pop(0) if state.fail_next else None
+            if forced is None and state.random.random() < state.error_rate:
+                forced = state.random.choice([429, 500])
+        try:
+            if state.latency:
+                time.sleep(state.latency)
+            if forced:
+                with state.lock:
+                    state.errors += 1
+                self._error(forced, "Injected failure", {"Retry-After": "0"} if forced == 429 else None)
+                return
+            if not texts or len(texts) > MAX_INPUTS_PER_REQUEST:
+                self._error(400, f"'input' must have 1 to {MAX_INPUTS_PER_REQUEST} items, got {len(texts)}")
+                return
+            base64_output = request.get("encoding_format") == "base64"
+            data = []
+            for i, text in enumerate(texts):
+                vector = stub_vector(str(text), state.dimensions)
+                embedding = base64.b64encode(vector.tobytes()).decode("ascii") if base64_output else vector.tolist()
+                data.append({"object": "embedding", "index": i, "embedding": embedding})
+            tokens = sum(max(1, len(str(t)) // 4) for t in texts)
+            with state.lock:
+                state.inputs += len(texts)
+            self._reply(
+                200,
+                {
+                    "object": "list",
+                    "data": data,
+                    "model": request.get("model", ""),
+                    "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+                },
+            )
+        finally:
+            with state.lock:
+                state.in_flight -= 1
+
+
+    def _chat(self, request: Dict[str, Any]) -> None:
+        state = self.server.state
+        with state.lock:
+            state.chat_requests += 1
+            forced = state.fail_next.pop(0) if state.fail_next else None
+        if state.latency:
+            time.sleep(state.latency)
+        if forced:
+            with state.lock:
+                state.errors += 1
+            self._error(forced, "Injected failure", {"Retry-After": "0"} if forced == 429 else None)
+            return
+        answer = stub_answer(request.get("messages") or [])
+        created = int(time.time())
+        model = request.get("model", "")
+        if not request.get("stream"):
+            self._reply(200, {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": answer}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+            })
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        words = re.findall(r"\S+\s*", answer)
+        for i, word in enumerate(words):
+            chunk = {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "delta": {"content": word},
+                    "finish_reason": "stop" if i == len(words) - 1 else None,
+                }],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.close_connection = True
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, state: StubState | None = None) -> None:
+        super().__init__((host, port), _Handler)
+        self.state = state or StubState()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "StubServer":
+        """Serve on a background thread (for tests); stop with ``shutdown()``."""
+        threading.Thread(target=self.serve_forever, name="openai-stub", daemon=True).start()
+        return self
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve a local stub of the OpenAI embeddings and chat APIs")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--dimensions", type=int, default=3072)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests failing with 429/500")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every request")
+    args = parser.parse_args()
+
+    server = StubServer(args.host, args.port, StubState(args.dimensions, args.error_rate, args.latency))
+    print(f"OpenAI stub listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(json.dumps(server.state.stats()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+_TRAILING_PUNCT = re.compile(r"[\s?!.]+$")
+
+
+def normalize_query(query: str) -> str:
+    """Case-folded, whitespace-collapsed query without trailing punctuation."""
+    return _TRAILING_PUNCT.sub("", " ".join(query.lower().split()))
+
+
+def answer_key(query: str, source: str | None, strict_privacy: bool, policy: str) -> str:
+    parts = (normalize_query(query), source or "", str(int(strict_privacy)), policy)
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+class AnswerCache:
+    """On-disk cache of final query answers, shared by every worker on the host.
+
+    Entries are keyed by (normalized query, source filter, strict_privacy,
+    redaction policy). ``lookup`` can also serve near-duplicate questions
+    whose query embeddings are within a cosine-similarity threshold; it only
+    compares entries with the same source, privacy mode and policy, so a hit
+    never relaxes redaction. Entries expire after ``ttl_seconds``; beyond
+    ``max_entries`` the least recently used ones are evicted.
+    """
+
+    def __init__(self, path: str, max_entries: int = 5_000, ttl_seconds: float = 86_400) -> None:
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS answers ("
+            " key TEXT PRIMARY KEY, source TEXT NOT NULL, strict INTEGER NOT NULL, policy TEXT NOT NULL,"
+            " model TEXT, embedding BLOB, answer TEXT NOT NULL, citations TEXT NOT NULL,"
+            " groundedness REAL NOT NULL, created_at REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS answers_scope ON answers (source, strict, policy)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS answers_last_used ON answers (last_used)")
+        self._conn.commit()
+
+    def _entry(self, row: sqlite3.Row, match: str, similarity: float | None, now: float) -> Dict[str, Any]:
+        self._conn.execute("UPDATE answers SET last_used = ? WHERE key = ?", (now, row["key"]))
+        self._conn.commit()
+        return {
+            "answer": row["answer"],
+            "citations": json.loads(row["citations"]),
+            "groundedness": row["groundedness"],
+            "match": match,
+            "similarity": similarity,
+            "age_seconds": now - row["created_at"],
+        }
+
+    def _get_exact(self, key: str, now: float) -> Dict[str, Any] | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM answers WHERE key = ? AND created_at >= ?", (key, now - self.ttl_seconds)
+            ).fetchone()
+            return self._entry(row, "exact", None, now) if row is not None else None
+
+    def _get_similar(
+        self, embedding: List[float], model: str, scope: tuple, min_similarity: float, now: float
+    ) -> Dict[str, Any] | None:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM answers WHERE source = ? AND strict = ? AND policy = ? AND model = ?"
+                " AND embedding IS NOT NULL AND created_at >= ?",
+                (*scope, model, now - self.ttl_seconds),
+            ).fetchall()
+            if not rows:
+                return None
+            matrix = np.stack([np.frombuffer(r["embedding"], dtype=np.float32) for r in rows])
+            q = np.asarray(embedding, dtype=np.float32)
+            sims = matrix @ q / (np.linalg.norm(matrix, axis=1) * np.linalg.norm(q) + 1e-12)
+            best = int(np.argmax(sims))
+            if float(sims[best]) < min_similarity:
+                return None
+            return self._entry(rows[best], "similar", float(sims[best]), now)
+
+    def lookup(
+        self,
+        query: str,
+        source: str | None,
+        strict_privacy: bool,
+        policy: str,
+        embed: Callable[[str], List[float]] | None = None,
+        model: str | None = None,
+        min_similarity: float = 0.0,
+    ) -> tuple[Dict[str, Any] | None, List[float] | None]:
+        """Return ``(entry, query embedding)``.
+
+        Tries an exact match on the normalized query first. On a miss, and only
+        when ``min_similarity`` > 0, embeds the query with ``embed`` and looks
+        for a near-duplicate; the embedding is returned so a miss can reuse it.
+        """
+        now = time.time()
+        entry = self._get_exact(answer_key(query, source, strict_privacy, policy), now)
+        embedding = None
+        if entry is None and min_similarity > 0 and embed is not None and model is not None:
+            embedding = embed(query)
+            scope = (source or "", int(strict_privacy), policy)
+            entry = self._get_similar(embedding, model, scope, min_similarity, now)
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry, embedding
+
+    def put(
+        self,
+        query: str,
+        source: str | None,
+        strict_privacy: bool,
+        policy: str,
+        answer: str,
+        citations: List[Dict[str, Any]],
+        groundedness: float,
+        embedding: List[float] | None = None,
+        model: str | None = None,
+    ) -> None:
+        now = time.time()
+        blob = np.asarray(embedding, dtype=np.float32).tobytes() if embedding is not None else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    answer_key(query, source, strict_privacy, policy),
+                    source or "",
+                    int(strict_privacy),
+                    policy,
+                    model if blob is not None else None,
+                    blob,
+                    answer,
+                    json.dumps(citations),
+                    groundedness,
+                    now,
+                    now,
+                ),
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float) -> None:
+        self._conn.execute("DELETE FROM answers WHERE created_at < ?", (now - self.ttl_seconds,))
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM answers WHERE rowid IN"
+                " (SELECT rowid FROM answers ORDER BY last_used ASC LIMIT ?)",
+                (excess,),
+            )
+
+    def invalidate_source(self, source: str) -> int:
+        """Drop answers that could depend on ``source``: those filtered to it and all unfiltered ones."""
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM answers WHERE source = ? OR source = ''", (source,))
+            self._conn.commit()
+        return cursor.rowcount
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
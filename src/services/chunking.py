@@ -0,0 +1,284 @@
+from __future__ import annotations
+
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Iterator, List, Sequence
+
+from src.core.config import settings
+
+logger = logging.getLogger("uvicorn.error")
+
+TokenCounter = Callable[[List[str]], List[int]]
+
+# Separator between the headings of a chunk's section path
+SECTION_SEPARATOR = " > "
+
+CHUNK_STRATEGIES = ("structured", "recursive")
+
+# "1. Scope", "4.2.1 Access control", "Section 3.1 Retention", "§ 12 Penalties"
+_NUMBERED = re.compile(r"^(?:(?:section|article|clause|§)\s*)?(\d{1,3}(?:\.\d{1,3})*)[.)]?\s+([A-Za-z(\"'].*)$", re.I)
+# "CHAPTER II", "Article 5 - Security of processing", "Annex A"
+_KEYWORD = re.compile(
+    r"^(part|chapter|title|annex|appendix|schedule|article|section)\s+([ivxlc]+|\d{1,3}|[a-z])\b[.:\s–-]*(.*)$",
+    re.I,
+)
+_KEYWORD_LEVELS = {"part": 1, "chapter": 1, "title": 1, "annex": 1, "appendix": 1, "schedule": 1, "article": 2, "section": 2}
+_MARKDOWN = re.compile(r"^(#{1,6})\s+(\S.*)$")
+# "(a) ...", "a) ...", "(iv) ..." start a new clause without being a heading
+_LETTERED = re.compile(r"^\(?([a-z]|[ivx]{1,4})\)\s+\S")
+_SENTENCE_END = re.compile(r"(?<=[.!?;])\s+")
+
+
+@dataclass
+class Chunk:
+    text: str
+    page_start: int  # 1-based
+    page_end: int
+    section: List[str] = field(default_factory=list)  # heading path, outermost first
+    tokens: int = 0
+
+    @property
+    def section_path(self) -> str:
+        return SECTION_SEPARATOR.join(self.section)
+
+
+@dataclass
+class _Unit:
+    """A paragraph, clause or heading: the smallest piece the chunker moves around."""
+
+    text: str
+    page: int
+    section: List[str]
+    heading: bool = False
+    tokens: int = 0
+
+
+def heading_level(line: str) -> tuple[int, str] | None:
+    """``(level, title)`` if the line looks like a section heading, lower levels being outer."""
+    line = line.strip()
+    if not line or len(line) > 120:
+        return None
+    m = _MARKDOWN.match(line)
+    if m and not line.endswith((".", "!", "?", ";")):
+        return len(m.group(1)), m.group(2).strip()
+    m = _KEYWORD.match(line)
+    if m:
+        return _KEYWORD_LEVELS[m.group(1).lower()], line
+    m = _NUMBERED.match(line)
+    if m:
+        title = m.group(2).strip()
+        # Long or sentence-like numbered lines are clauses, not headings
+        if len(title) <= 80 and (not title.endswith((".", ";", ",", ":")) or len(title.split()) <= 6):
+            return 2 + m.group(1).count("."), line
+        return None
+    letters = [c for c in line if c.isalpha()]
+    if len(letters) >= 4 and line.isupper() and len(line) <= 80 and not line.endswith((".", ",", ";")):
+        return 1, line
+    return None
+
+
+def _starts_clause(line: str) -> bool:
+    line = line.strip()
+    return bool(_NUMBERED.match(line) or _LETTERED.match(line))
+
+
+class StructuredChunker:
+    """Token-budgeted chunks that follow the document's headings and clauses.
+
+    Pages are split into units (headings, numbered or lettered clauses and
+    blank-line paragraphs), each tagged with the heading path in force. Units
+    are packed into chunks of at most ``chunk_tokens`` tokens; a heading
+    starts a new chunk once the current one has ``min_tokens``, and units
+    flow across page breaks unless ``cross_pages`` is off. Consecutive chunks
+    of one section share up to ``overlap_tokens`` of trailing units.
+    """
+
+    def __init__(
+        self,
+        count_tokens: TokenCounter,
+        chunk_tokens: int = 256,
+        overlap_tokens: int = 32,
+        min_tokens: int = 48,
+        cross_pages: bool = True,
+    ) -> None:
+        if chunk_tokens <= overlap_tokens:
+            raise ValueError("CHUNK_TOKENS must be larger than CHUNK_OVERLAP_TOKENS")
+        self.count_tokens = count_tokens
+        self.chunk_tokens = chunk_tokens
+        self.overlap_tokens = overlap_tokens
+        self.min_tokens = min_tokens
+        self.cross_pages = cross_pages
+
+    @staticmethod
+    def _flush(lines: List[str], units: List[_Unit], page_number: int, stack: List[tuple[int, str]]) -> None:
+        """Close the buffered paragraph ``lines`` into a unit under the current heading path."""
+        if lines:
+            units.append(_Unit("\n".join(lines), page_number, [t for _, t in stack]))
+            lines.clear()
+
+    def _iter_units(self, pages: Iterable[str]) -> Iterator[_Unit]:
+        stack: List[tuple[int, str]] = []
+        for page_number, text in enumerate(pages, start=1):
+            units: List[_Unit] = []
+            lines: List[str] = []
+            for raw in text.splitlines():
+                line = raw.strip()
+                if not line:
+                    self._flush(lines, units, page_number, stack)
+                    continue
+                heading = heading_level(line)
+                if heading is not None:
+                    self._flush(lines, units, page_number, stack)
+                    level, title = heading
+                    while stack and stack[-1][0] >= level:
+                        stack.pop()
+                    stack.append((level, title))
+                    units.append(_Unit(line, page_number, [t for _, t in stack], heading=True))
+                    continue
+                if _starts_clause(line):
+                    self._flush(lines, units, page_number, stack)
+                lines.append(line)
+            self._flush(lines, units, page_number, stack)
+            # One tokenizer call per page
+            for unit, tokens in zip(units, self.count_tokens([u.text for u in units]) if units else []):
+                unit.tokens = tokens
+                yield unit
+
+    def _split_oversized(self, unit: _Unit, limit: int) -> List[_Unit]:
+        """Sentence-packed pieces of a unit over ``limit`` tokens; word windows for run-on sentences."""
+        sentences = [s for s in _SENTENCE_END.split(unit.text) if s.strip()]
+        counts = self.count_tokens(sentences)
+        pieces: List[tuple[str, int]] = []
+        for sentence, tokens in zip(sentences, counts):
+            if tokens <= limit:
+                pieces.append((sentence, tokens))
+                continue
+            words = sentence.split()
+            step = max(1, len(words) * limit // max(tokens, 1))
+            windows = [" ".join(words[i:i + step]) for i in range(0, len(words), step)]
+            pieces.extend(zip(windows, self.count_tokens(windows)))
+        out: List[_Unit] = []
+        text, total = "", 0
+        for piece, tokens in pieces:
+            if text and total + tokens > limit:
+                out.append(_Unit(text, unit.page, unit.section, tokens=total))
+                text, total = "", 0
+            text = f"{text} {piece}" if text else piece
+            total += tokens
+        if text:
+            out.append(_Unit(text, unit.page, unit.section, tokens=total))
+        return out
+
+    def split(self, pages: Sequence[str]) -> List[Chunk]:
+        return list(self.iter_chunks(pages))
+
+    def iter_chunks(self, pages: Iterable[str]) -> Iterator[Chunk]:
+        """Chunks in document order, consuming ``pages`` lazily (at most one open chunk is buffered)."""
+        limit = self.chunk_tokens - self.overlap_tokens
+        units = (
+            piece
+            for unit in self._iter_units(pages)
+            for piece in (self._split_oversized(unit, limit) if unit.tokens > limit else [unit])
+        )
+        current: List[_Unit] = []
+        fresh = 0  # index of the first unit not carried over as overlap
+
+        def _chunk() -> Chunk | None:
+            new = current[fresh:]
+            if not new:
+                return None
+            return Chunk(
+                text="\n".join(u.text for u in current),
+                page_start=min(u.page for u in current),
+                page_end=max(u.page for u in current),
+                section=list(new[0].section),
+                tokens=sum(u.tokens for u in current),
+            )
+
+        for unit in units:
+            size = sum(u.tokens for u in current)
+            new_page = bool(current) and not self.cross_pages and unit.page != current[-1].page
+            new_section = unit.heading and size >= self.min_tokens
+            if current and (size + unit.tokens > self.chunk_tokens or new_page or new_section):
+                chunk = _chunk()
+                if chunk is not None:
+                    yield chunk
+                carry: List[_Unit] = []
+                if not (unit.heading or new_page) and unit.section == current[-1].section:
+                    for u in reversed(current):
+                        if sum(c.tokens for c in carry) + u.tokens > self.overlap_tokens or u.heading:
+                            break
+                        carry.insert(0, u)
+                current, fresh = carry, len(carry)
+            current.append(unit)
+        chunk = _chunk()
+        if chunk is not None:
+            yield chunk
+
+
+def iter_recursive_chunks(pages: Iterable[str], chunk_size: int = 800, chunk_overlap: int = 120) -> Iterator[Chunk]:
+    """The previous per-page, character-based splitting (CHUNK_STRATEGY=recursive)."""
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    for page_number, page in enumerate(pages, start=1):
+        for text in splitter.split_text(page):
+            yield Chunk(text=text, page_start=page_number, page_end=page_number)
+
+
+def recursive_chunks(pages: Sequence[str], chunk_size: int = 800, chunk_overlap: int = 120) -> List[Chunk]:
+    return list(iter_recursive_chunks(pages, chunk_size, chunk_overlap))
+
+
+def approximate_token_counter(texts: List[str]) -> List[int]:
+    """About four characters per token, for when no tokenizer is available."""
+    return [max(1, len(t) // 4) if t else 0 for t in texts]
+
+
+def openai_token_counter() -> TokenCounter:
+    """Token counts for OpenAI embedding models (tiktoken, or the approximation without it)."""
+    try:
+        import tiktoken
+    except ImportError:
+        logger.warning("tiktoken is not installed; OpenAI token counts are approximate")
+        return approximate_token_counter
+    encoding = tiktoken.get_encoding("cl100k_base")
+    return lambda texts: [len(ids) for ids in encoding.encode_batch(texts)]
+
+
+def load_token_counter() -> TokenCounter:
+    """Token counts from the embedding model's tokenizer (tiktoken for OpenAI embeddings)."""
+    if settings.USE_OPENAI_EMBEDDINGS:
+        return openai_token_counter()
+    from transformers import AutoTokenizer
+
+    # Only the tokenizer: chunking must not load the embedding model itself
+    tokenizer = AutoTokenizer.from_pretrained(settings.EMBEDDING_MODEL)
+    return lambda texts: [len(ids) for ids in tokenizer(texts, add_special_tokens=False, verbose=False)["input_ids"]]
+
+
+class Chunker:
+    """The configured chunking strategy behind ``split(pages) -> List[Chunk]``."""
+
+    def __init__(self, strategy: str = "structured", count_tokens: TokenCounter | None = None) -> None:
+        if strategy not in CHUNK_STRATEGIES:
+            raise ValueError(f"Unknown CHUNK_STRATEGY {strategy!r} (expected one of {', '.join(CHUNK_STRATEGIES)})")
+        self.strategy = strategy
+        self._structured = None
+        if strategy == "structured":
+            self._structured = StructuredChunker(
+                count_tokens or load_token_counter(),
+                chunk_tokens=settings.CHUNK_TOKENS,
+                overlap_tokens=settings.CHUNK_OVERLAP_TOKENS,
+                min_tokens=settings.CHUNK_MIN_TOKENS,
+                cross_pages=settings.CHUNK_CROSS_PAGES,
+            )
+
+    def split(self, pages: Sequence[str]) -> List[Chunk]:
+        return list(self.iter_chunks(pages))
+
+    def iter_chunks(self, pages: Iterable[str]) -> Iterator[Chunk]:
+        if self._structured is not None:
+            return self._structured.iter_chunks(pages)
+        return iter_recursive_chunks(pages)
@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+from typing import Any
+
+# Same runtimes as the reranker: fp32 torch, torch dynamic int8, and ONNX
+# Runtime (fp32 or int8) exported once to ONNX_CACHE_DIR
+EMBEDDING_BACKENDS = ("torch", "int8", "onnx", "onnx-int8")
+
+
+def embedding_model_id(model_name: str, backend: str) -> str:
+    """Embedding-cache key for a local model: quantized vectors are cached apart from fp32 ones."""
+    return model_name if backend == "torch" else f"{model_name}@{backend}"
+
+
+def load_sentence_encoder(model_name: str, backend: str = "torch") -> Any:
+    """A CPU sentence encoder exposing ``SentenceTransformer.encode`` for the given backend."""
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown EMBEDDING_BACKEND {backend!r} (expected one of {', '.join(EMBEDDING_BACKENDS)})")
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(model_name, device="cpu")
+    if backend == "int8":
+        import torch
+
+        torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    elif backend.startswith("onnx"):
+        from src.services.onnx_backend import OnnxSentenceEncoder
+
+        return OnnxSentenceEncoder.from_sentence_transformer(model, model_name, quantize=backend == "onnx-int8")
+    return model
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, Iterator
+
+import fitz  # PyMuPDF
+import pytesseract
+from PIL import Image
+
+# Pages with less extractable text than this are treated as image-only and OCR'd
+MIN_TEXT_CHARS = 10
+
+# Per-process state for pool workers: each worker opens the PDF once
+_worker_doc: Any = None
+_worker_ocr_dpi: int = 72
+
+
+@dataclass
+class PageText:
+    page_number: int  # 1-based
+    text: str
+    ocr: bool
+    seconds: float
+
+
+def extract_page(doc: Any, index: int, ocr_dpi: int) -> PageText:
+    """Extract one page's text, falling back to Tesseract OCR for image-only pages."""
+    start = time.perf_counter()
+    page = doc[index]
+    text = page.get_text("text") or ""
+    ocr = False
+    if len(text.strip()) < MIN_TEXT_CHARS:
+        pix = page.get_pixmap(dpi=ocr_dpi, alpha=False)
+        img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+        text = pytesseract.image_to_string(img, config='--oem 1 --psm 6') or ""
+        ocr = bool(text.strip())
+    return PageText(page_number=index + 1, text=text, ocr=ocr, seconds=time.perf_counter() - start)
+
+
+def _init_worker(file_path: str, ocr_dpi: int) -> None:
+    global _worker_doc, _worker_ocr_dpi
+    _worker_doc = fitz.open(file_path)
+    _worker_ocr_dpi = ocr_dpi
+
+
+def _extract_in_worker(index: int) -> PageText:
+    return extract_page(_worker_doc, index, _worker_ocr_dpi)
+
+
+def read_metadata(file_path: str) -> tuple[int, Dict[str, Any]]:
+    """``(page_count, metadata)`` without extracting any text."""
+    doc = fitz.open(file_path)
+    try:
+        return doc.page_count, dict(doc.metadata or {})
+    finally:
+        doc.close()
+
+
+def resolve_workers(workers: int, page_count: int) -> int:
+    """Worker processes for a document: ``workers`` <= 0 means one per CPU, never more than pages."""
+    return max(1, min(workers if workers > 0 else (os.cpu_count() or 1), page_count))
+
+
+def iter_pages(file_path: str, workers: int = 0, ocr_dpi: int = 72) -> Iterator[PageText]:
+    """Yield a PDF's pages in page order as they are extracted.
+
+    Single-worker runs stay in-process. Otherwise spawned (never forked, so
+    they do not inherit the API process's model threads) pool workers extract
+    at most two pages each ahead of the consumer, so memory stays bounded
+    however long the document is. Closing the generator stops the pool.
+    """
+    doc = fitz.open(file_path)
+    try:
+        page_count = doc.page_count
+        workers = resolve_workers(workers, page_count)
+        if workers == 1:
+            for i in range(page_count):
+                yield extract_page(doc, i, ocr_dpi)
+            return
+    finally:
+        doc.close()
+
+    pool = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(file_path, ocr_dpi),
+    )
+    try:
+        pending: Deque[Future[PageText]] = deque()
+        next_index = 0
+        while next_index < page_count and len(pending) < workers * 2:
+            pending.append(pool.submit(_extract_in_worker, next_index))
+            next_index += 1
+        while pending:
+            page = pending.popleft().result()
+            if next_index < page_count:
+                pending.append(pool.submit(_extract_in_worker, next_index))
+                next_index += 1
+            yield page
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
@@ -0,0 +1,317 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, wait
+from typing import Any, Callable, Dict, List
+from uuid import uuid4
+
+from src.core.concurrency import get_executor
+from src.core.metrics import INGEST_JOBS, INGESTS_RUNNING
+from src.services.ingestion_service import IngestCancelled, IngestionService, IngestProgress
+from src.services.retrieval import normalize_source
+
+PROGRESS_COUNTERS = (
+    "pages_total",
+    "pages_extracted",
+    "ocr_pages",
+    "chunks_total",
+    "chunks_embedded",
+    "objects_written",
+)
+FINISHED_STATUSES = ("succeeded", "failed", "cancelled")
+INTERRUPTED = "Interrupted by shutdown"
+
+
+class IngestQueueFull(Exception):
+    """Raised by ``IngestJobQueue.submit`` when no queue slot is free."""
+
+
+def _discard(file_path: str) -> None:
+    try:
+        os.remove(file_path)
+    except FileNotFoundError:
+        pass
+
+
+def build_result(service: Any, file_path: str) -> Dict[str, Any]:
+    """Response payload for a finished ingest, read from the service's last-run counters."""
+    chunks = getattr(service, "_last_chunks_count", 0)
+    ocr_pages = getattr(service, "_last_ocr_pages", 0)
+    unchanged = getattr(service, "_last_unchanged", False)
+    if unchanged:
+        msg = "Unchanged"
+    else:
+        msg = "Success" if chunks > 0 else "No text extracted"
+    # Back-compat: return both new and old keys so the frontend never sees undefined
+    return {
+        "message": msg,
+        "document_id": normalize_source(file_path),
+        "chunks_count": chunks,
+        "ocr_pages_count": ocr_pages,
+        "inserted_count": getattr(service, "_last_inserted_count", 0),
+        "failed_count": getattr(service, "_last_failed_count", 0),
+        "extraction_seconds": round(getattr(service, "_last_extraction_seconds", 0.0), 3),
+        "deleted_count": getattr(service, "_last_deleted_count", 0),
+        "unchanged": unchanged,
+        "trace_id": getattr(service, "_last_trace_id", None),
+        "chunks": chunks,
+        "ocr_pages": ocr_pages,
+    }
+
+
+class IngestJobStore:
+    """SQLite-backed job records, shared by every worker process on the host.
+
+    Status and cancellation requests live here rather than in memory, so a
+    progress poll or cancel can land on any gunicorn worker.
+    """
+
+    def __init__(self, path: str) -> None:
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS ingest_jobs ("
+            " id TEXT PRIMARY KEY, document_id TEXT NOT NULL, file_path TEXT NOT NULL,"
+            " status TEXT NOT NULL, stage TEXT NOT NULL, progress TEXT NOT NULL,"
+            " result TEXT, error TEXT, cancel_requested INTEGER NOT NULL DEFAULT 0,"
+            " created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def create(self, file_path: str, source: str | None = None) -> str:
+        job_id = uuid4().hex
+        now = time.time()
+        progress = json.dumps({k: 0 for k in PROGRESS_COUNTERS})
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO ingest_jobs (id, document_id, file_path, status, stage, progress, created_at, updated_at)"
+                " VALUES (?, ?, ?, 'queued', 'queued', ?, ?, ?)",
+                (job_id, normalize_source(source or file_path), file_path, progress, now, now),
+            )
+            self._conn.commit()
+        return job_id
+
+    def update(self, job_id: str, **fields: Any) -> None:
+        self._update(job_id, None, fields)
+
+    def transition(self, job_id: str, from_status: str, **fields: Any) -> bool:
+        """Update the job only while its status is ``from_status``; True if it was.
+
+        One conditional UPDATE, so two workers (or a cancel and a worker)
+        cannot both move a job out of the same status.
+        """
+        return self._update(job_id, from_status, fields)
+
+    def _update(self, job_id: str, from_status: str | None, fields: Dict[str, Any]) -> bool:
+        for key in ("progress", "result"):
+            if key in fields and fields[key] is not None:
+                fields[key] = json.dumps(fields[key])
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{k} = ?" for k in fields)
+        where, params = "id = ?", [*fields.values(), job_id]
+        if from_status is not None:
+            where, params = f"{where} AND status = ?", [*params, from_status]
+        with self._lock:
+            cursor = self._conn.execute(
+                f"UPDATE ingest_jobs SET {assignments} WHERE {where}",  # noqa: S608
+                params,
+            )
+            self._conn.commit()
+        return cursor.rowcount == 1
+
+    def get(self, job_id: str) -> Dict[str, Any] | None:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM ingest_jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        return {
+            "job_id": row["id"],
+            "document_id": row["document_id"],
+            "status": row["status"],
+            "stage": row["stage"],
+            "progress": json.loads(row["progress"]),
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+            "cancel_requested": bool(row["cancel_requested"]),
+        }
+
+    def request_cancel(self, job_id: str) -> None:
+        self.update(job_id, cancel_requested=1)
+
+    def cancel_requested(self, job_id: str) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT cancel_requested FROM ingest_jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row["cancel_requested"])
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class _JobProgress(IngestProgress):
+    """Persists stage/counter updates (throttled) and polls for cancellation."""
+
+    def __init__(
+        self, store: IngestJobStore, job_id: str, stopping: threading.Event, min_interval: float = 0.5
+    ) -> None:
+        self.store = store
+        self.job_id = job_id
+        self.stopping = stopping
+        self.min_interval = min_interval
+        self.counters = {k: 0 for k in PROGRESS_COUNTERS}
+        self._last_flush = 0.0
+
+    def stage(self, name: str) -> None:
+        self.store.update(self.job_id, stage=name, progress=self.counters)
+        self._last_flush = time.monotonic()
+
+    def update(self, **counters: int) -> None:
+        self.counters.update(counters)
+        if time.monotonic() - self._last_flush >= self.min_interval:
+            self.store.update(self.job_id, progress=self.counters)
+            self._last_flush = time.monotonic()
+
+    def check_cancelled(self) -> None:
+        if self.stopping.is_set() or self.store.cancel_requested(self.job_id):
+            raise IngestCancelled(self.job_id)
+
+
+class IngestJobQueue:
+    """Runs ingests in the background on the bounded ``ingest`` executor.
+
+    At most ``max_pending`` jobs (running plus waiting) are accepted per worker;
+    beyond that ``submit`` raises ``IngestQueueFull`` so the API can push back.
+    """
+
+    def __init__(
+        self,
+        store: IngestJobStore,
+        service_factory: Callable[[], IngestionService],
+        max_pending: int,
+        logger: logging.Logger | None = None,
+    ) -> None:
+        self.store = store
+        self.service_factory = service_factory
+        self.logger = logger or logging.getLogger("uvicorn.error")
+        self._slots = threading.BoundedSemaphore(max(1, max_pending))
+        self._active: Dict[str, Future[None]] = {}
+        self._active_lock = threading.Lock()
+        self._stopping = threading.Event()
+
+    def submit(self, file_path: str, source: str | None = None, delete_after: bool = False) -> Dict[str, Any]:
+        """Queue ``file_path`` for ingestion under ``source`` (default: its basename).
+
+        With ``delete_after`` the queue owns the file: it is removed once the
+        job has finished, or straight away if the job is not accepted.
+        """
+        if self._stopping.is_set() or not self._slots.acquire(blocking=False):
+            if delete_after:
+                _discard(file_path)
+            raise IngestQueueFull("Ingest queue is full")
+        try:
+            job_id = self.store.create(file_path, source=source)
+            with self._active_lock:
+                future = get_executor("ingest").submit(self._run, job_id, file_path, source, delete_after)
+                self._active[job_id] = future
+        except Exception:
+            self._slots.release()
+            if delete_after:
+                _discard(file_path)
+            raise
+        future.add_done_callback(lambda _: self._finished(job_id))
+        return self.store.get(job_id)  # type: ignore[return-value]
+
+    def status(self, job_id: str) -> Dict[str, Any] | None:
+        return self.store.get(job_id)
+
+    def cancel(self, job_id: str) -> Dict[str, Any] | None:
+        job = self.store.get(job_id)
+        if job is None or job["status"] in FINISHED_STATUSES:
+            return job
+        self.store.request_cancel(job_id)
+        # Not started yet: cancel it now, unless a worker claims it first (then
+        # the flag stops it at its next checkpoint)
+        self.store.transition(job_id, "queued", status="cancelled", stage="cancelled")
+        return self.store.get(job_id)
+
+    def _finished(self, job_id: str) -> None:
+        with self._active_lock:
+            self._active.pop(job_id, None)
+        self._slots.release()
+
+    def _run(self, job_id: str, file_path: str, source: str | None, delete_after: bool) -> None:
+        try:
+            self._ingest(job_id, file_path, source)
+        finally:
+            if delete_after:
+                _discard(file_path)
+
+    def _ingest(self, job_id: str, file_path: str, source: str | None) -> None:
+        if self._stopping.is_set():
+            self.store.transition(job_id, "queued", status="failed", error=INTERRUPTED)
+            return
+        # Claim the job; a cancel that got there first has already finished it
+        if not self.store.transition(job_id, "queued", status="running", stage="starting"):
+            return
+        progress = _JobProgress(self.store, job_id, self._stopping)
+        INGESTS_RUNNING.inc()
+        try:
+            service = self.service_factory()
+            result = service.ingest_document(file_path, progress=progress, source=source)
+        except IngestCancelled:
+            if not self.store.cancel_requested(job_id):
+                # Stopped at a checkpoint by close(), not by the user
+                self.logger.info("Ingest job %s interrupted by shutdown", job_id)
+                self.store.update(job_id, status="failed", error=INTERRUPTED, progress=progress.counters)
+                INGEST_JOBS.labels(status="failed").inc()
+                return
+            self.logger.info("Ingest job %s cancelled", job_id)
+            self.store.update(job_id, status="cancelled", stage="cancelled", progress=progress.counters)
+            INGEST_JOBS.labels(status="cancelled").inc()
+            return
+        except Exception as exc:
+            self.logger.warning("Ingest job %s failed: %s", job_id, exc)
+            self.store.update(job_id, status="failed", error=f"Ingestion error: {exc}", progress=progress.counters)
+            INGEST_JOBS.labels(status="failed").inc()
+            return
+        finally:
+            INGESTS_RUNNING.dec()
+        if result != file_path:
+            # ingest_document reports handled failures as a message instead of the path
+            self.store.update(job_id, status="failed", error=result, progress=progress.counters)
+            INGEST_JOBS.labels(status="failed").inc()
+            return
+        INGEST_JOBS.labels(status="succeeded").inc()
+        self.store.update(
+            job_id,
+            status="succeeded",
+            stage="done",
+            progress=progress.counters,
+            result=build_result(service, source or file_path),
+        )
+
+    def active_jobs(self) -> List[str]:
+        with self._active_lock:
+            return sorted(self._active)
+
+    def close(self) -> None:
+        """Stop this worker's jobs, wait for them, then close the store.
+
+        Queued jobs are not started and running ones stop at their next
+        progress checkpoint; each records itself as interrupted, so no job
+        thread touches the store after it is closed.
+        """
+        self._stopping.set()
+        with self._active_lock:
+            futures = list(self._active.values())
+        wait(futures)
+        self.store.close()
@@ -1,163 +1,354 @@
-import weaviate
-import fitz  # PyMuPDF
-import pytesseract
-from PIL import Image
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from sentence_transformers import SentenceTransformer
+from dataclasses import dataclass, field
+from src.core.concurrency import prefetch
 from src.core.config import settings
-from typing import List
-from uuid import uuid4
-from weaviate.connect import ConnectionParams
-import weaviate.classes as wvc
+from src.core.metrics import CHUNKS_INGESTED, OCR_PAGES, PAGES_EXTRACTED
+from src.core.registry import ModelRegistry, get_registry
+from src.core.tracing import annotate, record, span, start_trace
+from src.services.embeddings import embedding_model_id
+from src.services.extraction import PageText, iter_pages, read_metadata, resolve_workers
+from src.services.manifest import diff_chunk_ids, file_sha256
+from src.services.retrieval import normalize_source
+from src.services.vector_store import VectorStore
+from typing import Any, Dict, Iterable, Iterator, List
 from weaviate.exceptions import WeaviateBatchError
-from tenacity import retry, stop_after_attempt, wait_fixed
-import os
-from urllib.parse import urlparse
-from openai import OpenAI
+from weaviate.util import generate_uuid5
+import hashlib
+import itertools
+import logging
+import time
+
+# Chunks per embedding call, so progress and cancellation are observed mid-embed
+EMBED_BATCH_SIZE = 64
+
+
+class IngestCancelled(Exception):
+    """Raised from a progress checkpoint when the ingest was cancelled."""
+
+
+class ExtractionFailed(Exception):
+    """PDF text extraction failed partway through a streaming ingest."""
+
+
+@dataclass
+class IngestStats:
+    """Per-document counters filled in by the ingest pipeline's stages."""
+
+    page_count: int = 0
+    workers: int = 1
+    pages: int = 0
+    ocr_pages: int = 0
+    extraction_seconds: float = 0.0
+    slowest_page: PageText | None = None
+    chunk_ids: List[str] = field(default_factory=list)
+    new_chunks: int = 0
+    embedded: int = 0
+
+
+class IngestProgress:
+    """Progress sink for ``ingest_document``; the default does nothing.
+
+    Stages: hashing, streaming (extract, chunk, embed, redact and write run
+    concurrently), finalizing, done.
+    Counters: pages_total, pages_extracted, ocr_pages, chunks_total,
+    chunks_embedded, objects_written.
+    """
+
+    def stage(self, name: str) -> None:
+        pass
+
+    def update(self, **counters: int) -> None:
+        pass
+
+    def check_cancelled(self) -> None:
+        pass
+
+
+def chunk_uuid(chunk_data: dict) -> str:
+    """Deterministic object id for a chunk: (source, page, content hash)."""
+    digest = hashlib.sha256(str(chunk_data["content"]).encode("utf-8")).hexdigest()
+    return generate_uuid5(f"{chunk_data['source']}:{chunk_data['page_number']}:{digest}")
 
 
 class IngestionService:
-    def __init__(self):
-        self.weaviate_client = self._connect_with_retry()
+    def __init__(self, registry: ModelRegistry | None = None):
+        self.registry = registry or get_registry()
+        self.logger = logging.getLogger("uvicorn.error")
+        self.store: VectorStore = self.registry.vector_store
         self.use_openai_embeddings = bool(settings.USE_OPENAI_EMBEDDINGS)
-        if self.use_openai_embeddings:
-            self.openai_client = OpenAI(api_key=settings.OPENAI_API_KEY)
-        else:
-            self.embedding_model = SentenceTransformer(settings.EMBEDDING_MODEL, device="cpu")
-        self.text_splitter = RecursiveCharacterTextSplitter(chunk_size=800, chunk_overlap=120)
-        self.collection_name = "ComplianceDocument"
-        self._create_schema()
-
-    @retry(stop=stop_after_attempt(10), wait=wait_fixed(2))
-    def _connect_with_retry(self):
-        weaviate_url = os.environ.get("WEAVIATE_URL", "").strip()
-        if weaviate_url:
-            client = weaviate.WeaviateClient(ConnectionParams.from_url(weaviate_url))
-            client.connect()
-            return client
-        # docker-compose fallback
-        client = weaviate.WeaviateClient(ConnectionParams.from_params(
-            http_host="weaviate",
-            http_port=8080,
-            http_secure=False,
-            grpc_host="weaviate",
-            grpc_port=50051,
-            grpc_secure=False,
-        ))
-        client.connect()
-        return client
+        self.embedding_model_name = (
+            "text-embedding-3-large"
+            if self.use_openai_embeddings
+            else embedding_model_id(settings.EMBEDDING_MODEL, settings.EMBEDDING_BACKEND)
+        )
+        self.embedding_cache = self.registry.embedding_cache if settings.EMBEDDING_CACHE_ENABLED else None
+        self.manifest = self.store.manifest
+        self.store.create_schema()
+
+    @property
+    def chunker(self) -> Any:
+        return self.registry.chunker
+
+    @property
+    def embedding_model(self) -> Any:
+        # Resolved on first embed, so a fully cached ingest never loads the model
+        return self.registry.embedding_model
 
     def _embed_many(self, texts: list[str]) -> list[list[float]]:
+        if self.embedding_cache is not None:
+            return self.embedding_cache.embed(self.embedding_model_name, texts, self._compute_embeddings)
+        return self._compute_embeddings(texts)
+
+    def _compute_embeddings(self, texts: list[str]) -> list[list[float]]:
         if self.use_openai_embeddings:
-            out = self.openai_client.embeddings.create(model="text-embedding-3-large", input=texts)
-            return [d.embedding for d in out.data]
+            return self.registry.openai_embedder.embed(texts)
         return self.embedding_model.encode(texts, show_progress_bar=True, normalize_embeddings=True).tolist()
 
-    def _create_schema(self) -> None:
-        if not self.weaviate_client.collections.exists(self.collection_name):
-            self.weaviate_client.collections.create(
-                name=self.collection_name,
-                properties=[
-                    wvc.config.Property(name="content", data_type=wvc.config.DataType.TEXT, tokenization=wvc.config.Tokenization.WORD),
-                    wvc.config.Property(name="source", data_type=wvc.config.DataType.TEXT),
-                    wvc.config.Property(name="page_number", data_type=wvc.config.DataType.INT),
-                ],
-                vectorizer_config=wvc.config.Configure.Vectorizer.none(),
-            )
-
-    def ingest_document(self, file_path: str) -> str:
+    def _write_objects(self, chunks: List[dict], embeddings: list[list[float]]) -> tuple[int, set[str]]:
+        """Write chunks under ids derived from (source, page, content hash).
+
+        Returns the inserted count and the ids that still failed after the
+        store's retries; a re-sent chunk overwrites itself, never duplicates.
+        """
+        objects: Dict[str, tuple[dict, list[float]]] = {}
+        for chunk_data, vector in zip(chunks, embeddings):
+            objects[chunk_uuid(chunk_data)] = (chunk_data, vector)
+        failed = self.store.write_objects(objects)
+        return len(objects) - len(failed), failed
+
+    def _log_extraction(self, file_path: str, stats: IngestStats) -> None:
+        slowest = stats.slowest_page
+        self.logger.info(
+            "Extracted %s | pages=%d | ocr_pages=%d | workers=%d | seconds=%.2f | slowest_page=%s (%.2fs)",
+            normalize_source(file_path),
+            stats.pages,
+            stats.ocr_pages,
+            stats.workers,
+            stats.extraction_seconds,
+            slowest.page_number if slowest else "-",
+            slowest.seconds if slowest else 0.0,
+        )
+
+    def _add_redacted_variants(self, chunks: List[dict], progress: IngestProgress) -> None:
+        """Store each precomputed redaction policy's output on the chunk dicts, in batches."""
+        pii_service = self.registry.pii_service
+        for start in range(0, len(chunks), EMBED_BATCH_SIZE):
+            progress.check_cancelled()
+            batch = chunks[start:start + EMBED_BATCH_SIZE]
+            variants = pii_service.redact_variants([c["content"] for c in batch])
+            for prop, texts in variants.items():
+                for chunk_data, text in zip(batch, texts):
+                    chunk_data[prop] = text
+
+    def _extracted_texts(self, file_path: str, stats: IngestStats, progress: IngestProgress) -> Iterator[str]:
+        started = time.perf_counter()
         try:
-            doc = fitz.open(file_path)
-            page_texts: List[str] = []
-            ocr_pages = 0
-            for page in doc:
-                text = page.get_text("text") or ""
-                if len(text.strip()) < 10:
-                    # OCR fallback for image-only pages
-                    pix = page.get_pixmap(alpha=False)
-                    img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-                    ocr_text = pytesseract.image_to_string(img, config='--oem 1 --psm 6') or ""
-                    text = ocr_text
-                    if ocr_text.strip():
-                        ocr_pages += 1
-                page_texts.append(text)
-
-            # Extract PDF metadata (if present)
-            metadata = doc.metadata or {}
-            author = metadata.get("author") or metadata.get("Author")
-            title = metadata.get("title") or metadata.get("Title")
-            subject = metadata.get("subject") or metadata.get("Subject")
-            keywords = metadata.get("keywords") or metadata.get("Keywords")
-            doc.close()
+            for page in iter_pages(file_path, workers=stats.workers, ocr_dpi=settings.OCR_DPI):
+                stats.pages += 1
+                stats.ocr_pages += int(page.ocr)
+                PAGES_EXTRACTED.inc()
+                if page.ocr:
+                    OCR_PAGES.inc()
+                if stats.slowest_page is None or page.seconds > stats.slowest_page.seconds:
+                    stats.slowest_page = page
+                self.logger.debug("Page %d extracted in %.3fs (ocr=%s)", page.page_number, page.seconds, page.ocr)
+                progress.update(pages_total=stats.page_count, pages_extracted=page.page_number, ocr_pages=stats.ocr_pages)
+                progress.check_cancelled()
+                yield page.text
+        except IngestCancelled:
+            raise
         except Exception as e:
-            return f"Error reading file {file_path}: {e}"
+            raise ExtractionFailed(str(e)) from e
+        stats.extraction_seconds = time.perf_counter() - started
+        # Wall time of the extract stage, including waits on the downstream queue
+        record("extract", stats.extraction_seconds, pages=stats.pages, ocr_pages=stats.ocr_pages, workers=stats.workers)
 
-        chunks_with_metadata: List[dict] = []
-        for i, text in enumerate(page_texts):
-            chunks = self.text_splitter.split_text(text)
-            for chunk in chunks:
-                chunks_with_metadata.append(
-                    {"content": chunk, "source": os.path.basename(file_path), "page_number": i + 1}
-                )
+    def _new_chunk_batches(
+        self,
+        file_path: str,
+        source: str,
+        metadata_lines: List[str],
+        known_ids: set[str],
+        stats: IngestStats,
+        progress: IngestProgress,
+    ) -> Iterator[List[dict]]:
+        """Pipeline stage 1: extract and chunk, yielding batches of chunks not already stored.
 
-        # Add a small synthetic chunk with document-level metadata for better Q&A (e.g., author/title)
-        metadata_lines: List[str] = []
-        if title:
-            metadata_lines.append(f"Title: {title}")
-        if author:
-            metadata_lines.append(f"Author: {author}")
-        if subject:
-            metadata_lines.append(f"Subject: {subject}")
-        if keywords:
-            metadata_lines.append(f"Keywords: {keywords}")
-        if metadata_lines:
-            chunks_with_metadata.append(
-                {
-                    "content": "\n".join(metadata_lines),
-                    "source": os.path.basename(file_path),
-                    "page_number": 0,
-                }
-            )
-
-        if not chunks_with_metadata:
-            return f"No text could be extracted from {file_path}."
+        Every chunk id is recorded in ``stats.chunk_ids`` for the manifest.
+        """
+        chunks = (
+            {
+                "content": chunk.text,
+                "source": source,
+                "page_number": chunk.page_start,
+                "page_end": chunk.page_end,
+                "section": chunk.section_path,
+            }
+            for chunk in self.chunker.iter_chunks(self._extracted_texts(file_path, stats, progress))
+        )
+        # A small synthetic chunk with document-level metadata for better Q&A (e.g., author/title)
+        metadata_chunks = [{"content": "\n".join(metadata_lines), "source": source, "page_number": 0}] if metadata_lines else []
+        seen: set[str] = set()
+        batch: List[dict] = []
+        for chunk_data in itertools.chain(chunks, metadata_chunks):
+            uuid = chunk_uuid(chunk_data)
+            if uuid in seen:
+                continue
+            seen.add(uuid)
+            stats.chunk_ids.append(uuid)
+            if uuid in known_ids:
+                continue
+            batch.append(chunk_data)
+            stats.new_chunks += 1
+            progress.update(chunks_total=stats.new_chunks)
+            if len(batch) >= EMBED_BATCH_SIZE:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
 
-        texts = [item["content"] for item in chunks_with_metadata]
-        embeddings = self._embed_many(texts)
+    def _embedded_batches(
+        self, batches: Iterable[List[dict]], stats: IngestStats, progress: IngestProgress
+    ) -> Iterator[tuple[List[dict], list[list[float]]]]:
+        """Pipeline stage 2: embed (and pre-redact) each batch."""
+        for batch in batches:
+            progress.check_cancelled()
+            with span("embed", chunks=len(batch)):
+                embeddings = self._embed_many([c["content"] for c in batch])
+            if settings.PRECOMPUTE_REDACTION:
+                with span("redact_variants", chunks=len(batch)):
+                    self._add_redacted_variants(batch, progress)
+            stats.embedded += len(batch)
+            progress.update(chunks_embedded=stats.embedded)
+            yield batch, embeddings
 
-        collection = self.weaviate_client.collections.get(self.collection_name)
+    def _record_partial(self, source: str, previous_ids: List[str] | None, written: set[str]) -> None:
+        """Keep chunks written before a failure in the manifest (without a hash) so the retry cleans them up."""
+        if not written:
+            return
+        self.manifest.put(source, "", sorted(set(previous_ids or []) | written))
+        self.store.save()
+        if settings.ANSWER_CACHE_ENABLED:
+            self.registry.answer_cache.invalidate_source(source)
 
-        def _send_batch() -> None:
-            with collection.batch.dynamic() as batch:
-                for i, chunk_data in enumerate(chunks_with_metadata):
-                    batch.add_object(properties=chunk_data, vector=embeddings[i])
+    def ingest_document(
+        self, file_path: str, progress: IngestProgress | None = None, source: str | None = None
+    ) -> str:
+        """Stream a PDF into the store: extract → chunk → embed in batches → write.
 
-        # Primary attempt: batch insert
+        The stages run concurrently on their own threads, connected by queues
+        of at most INGEST_PIPELINE_DEPTH batches, so extraction, embedding and
+        store writes overlap and memory stays flat however long the document.
+        Only chunk ids are kept for the whole document (for the manifest diff).
+        ``source`` names the document when ``file_path`` is a temporary copy.
+        """
+        source = normalize_source(source or file_path)
+        with start_trace("ingest", source=source) as trace:
+            self._last_trace_id = trace.trace_id  # type: ignore[attr-defined]
+            return self._ingest_document(file_path, source, progress or IngestProgress())
+
+    def _ingest_document(self, file_path: str, source: str, progress: IngestProgress) -> str:
+        progress.stage("hashing")
+        self._last_unchanged = False  # type: ignore[attr-defined]
+        self._last_deleted_count = 0  # type: ignore[attr-defined]
         try:
-            _send_batch()
-        except WeaviateBatchError as e:
-            if "read-only" in str(e).lower():
-                import time
-                time.sleep(2)
-                _send_batch()
-            else:
-                return f"Ingestion failed with error: {e}"
-
-        # Fallback: re-insert individually
+            with span("hashing"):
+                file_hash = file_sha256(file_path)
+                previous = self.manifest.get(source)
+        except OSError as e:
+            return f"Error reading file {file_path}: {e}"
+        if previous and previous.get("file_hash") == file_hash:
+            annotate(unchanged=True)
+            # Byte-identical re-upload: nothing to extract, embed or write
+            self.logger.info("Skipping unchanged %s | chunks=%d", source, len(previous.get("chunk_ids") or []))
+            self._last_unchanged = True  # type: ignore[attr-defined]
+            self._last_chunks_count = len(previous.get("chunk_ids") or [])  # type: ignore[attr-defined]
+            self._last_ocr_pages = 0  # type: ignore[attr-defined]
+            self._last_extraction_seconds = 0.0  # type: ignore[attr-defined]
+            self._last_inserted_count = 0  # type: ignore[attr-defined]
+            self._last_failed_count = 0  # type: ignore[attr-defined]
+            progress.stage("done")
+            return file_path
+
         try:
-            import time
-            with collection.batch.fixed_size(1) as single:
-                for i, chunk_data in enumerate(chunks_with_metadata):
-                    for _ in range(3):
-                        try:
-                            single.add_object(properties=chunk_data, vector=embeddings[i])
-                            break
-                        except Exception:
-                            time.sleep(0.5)
-                            continue
-        except Exception:
-            pass
-
-        self._last_chunks_count = len(chunks_with_metadata)  # type: ignore[attr-defined]
-        self._last_ocr_pages = ocr_pages  # type: ignore[attr-defined]
+            with span("metadata"):
+                page_count, metadata = read_metadata(file_path)
+                annotate(pages=page_count)
+        except Exception as e:
+            return f"Error reading file {file_path}: {e}"
+        metadata_lines: List[str] = []
+        for label in ("Title", "Author", "Subject", "Keywords"):
+            value = metadata.get(label.lower()) or metadata.get(label)
+            if value:
+                metadata_lines.append(f"{label}: {value}")
+
+        progress.stage("streaming")
+        stats = IngestStats(page_count=page_count, workers=resolve_workers(settings.INGEST_WORKERS, page_count))
+        previous_ids = previous.get("chunk_ids") if previous else self.store.existing_ids(source)
+        depth = settings.INGEST_PIPELINE_DEPTH
+        batches = prefetch(
+            self._new_chunk_batches(file_path, source, metadata_lines, set(previous_ids or []), stats, progress),
+            depth,
+            name="ingest-extract",
+        )
+        pipeline = prefetch(self._embedded_batches(batches, stats, progress), depth, name="ingest-embed")
+        inserted, failed_ids, written = 0, set(), set()
+        try:
+            # Stage 3 (this thread): write each batch as soon as it is embedded
+            for batch, embeddings in pipeline:
+                progress.check_cancelled()
+                with span("write", objects=len(batch)):
+                    count, failed = self._write_objects(batch, embeddings)
+                inserted += count
+                CHUNKS_INGESTED.inc(count)
+                failed_ids |= failed
+                written |= {chunk_uuid(c) for c in batch} - failed
+                progress.update(objects_written=inserted)
+        except ExtractionFailed as e:
+            self._record_partial(source, previous_ids, written)
+            return f"Error reading file {file_path}: {e}"
+        except WeaviateBatchError as e:
+            self._record_partial(source, previous_ids, written)
+            return f"Ingestion failed with error: {e}"
+        except BaseException:
+            self._record_partial(source, previous_ids, written)
+            raise
+        finally:
+            pipeline.close()
+        self._log_extraction(file_path, stats)
+
+        if not stats.chunk_ids:
+            return f"No text could be extracted from {file_path}."
+
+        progress.stage("finalizing")
+        with span("finalize"):
+            _, stale = diff_chunk_ids(stats.chunk_ids, previous_ids)
+            deleted = self.store.delete_ids(stale)
+            # Failed chunks stay out of the manifest (and the hash is withheld) so the next upload retries them
+            self.manifest.put(source, file_hash if not failed_ids else "", [u for u in stats.chunk_ids if u not in failed_ids])
+            self.store.save()
+            annotate(deleted=deleted)
+        annotate(
+            chunks=len(stats.chunk_ids),
+            new_chunks=stats.new_chunks,
+            inserted=inserted,
+            failed=len(failed_ids),
+            pages=stats.pages,
+            ocr_pages=stats.ocr_pages,
+        )
+        self.logger.info(
+            "Ingested %s | chunks=%d | new=%d | unchanged=%d | deleted=%d | failed=%d",
+            source, len(stats.chunk_ids), inserted, len(stats.chunk_ids) - stats.new_chunks, deleted, len(failed_ids),
+        )
+        if (inserted or deleted) and settings.ANSWER_CACHE_ENABLED:
+            # Cached answers may cite the old chunks of this document
+            dropped = self.registry.answer_cache.invalidate_source(source)
+            self.logger.info("Invalidated %d cached answers for %s", dropped, source)
+
+        self._last_deleted_count = deleted  # type: ignore[attr-defined]
+        self._last_chunks_count = len(stats.chunk_ids)  # type: ignore[attr-defined]
+        self._last_ocr_pages = stats.ocr_pages  # type: ignore[attr-defined]
+        self._last_extraction_seconds = stats.extraction_seconds  # type: ignore[attr-defined]
+        self._last_inserted_count = inserted  # type: ignore[attr-defined]
+        self._last_failed_count = len(failed_ids)  # type: ignore[attr-defined]
+        progress.stage("done")
         return file_path
@@ -0,0 +1,521 @@
+from __future__ import annotations
+
+import fcntl
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List
+from uuid import uuid4
+
+import numpy as np
+
+from src.core.config import settings
+from src.services.retrieval import normalize_source
+from src.services.vector_store import VectorStore
+
+# BM25 parameters (Weaviate's defaults)
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_WORD = re.compile(r"[^\W_]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased alphanumeric words, like Weaviate's ``word`` tokenization."""
+    return _WORD.findall(text.lower())
+
+
+class BM25Index:
+    """Inverted index over chunk content in CSR form, plus postings for rows added since.
+
+    Postings for term ``i`` are ``docs[indptr[i]:indptr[i+1]]`` (row numbers)
+    with matching term frequencies in ``tfs``. The arrays are saved as .npy
+    files and memory-mapped on load. Rows added with ``add`` keep their
+    postings in a per-term delta until ``compact`` folds them into new arrays.
+    """
+
+    FILES = ("bm25_indptr", "bm25_docs", "bm25_tfs", "bm25_doc_lens")
+
+    def __init__(
+        self,
+        vocab: Dict[str, int],
+        indptr: np.ndarray,
+        docs: np.ndarray,
+        tfs: np.ndarray,
+        doc_lens: np.ndarray,
+    ) -> None:
+        self.vocab = vocab
+        self.indptr = indptr
+        self.docs = docs
+        self.tfs = tfs
+        self.doc_lens = doc_lens
+        self.rows = len(doc_lens)
+        self._delta: Dict[int, tuple[List[int], List[int]]] = {}
+
+    @classmethod
+    def empty(cls) -> BM25Index:
+        return cls(
+            {},
+            np.zeros(1, dtype=np.int64),
+            np.zeros(0, dtype=np.int32),
+            np.zeros(0, dtype=np.float32),
+            np.zeros(0, dtype=np.float32),
+        )
+
+    @classmethod
+    def build(cls, texts: List[str]) -> BM25Index:
+        index = cls.empty()
+        for row, text in enumerate(texts):
+            index.add(row, text)
+        return index.compact(np.ones(len(texts), dtype=bool))
+
+    def add(self, row: int, text: str) -> None:
+        """Index ``text`` as ``row``, which must be the next row (``self.rows``)."""
+        counts = Counter(tokenize(text))
+        self.doc_lens = _reserve(self.doc_lens, row + 1)
+        self.doc_lens[row] = sum(counts.values())
+        self.rows = row + 1
+        for term, tf in counts.items():
+            rows, tfs = self._delta.setdefault(self.vocab.setdefault(term, len(self.vocab)), ([], []))
+            rows.append(row)
+            tfs.append(tf)
+
+    def _postings(self, i: int) -> tuple[np.ndarray, np.ndarray]:
+        rows = self.docs[self.indptr[i]:self.indptr[i + 1]] if i < len(self.indptr) - 1 else self.docs[:0]
+        tfs = self.tfs[self.indptr[i]:self.indptr[i + 1]] if i < len(self.indptr) - 1 else self.tfs[:0]
+        if i in self._delta:
+            delta_rows, delta_tfs = self._delta[i]
+            rows = np.concatenate([rows, np.asarray(delta_rows, dtype=np.int32)])
+            tfs = np.concatenate([tfs, np.asarray(delta_tfs, dtype=np.float32)])
+        return rows, tfs
+
+    def scores(self, query: str, alive: np.ndarray | None = None) -> np.ndarray:
+        """BM25 score of every row for ``query`` (0 where no term matches or the row is not ``alive``)."""
+        out = np.zeros(self.rows, dtype=np.float32)
+        live = np.ones(self.rows, dtype=bool) if alive is None else alive[:self.rows]
+        n = int(live.sum())
+        if n == 0:
+            return out
+        doc_lens = self.doc_lens[:self.rows]
+        avgdl = float(doc_lens[live].mean()) or 1.0
+        for term in set(tokenize(query)):
+            i = self.vocab.get(term)
+            if i is None:
+                continue
+            rows, tf = self._postings(i)
+            keep = live[rows]
+            rows, tf = rows[keep], tf[keep]
+            if rows.size == 0:
+                continue
+            idf = math.log(1 + (n - len(rows) + 0.5) / (len(rows) + 0.5))
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_lens[rows] / avgdl)
+            out[rows] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+        return out
+
+    def compact(self, alive: np.ndarray) -> BM25Index:
+        """A CSR index over the ``alive`` rows only, renumbered from 0 in order."""
+        live = np.asarray(alive[:self.rows], dtype=bool)
+        new_rows = np.cumsum(live) - 1
+        base_terms = len(self.indptr) - 1
+        term_ids = [np.repeat(np.arange(base_terms), np.diff(self.indptr))]
+        rows = [np.asarray(self.docs, dtype=np.int64)]
+        tfs = [np.asarray(self.tfs, dtype=np.float32)]
+        for i, (delta_rows, delta_tfs) in self._delta.items():
+            term_ids.append(np.full(len(delta_rows), i))
+            rows.append(np.asarray(delta_rows, dtype=np.int64))
+            tfs.append(np.asarray(delta_tfs, dtype=np.float32))
+        all_terms, all_rows, all_tfs = np.concatenate(term_ids), np.concatenate(rows), np.concatenate(tfs)
+        keep = live[all_rows]
+        all_terms, all_rows, all_tfs = all_terms[keep], all_rows[keep], all_tfs[keep]
+        order = np.lexsort((all_rows, all_terms))
+        all_terms, all_rows, all_tfs = all_terms[order], all_rows[order], all_tfs[order]
+        # Terms left without postings are dropped from the vocabulary
+        used = np.unique(all_terms)
+        terms = np.empty(len(self.vocab), dtype=object)
+        terms[list(self.vocab.values())] = list(self.vocab)
+        renumber = np.zeros(len(self.vocab), dtype=np.int64)
+        renumber[used] = np.arange(len(used))
+        indptr = np.zeros(len(used) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum(np.bincount(renumber[all_terms], minlength=len(used)))
+        return BM25Index(
+            {str(terms[i]): k for k, i in enumerate(used)},
+            indptr,
+            new_rows[all_rows].astype(np.int32),
+            all_tfs,
+            np.array(self.doc_lens[:self.rows][live], dtype=np.float32),
+        )
+
+    def save(self, path: str) -> None:
+        """Write the CSR arrays; call on a compacted index (pending delta postings are not saved)."""
+        arrays = (self.indptr, self.docs, self.tfs, self.doc_lens[:self.rows])
+        for name, array in zip(self.FILES, arrays):
+            _atomic_save_npy(os.path.join(path, f"{name}.npy"), array)
+        _atomic_write_json(os.path.join(path, "bm25_vocab.json"), self.vocab)
+
+    @classmethod
+    def load(cls, path: str) -> BM25Index:
+        with open(os.path.join(path, "bm25_vocab.json"), encoding="utf-8") as f:
+            vocab = json.load(f)
+        arrays = [np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in cls.FILES]
+        return cls(vocab, *arrays)
+
+
+def _reserve(array: np.ndarray, size: int) -> np.ndarray:
+    """``array`` if it is writable with room for ``size`` rows, else a copy with geometrically grown capacity.
+
+    Memory-mapped (read-only) arrays are copied on the first write.
+    """
+    if len(array) >= size and array.flags.writeable:
+        return array
+    grown = np.zeros((max(size, 2 * len(array), 64), *array.shape[1:]), dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+def _atomic_save_npy(path: str, array: np.ndarray) -> None:
+    tmp = f"{path[:-4]}.tmp.npy"
+    np.save(tmp, np.ascontiguousarray(array))
+    os.replace(tmp, path)
+
+
+def _atomic_write_json(path: str, data: Any) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def _min_max(scores: np.ndarray) -> np.ndarray:
+    if scores.size == 0:
+        return scores
+    low, high = float(scores.min()), float(scores.max())
+    if high == low:
+        return np.ones_like(scores)
+    return (scores - low) / (high - low)
+
+
+class LocalManifest:
+    """Ingest manifest kept inside a ``LocalVectorStore`` and saved with it."""
+
+    def __init__(self, store: LocalVectorStore) -> None:
+        self.store = store
+
+    def create_schema(self) -> None:
+        pass
+
+    def get(self, source: str) -> dict | None:
+        with self.store._lock:
+            self.store._ensure_current()
+            entry = self.store._manifest.get(source)
+            return dict(entry) if entry is not None else None
+
+    def put(self, source: str, file_hash: str, chunk_ids: List[str]) -> None:
+        entry = {
+            "source": source,
+            "file_hash": file_hash,
+            "chunk_ids": sorted(chunk_ids),
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+        }
+        with self.store._lock:
+            self.store._ensure_current()
+            self.store._manifest[source] = entry
+            self.store._pending_manifest[source] = entry
+            self.store._dirty = True
+
+
+class LocalVectorStore(VectorStore):
+    """Embedded chunk store for deployments without Weaviate.
+
+    Vectors are one float32 matrix, keyword search is a BM25 inverted index over
+    ``content``, and ``hybrid_search`` fuses the two like Weaviate's relative
+    score fusion: each side's top ``limit`` scores are min-max normalized and
+    combined as ``alpha * vector + (1 - alpha) * keyword``.
+
+    ``save`` writes the matrix, the index, the object properties and the
+    manifest under ``path``; loading memory-maps the arrays, so startup does
+    not re-tokenize or copy the corpus. Loading is lazy, and a store that has
+    no unsaved changes reloads when another process saves, so every worker on
+    the host serves the latest ingest.
+
+    Between saves, writes append to buffers that grow geometrically and
+    deletes (and overwrites) only mark rows dead, so an ingest batch costs
+    its own size and stays searchable at once. ``save`` drops the dead rows.
+    Several processes may ingest at once: ``save`` holds the exclusive file
+    lock, re-reads the store if another process saved since this one loaded
+    it, and replays this process's unsaved writes, deletes and manifest
+    entries on top before writing.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.manifest = LocalManifest(self)
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._loaded_stamp: tuple[int, int] | None = None
+        self._dirty = False
+        self._reset()
+
+    def _reset(self) -> None:
+        self._uuids: List[str] = []
+        self._properties: List[dict] = []
+        self._rows: Dict[str, int] = {}
+        self._count = 0
+        self._vectors: np.ndarray = np.zeros((0, 0), dtype=np.float32)
+        self._norms: np.ndarray = np.zeros(0, dtype=np.float32)
+        self._alive: np.ndarray = np.zeros(0, dtype=bool)
+        self._sources: np.ndarray = np.zeros(0, dtype=object)
+        self._index = BM25Index.empty()
+        self._manifest: Dict[str, dict] = {}
+        # Unsaved changes, replayed over another process's save: uuid -> row, or None when deleted
+        self._pending: Dict[str, int | None] = {}
+        self._pending_manifest: Dict[str, dict] = {}
+
+    def _meta_path(self) -> str:
+        return os.path.join(self.path, "meta.json")
+
+    def _stamp(self) -> tuple[int, int] | None:
+        try:
+            st = os.stat(self._meta_path())
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_mtime_ns
+
+    @contextmanager
+    def _file_lock(self, exclusive: bool) -> Iterator[None]:
+        os.makedirs(self.path, exist_ok=True)
+        with open(os.path.join(self.path, ".lock"), "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _ensure_current(self) -> None:
+        """Load on first use, and reload after another process saved (unless we have unsaved changes)."""
+        if self._loaded and (self._dirty or self._stamp() == self._loaded_stamp):
+            return
+        if self._stamp() is None:
+            self._reset()
+            self._loaded = True
+            self._loaded_stamp = None
+            return
+        with self._file_lock(exclusive=False):
+            self._load()
+
+    def _load(self) -> None:
+        """Replace the in-memory state with the saved one; the caller holds the file lock."""
+        self._reset()
+        stamp = self._stamp()
+        if stamp is not None:
+            with open(os.path.join(self.path, "objects.json"), encoding="utf-8") as f:
+                objects = json.load(f)
+            with open(os.path.join(self.path, "manifest.json"), encoding="utf-8") as f:
+                self._manifest = json.load(f)
+            self._uuids = [o["uuid"] for o in objects]
+            self._properties = [o["properties"] for o in objects]
+            self._count = len(self._uuids)
+            self._rows = {u: i for i, u in enumerate(self._uuids)}
+            self._vectors = np.load(os.path.join(self.path, "vectors.npy"), mmap_mode="r")
+            self._norms = np.linalg.norm(self._vectors, axis=1) if self._count else np.zeros(0, dtype=np.float32)
+            self._alive = np.ones(self._count, dtype=bool)
+            self._sources = np.asarray(
+                [normalize_source(str(p.get("source", ""))) for p in self._properties], dtype=object
+            )
+            self._index = BM25Index.load(self.path)
+        self._loaded = True
+        self._loaded_stamp = stamp
+
+    def _replay_over_saved(self) -> None:
+        """Reload another process's save and reapply this process's unsaved changes to it."""
+        rows = {u: row for u, row in self._pending.items() if row is not None}
+        deleted = {u for u, row in self._pending.items() if row is None}
+        properties, vectors, manifest = self._properties, self._vectors, self._pending_manifest
+        self._load()
+        self._delete_rows(deleted)
+        replayed = self._append_rows(list(rows), [properties[r] for r in rows.values()], vectors[list(rows.values())])
+        self._manifest.update(manifest)
+        self._pending = {**dict(zip(rows, replayed)), **dict.fromkeys(deleted)}
+        self._pending_manifest = manifest
+
+    def save(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            with self._file_lock(exclusive=True):
+                if self._stamp() != self._loaded_stamp:
+                    self._replay_over_saved()
+                live = np.flatnonzero(self._alive[:self._count])
+                vectors = np.array(self._vectors[live], dtype=np.float32)
+                index = self._index.compact(self._alive)
+                uuids = [self._uuids[row] for row in live]
+                properties = [self._properties[row] for row in live]
+                _atomic_save_npy(os.path.join(self.path, "vectors.npy"), vectors)
+                index.save(self.path)
+                _atomic_write_json(
+                    os.path.join(self.path, "objects.json"),
+                    [{"uuid": u, "properties": p} for u, p in zip(uuids, properties)],
+                )
+                _atomic_write_json(os.path.join(self.path, "manifest.json"), self._manifest)
+                # Written last: other processes reload when this file changes
+                _atomic_write_json(self._meta_path(), {"count": len(uuids), "generation": uuid4().hex})
+                self._loaded_stamp = self._stamp()
+            self._uuids, self._properties, self._count = uuids, properties, len(uuids)
+            self._rows = {u: i for i, u in enumerate(uuids)}
+            self._vectors, self._index = vectors, index
+            self._norms, self._sources = self._norms[live], self._sources[live]
+            self._alive = np.ones(len(uuids), dtype=bool)
+            self._pending, self._pending_manifest = {}, {}
+            self._dirty = False
+
+    def close(self) -> None:
+        """Save pending changes and release the memory maps (the next use reloads)."""
+        with self._lock:
+            self.save()
+            self._reset()
+            self._loaded = False
+
+    def _append_rows(self, uuids: List[str], properties: List[dict], vectors: np.ndarray) -> List[int]:
+        """Append objects as new rows; an existing uuid's old row is marked dead."""
+        if not uuids:
+            return []
+        end = self._count + len(uuids)
+        if self._count == 0:
+            self._vectors = np.zeros((0, vectors.shape[1]), dtype=np.float32)
+        self._vectors = _reserve(self._vectors, end)
+        self._norms = _reserve(self._norms, end)
+        self._alive = _reserve(self._alive, end)
+        self._sources = _reserve(self._sources, end)
+        rows = list(range(self._count, end))
+        self._vectors[self._count:end] = vectors
+        self._norms[self._count:end] = np.linalg.norm(vectors, axis=1)
+        self._alive[self._count:end] = True
+        for row, uuid, props in zip(rows, uuids, properties):
+            old = self._rows.get(uuid)
+            if old is not None:
+                self._alive[old] = False
+            self._rows[uuid] = row
+            self._uuids.append(uuid)
+            self._properties.append(dict(props))
+            self._sources[row] = normalize_source(str(props.get("source", "")))
+            self._index.add(row, str(props.get("content", "")))
+        self._count = end
+        return rows
+
+    def _delete_rows(self, ids: set[str]) -> int:
+        removed = 0
+        for uuid in ids:
+            row = self._rows.pop(uuid, None)
+            if row is not None:
+                self._alive[row] = False
+                removed += 1
+        return removed
+
+    def write_objects(self, objects: Dict[str, tuple[dict, List[float]]]) -> set[str]:
+        if not objects:
+            return set()
+        with self._lock:
+            self._ensure_current()
+            incoming = np.asarray([vector for _, vector in objects.values()], dtype=np.float32)
+            if self._count and incoming.shape[1] != self._vectors.shape[1]:
+                raise ValueError(
+                    f"Vector dimension {incoming.shape[1]} does not match the store's {self._vectors.shape[1]}"
+                )
+            rows = self._append_rows(list(objects), [properties for properties, _ in objects.values()], incoming)
+            self._pending.update(zip(objects, rows))
+            self._dirty = True
+        return set()
+
+    def delete_ids(self, ids: set[str]) -> int:
+        with self._lock:
+            self._ensure_current()
+            removed = {uuid for uuid in ids if uuid in self._rows}
+            self._delete_rows(removed)
+            if removed:
+                self._pending.update(dict.fromkeys(removed))
+                self._dirty = True
+        return len(removed)
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._ensure_current()
+            return len(self._rows)
+
+    def create_schema(self) -> None:
+        pass
+
+    def _source_mask(self, source: str | None) -> np.ndarray:
+        alive = self._alive[:self._count]
+        if not source:
+            return alive.copy()
+        return alive & (self._sources[:self._count] == normalize_source(source))
+
+    def hybrid_search(
+        self,
+        query: str,
+        vector: List[float],
+        alpha: float,
+        limit: int,
+        source: str | None = None,
+        include_vector: bool = False,
+    ) -> List[dict]:
+        with self._lock:
+            self._ensure_current()
+            if not self._rows:
+                return []
+            mask = self._source_mask(source)
+            candidates = np.flatnonzero(mask)
+            if candidates.size == 0:
+                return []
+            q = np.asarray(vector, dtype=np.float32)
+            if q.shape[0] != self._vectors.shape[1]:
+                raise ValueError(f"Query vector dimension {q.shape[0]} does not match the store's {self._vectors.shape[1]}")
+            vector_scores = self._vectors[candidates] @ q / (self._norms[candidates] * np.linalg.norm(q) + 1e-12)
+            keyword_scores = self._index.scores(query, self._alive)[candidates]
+
+            fused: Dict[int, float] = {}
+            top_vector = np.argsort(-vector_scores)[:limit]
+            for pos, score in zip(top_vector, _min_max(vector_scores[top_vector])):
+                fused[int(candidates[pos])] = alpha * float(score)
+            matched = np.flatnonzero(keyword_scores > 0)
+            top_keyword = matched[np.argsort(-keyword_scores[matched])][:limit]
+            for pos, score in zip(top_keyword, _min_max(keyword_scores[top_keyword])):
+                row = int(candidates[pos])
+                fused[row] = fused.get(row, 0.0) + (1 - alpha) * float(score)
+
+            results = []
+            for row, score in sorted(fused.items(), key=lambda item: item[1], reverse=True)[:limit]:
+                result = dict(self._properties[row])
+                result["score"] = score
+                if include_vector:
+                    result["vector"] = self._vectors[row].tolist()
+                results.append(result)
+            return results
+
+    def fetch_by_source(self, source: str, limit: int) -> List[dict]:
+        with self._lock:
+            self._ensure_current()
+            rows = np.flatnonzero(self._source_mask(source))[:limit]
+            return [dict(self._properties[row]) for row in rows]
+
+    def existing_ids(self, source: str) -> List[str]:
+        with self._lock:
+            self._ensure_current()
+            return [self._uuids[row] for row in np.flatnonzero(self._source_mask(source))]
+
+    def iter_objects(self) -> Iterator[tuple[str, dict, List[float] | None]]:
+        with self._lock:
+            self._ensure_current()
+            # Rows are never rewritten in place, so the snapshot stays valid while writes go on
+            snapshot = [(self._uuids[row], self._properties[row], row) for row in np.flatnonzero(self._source_mask(None))]
+            vectors = self._vectors
+        for uuid, properties, row in snapshot:
+            yield uuid, dict(properties), vectors[row].tolist()
+
+
+# Process-wide embedded store (loaded lazily from LOCAL_STORE_PATH on first use)
+LOCAL_STORE = LocalVectorStore(settings.LOCAL_STORE_PATH)
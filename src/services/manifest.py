@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import hashlib
+from datetime import datetime, timezone
+from typing import Any, Iterable, List
+
+import weaviate.classes as wvc
+from weaviate.util import generate_uuid5
+
+MANIFEST_COLLECTION = "IngestManifest"
+
+
+def file_sha256(file_path: str, block_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def diff_chunk_ids(current_ids: Iterable[str], previous_ids: Iterable[str] | None) -> tuple[set[str], set[str]]:
+    """Return (ids to insert, stale ids to delete) between two ingests of a source."""
+    current = set(current_ids)
+    previous = set(previous_ids or [])
+    return current - previous, previous - current
+
+
+class IngestManifest:
+    """Per-source record of the last ingested file hash and its chunk object ids.
+
+    Stored in its own vectorless Weaviate collection, keyed by a uuid5 of the
+    normalized source name, so every API worker sees the same manifest.
+    """
+
+    def __init__(self, weaviate_client: Any, collection_name: str = MANIFEST_COLLECTION) -> None:
+        self.weaviate_client = weaviate_client
+        self.collection_name = collection_name
+
+    def create_schema(self) -> None:
+        if not self.weaviate_client.collections.exists(self.collection_name):
+            self.weaviate_client.collections.create(
+                name=self.collection_name,
+                properties=[
+                    wvc.config.Property(name="source", data_type=wvc.config.DataType.TEXT, tokenization=wvc.config.Tokenization.FIELD),
+                    wvc.config.Property(name="file_hash", data_type=wvc.config.DataType.TEXT, tokenization=wvc.config.Tokenization.FIELD),
+                    wvc.config.Property(name="chunk_ids", data_type=wvc.config.DataType.TEXT_ARRAY),
+                    wvc.config.Property(name="updated_at", data_type=wvc.config.DataType.DATE),
+                ],
+                vectorizer_config=wvc.config.Configure.Vectorizer.none(),
+            )
+
+    def _collection(self) -> Any:
+        return self.weaviate_client.collections.get(self.collection_name)
+
+    def get(self, source: str) -> dict | None:
+        obj = self._collection().query.fetch_object_by_id(generate_uuid5(source))
+        return dict(obj.properties) if obj is not None else None
+
+    def put(self, source: str, file_hash: str, chunk_ids: List[str]) -> None:
+        collection = self._collection()
+        uuid = generate_uuid5(source)
+        properties = {
+            "source": source,
+            "file_hash": file_hash,
+            "chunk_ids": sorted(chunk_ids),
+            "updated_at": datetime.now(timezone.utc),
+        }
+        if collection.data.exists(uuid):
+            collection.data.replace(uuid=uuid, properties=properties)
+        else:
+            collection.data.insert(properties=properties, uuid=uuid)
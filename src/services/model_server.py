@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import logging
+import os
+import stat
+import tempfile
+import threading
+import time
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Any, Sequence
+
+import numpy as np
+
+from src.core.config import settings
+
+logger = logging.getLogger("uvicorn.error")
+
+# Shared between the gunicorn master, the server process and the workers through the environment
+AUTHKEY_ENV = "MODEL_SERVER_AUTHKEY"
+
+
+def _authkey() -> bytes:
+    return os.environ.get(AUTHKEY_ENV, "").encode("utf-8")
+
+
+def socket_path() -> str:
+    """MODEL_SERVER_SOCKET, or ``models.sock`` in a private runtime directory.
+
+    The directory is ``$XDG_RUNTIME_DIR/veritas``, else ``veritas-<uid>`` in the
+    system temp directory, created with mode 0700. An existing one must belong
+    to this user and be closed to others, so no other local user can plant or
+    replace the socket.
+    """
+    if settings.MODEL_SERVER_SOCKET:
+        return settings.MODEL_SERVER_SOCKET
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    directory = (
+        os.path.join(runtime_dir, "veritas")
+        if runtime_dir
+        else os.path.join(tempfile.gettempdir(), f"veritas-{os.getuid()}")
+    )
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    info = os.lstat(directory)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise RuntimeError(f"{directory} must be a directory owned by this user with mode 0700")
+    return os.path.join(directory, "models.sock")
+
+
+class ModelServer:
+    """Serves one embedding model and one cross-encoder to every worker over a Unix socket.
+
+    Requests are ``(op, payload)`` tuples on a ``multiprocessing`` connection
+    (HMAC-authenticated, socket mode 0600); each client connection gets a
+    thread, so workers' calls run concurrently against the same weights.
+    """
+
+    def __init__(self, path: str, embedding_model: Any = None, reranker: Any = None) -> None:
+        self.path = path
+        self.embedding_model = embedding_model
+        self.reranker = reranker
+        if os.path.exists(path):
+            os.unlink(path)  # stale socket from a previous run
+        self.listener = Listener(path, family="AF_UNIX", authkey=_authkey())
+        os.chmod(path, 0o600)
+        self._closed = threading.Event()
+
+    def _handle(self, op: str, payload: Any) -> Any:
+        if op == "embed":
+            texts, batch_size, normalize = payload
+            return self.embedding_model.encode(texts, batch_size=batch_size, normalize_embeddings=normalize)
+        if op == "rerank":
+            pairs, batch_size = payload
+            return self.reranker.predict(pairs, batch_size=batch_size, show_progress_bar=False)
+        if op == "ping":
+            return "pong"
+        raise ValueError(f"Unknown model server op: {op}")
+
+    def _serve_connection(self, conn: Connection) -> None:
+        with conn:
+            while not self._closed.is_set():
+                try:
+                    op, payload = conn.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    response = ("ok", self._handle(op, payload))
+                except Exception as exc:
+                    logger.exception("Model server request failed: %s", op)
+                    response = ("error", f"{type(exc).__name__}: {exc}")
+                conn.send(response)
+
+    def serve_forever(self) -> None:
+        logger.info("Model server listening on %s", self.path)
+        while not self._closed.is_set():
+            try:
+                conn = self.listener.accept()
+            except OSError:
+                if self._closed.is_set():
+                    return
+                logger.warning("Model server rejected a connection", exc_info=True)
+                continue
+            threading.Thread(target=self._serve_connection, args=(conn,), daemon=True).start()
+
+    def close(self) -> None:
+        self._closed.set()
+        self.listener.close()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+class ModelServerClient:
+    """One connection per calling thread, reconnecting once if the server went away."""
+
+    def __init__(self, path: str, connect_timeout: float = 0.0) -> None:
+        self.path = path
+        self.connect_timeout = connect_timeout
+        self._local = threading.local()
+        self._connections: list[Connection] = []
+        self._lock = threading.Lock()
+
+    def _connect(self) -> Connection:
+        deadline = time.monotonic() + self.connect_timeout
+        while True:
+            try:
+                conn = Client(self.path, family="AF_UNIX", authkey=_authkey())
+                with self._lock:
+                    self._connections.append(conn)
+                return conn
+            except (FileNotFoundError, ConnectionRefusedError):
+                # The server may still be loading its models
+                if time.monotonic() >= deadline:
+                    raise
+                time.sleep(0.5)
+
+    def call(self, op: str, payload: Any = None) -> Any:
+        for attempt in range(2):
+            conn = getattr(self._local, "conn", None)
+            if conn is None:
+                conn = self._local.conn = self._connect()
+            try:
+                conn.send((op, payload))
+                status, result = conn.recv()
+                break
+            except (EOFError, OSError):
+                self._local.conn = None
+                if attempt:
+                    raise
+        if status == "error":
+            raise RuntimeError(f"Model server error: {result}")
+        return result
+
+    def close(self) -> None:
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+
+
+class RemoteEncoder:
+    """``SentenceTransformer.encode`` served by the model server."""
+
+    def __init__(self, client: ModelServerClient) -> None:
+        self.client = client
+
+    def encode(
+        self,
+        sentences: str | Sequence[str],
+        batch_size: int = 32,
+        normalize_embeddings: bool = False,
+        **_: Any,
+    ) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        vectors = np.asarray(self.client.call("embed", (texts, batch_size, normalize_embeddings)), dtype=np.float32)
+        return vectors[0] if single else vectors
+
+
+class RemoteCrossEncoder:
+    """``CrossEncoder.predict`` served by the model server."""
+
+    # No local tokenizer: score_pairs falls back to character length for bucketing
+    tokenizer = None
+
+    def __init__(self, client: ModelServerClient) -> None:
+        self.client = client
+
+    def predict(self, sentences: Sequence[Sequence[str]], batch_size: int = 32, **_: Any) -> np.ndarray:
+        pairs = [[str(q), str(d)] for q, d in sentences]
+        return np.asarray(self.client.call("rerank", (pairs, batch_size)), dtype=np.float32)
+
+
+def serve(path: str | None = None) -> None:
+    """Load the local models the settings call for and serve them until interrupted."""
+    from src.services.embeddings import load_sentence_encoder
+    from src.services.reranking import load_cross_encoder
+
+    embedding_model = None
+    reranker = None
+    if not settings.USE_OPENAI_EMBEDDINGS:
+        embedding_model = load_sentence_encoder(settings.EMBEDDING_MODEL, backend=settings.EMBEDDING_BACKEND)
+    if not settings.USE_OPENAI_RERANKER:
+        reranker = load_cross_encoder(
+            settings.RERANKER_MODEL, backend=settings.RERANKER_BACKEND, max_length=settings.RERANK_MAX_LENGTH
+        )
+    server = ModelServer(path or socket_path(), embedding_model, reranker)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    serve()
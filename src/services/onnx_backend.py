@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import logging
+import os
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+from src.core.config import settings
+
+logger = logging.getLogger("uvicorn.error")
+
+
+def onnx_model_dir(model_name: str) -> str:
+    """Per-model directory under ONNX_CACHE_DIR for exported graphs."""
+    return os.path.join(settings.ONNX_CACHE_DIR, model_name.replace("/", "__"))
+
+
+def _require_onnxruntime() -> Any:
+    try:
+        import onnxruntime
+    except ImportError as e:
+        raise RuntimeError("ONNX backends need the optional dependencies: poetry install -E onnx") from e
+    return onnxruntime
+
+
+def export_onnx(
+    module: Any,
+    sample_inputs: Dict[str, Any],
+    path: str,
+    output_names: List[str],
+    quantize: bool = False,
+    output_axes: Dict[str, Dict[int, str]] | None = None,
+) -> str:
+    """Export a Hugging Face torch module to ONNX once and reuse the file afterwards.
+
+    Batch and sequence axes of the inputs are dynamic; outputs get a dynamic
+    batch axis unless ``output_axes`` says otherwise. With ``quantize`` the weights are also
+    dynamically quantized to int8 (a second, cached file). Files are written to
+    a temporary name and moved into place, so concurrent workers never load a
+    partial export.
+    """
+    _require_onnxruntime()
+    target = path.replace(".onnx", "-int8.onnx") if quantize else path
+    if os.path.exists(target):
+        return target
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    if not os.path.exists(path):
+        import torch
+
+        class _Positional(torch.nn.Module):
+            # Tracing keyword inputs is brittle across transformers versions; bind them by name here
+            def __init__(self) -> None:
+                super().__init__()
+                self.inner = module
+
+            def forward(self, *tensors: Any) -> Any:
+                return self.inner(**dict(zip(names, tensors)), return_dict=False)[: len(output_names)]
+
+        logger.info("Exporting %s to ONNX", path)
+        names = list(sample_inputs)
+        dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in names}
+        dynamic_axes.update({name: (output_axes or {}).get(name, {0: "batch"}) for name in output_names})
+        tmp = f"{path}.{os.getpid()}.tmp"
+        module.eval()
+        with torch.no_grad():
+            torch.onnx.export(
+                _Positional(),
+                tuple(sample_inputs[name] for name in names),
+                tmp,
+                input_names=names,
+                output_names=output_names,
+                dynamic_axes=dynamic_axes,
+                opset_version=17,
+                dynamo=False,
+            )
+        os.replace(tmp, path)
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        logger.info("Quantizing %s to int8", path)
+        tmp = f"{target}.{os.getpid()}.tmp"
+        quantize_dynamic(path, tmp, weight_type=QuantType.QInt8)
+        os.replace(tmp, target)
+    return target
+
+
+def onnx_session(path: str, threads: int = 0) -> Any:
+    onnxruntime = _require_onnxruntime()
+    options = onnxruntime.SessionOptions()
+    if threads > 0:
+        options.intra_op_num_threads = threads
+    return onnxruntime.InferenceSession(path, sess_options=options, providers=["CPUExecutionProvider"])
+
+
+class OnnxCrossEncoder:
+    """ONNX Runtime stand-in for ``CrossEncoder.predict`` (same tokenizer and activation)."""
+
+    def __init__(self, session: Any, tokenizer: Any, max_length: int, num_labels: int = 1) -> None:
+        self.session = session
+        self.tokenizer = tokenizer
+        self.max_length = max_length
+        self.num_labels = num_labels
+        self._input_names = {i.name for i in session.get_inputs()}
+        self.model_bytes: int | None = None  # size of the exported weights, for the memory gauge
+
+    @classmethod
+    def from_cross_encoder(cls, model: Any, model_name: str, quantize: bool = False) -> OnnxCrossEncoder:
+        sample = model.tokenizer(["query"], ["document"], return_tensors="pt")
+        path = export_onnx(
+            model.model,
+            sample,
+            os.path.join(onnx_model_dir(model_name), "reranker.onnx"),
+            output_names=["logits"],
+            quantize=quantize,
+        )
+        encoder = cls(onnx_session(path), model.tokenizer, model.max_length, model.model.config.num_labels)
+        encoder.model_bytes = os.path.getsize(path)
+        return encoder
+
+    def predict(self, sentences: Sequence[Sequence[str]], batch_size: int = 32, **_: Any) -> np.ndarray:
+        scores: List[np.ndarray] = []
+        for start in range(0, len(sentences), batch_size):
+            batch = sentences[start:start + batch_size]
+            encoded = self.tokenizer(
+                [p[0] for p in batch],
+                [p[1] for p in batch],
+                padding=True,
+                truncation="longest_first",
+                max_length=self.max_length,
+                return_tensors="np",
+            )
+            feeds = {k: v.astype(np.int64) for k, v in encoded.items() if k in self._input_names}
+            (logits,) = self.session.run(["logits"], feeds)
+            scores.append(logits)
+        if not scores:
+            return np.zeros(0, dtype=np.float32)
+        logits = np.concatenate(scores)
+        # CrossEncoder's default activation: sigmoid for single-label rerankers
+        return 1 / (1 + np.exp(-logits[:, 0])) if self.num_labels == 1 else logits
+
+
+def pool_embeddings(hidden: np.ndarray, attention_mask: np.ndarray, mode: str) -> np.ndarray:
+    """Sentence vectors from token states, as sentence-transformers' ``Pooling`` does."""
+    if mode == "cls":
+        return hidden[:, 0]
+    if mode == "mean":
+        mask = attention_mask[..., None].astype(hidden.dtype)
+        return (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+    raise ValueError(f"Unsupported pooling mode for the ONNX backend: {mode}")
+
+
+class OnnxSentenceEncoder:
+    """ONNX Runtime stand-in for ``SentenceTransformer.encode`` (transformer + pooling)."""
+
+    def __init__(self, session: Any, tokenizer: Any, max_seq_length: int, pooling: str) -> None:
+        self.session = session
+        self.tokenizer = tokenizer
+        self.max_seq_length = max_seq_length
+        self.pooling = pooling
+        self._input_names = {i.name for i in session.get_inputs()}
+        self.model_bytes: int | None = None  # size of the exported weights, for the memory gauge
+
+    @classmethod
+    def from_sentence_transformer(cls, model: Any, model_name: str, quantize: bool = False) -> OnnxSentenceEncoder:
+        transformer, pooling = model[0], model[1]
+        sample = transformer.tokenizer(["sentence"], return_tensors="pt")
+        path = export_onnx(
+            transformer.auto_model,
+            dict(sample),
+            os.path.join(onnx_model_dir(model_name), "embedding.onnx"),
+            output_names=["last_hidden_state"],
+            quantize=quantize,
+            output_axes={"last_hidden_state": {0: "batch", 1: "sequence"}},
+        )
+        # sentence-transformers 2.x names the mode via a method, later releases via an attribute
+        mode = pooling.get_pooling_mode_str() if hasattr(pooling, "get_pooling_mode_str") else pooling.pooling_mode
+        encoder = cls(onnx_session(path), transformer.tokenizer, model.max_seq_length, mode)
+        encoder.model_bytes = os.path.getsize(path)
+        return encoder
+
+    def encode(
+        self,
+        sentences: str | Sequence[str],
+        batch_size: int = 32,
+        normalize_embeddings: bool = False,
+        **_: Any,
+    ) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        # Longest first, like SentenceTransformer, so batches pad to similar lengths
+        order = np.argsort([-len(t) for t in texts], kind="stable")
+        vectors: List[np.ndarray] = []
+        for start in range(0, len(texts), batch_size):
+            batch = [texts[i] for i in order[start:start + batch_size]]
+            encoded = self.tokenizer(
+                batch, padding=True, truncation=True, max_length=self.max_seq_length, return_tensors="np"
+            )
+            feeds = {k: v.astype(np.int64) for k, v in encoded.items() if k in self._input_names}
+            (hidden,) = self.session.run(["last_hidden_state"], feeds)
+            vectors.append(pool_embeddings(hidden, encoded["attention_mask"], self.pooling))
+        if not vectors:
+            return np.zeros((0, 0), dtype=np.float32)
+        embeddings = np.empty((len(texts), vectors[0].shape[1]), dtype=np.float32)
+        embeddings[order] = np.concatenate(vectors)
+        if normalize_embeddings:
+            embeddings /= np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+        return embeddings[0] if single else embeddings
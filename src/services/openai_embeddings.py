@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Sequence
+
+import openai
+
+logger = logging.getLogger("uvicorn.error")
+
+OPENAI_EMBEDDING_MODEL = "text-embedding-3-large"
+
+# Hard API limit on inputs per embeddings request
+MAX_INPUTS_PER_REQUEST = 2048
+
+# Backoff between attempts: base * 2**attempt seconds, capped, with jitter
+RETRY_BACKOFF_BASE = 0.5
+RETRY_BACKOFF_MAX = 30.0
+
+
+def pack_batches(token_counts: Sequence[int], max_tokens: int, max_inputs: int) -> List[List[int]]:
+    """Group input indices, in order, into batches of at most ``max_tokens`` tokens and ``max_inputs`` inputs.
+
+    An input larger than the budget on its own gets a batch to itself.
+    """
+    max_inputs = max(1, min(max_inputs, MAX_INPUTS_PER_REQUEST))
+    batches: List[List[int]] = []
+    current: List[int] = []
+    total = 0
+    for i, tokens in enumerate(token_counts):
+        if current and (total + tokens > max_tokens or len(current) >= max_inputs):
+            batches.append(current)
+            current, total = [], 0
+        current.append(i)
+        total += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Rate limits, server errors, timeouts and dropped connections are worth retrying."""
+    if isinstance(exc, (openai.RateLimitError, openai.APIConnectionError)):
+        return True
+    return isinstance(exc, openai.APIStatusError) and exc.status_code >= 500
+
+
+def retry_delay(exc: BaseException, attempt: int) -> float:
+    """Seconds to wait before retry ``attempt`` (1-based); a server's Retry-After wins if longer."""
+    delay = min(RETRY_BACKOFF_BASE * 2 ** (attempt - 1), RETRY_BACKOFF_MAX) * random.uniform(0.5, 1.0)
+    response = getattr(exc, "response", None)
+    header = response.headers.get("retry-after") if response is not None else None
+    try:
+        return max(delay, min(float(header), RETRY_BACKOFF_MAX)) if header else delay
+    except ValueError:
+        return delay
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute budgets shared by every dispatch thread.
+
+    Each ``acquire`` reserves its share immediately (a bucket may go negative)
+    and then sleeps until the buckets would have refilled, so callers are
+    served in arrival order. A limit of 0 disables that bucket.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: int,
+        tokens_per_minute: int,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.request_rate = requests_per_minute / 60.0
+        self.token_rate = tokens_per_minute / 60.0
+        self.clock = clock
+        self.sleep = sleep
+        self._requests = float(requests_per_minute)
+        self._tokens = float(tokens_per_minute)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: int) -> float:
+        """Block until one request of ``tokens`` tokens fits the budgets; returns the seconds waited."""
+        with self._lock:
+            now = self.clock()
+            elapsed, self._updated = now - self._updated, now
+            wait = 0.0
+            if self.request_rate:
+                self._requests = min(self._requests + elapsed * self.request_rate, self.request_rate * 60) - 1
+                wait = max(wait, -self._requests / self.request_rate)
+            if self.token_rate:
+                self._tokens = min(self._tokens + elapsed * self.token_rate, self.token_rate * 60) - tokens
+                wait = max(wait, -self._tokens / self.token_rate)
+        if wait > 0:
+            self.sleep(wait)
+        return wait
+
+
+class OpenAIEmbedder:
+    """Embeds any number of texts with the OpenAI embeddings API.
+
+    Inputs are packed into requests by token budget, up to ``concurrency``
+    requests are in flight at once under the shared ``RateLimiter``, and a
+    request failing with 429, 5xx or a connection error is retried with
+    exponential backoff. Vectors come back in input order.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        count_tokens: Callable[[List[str]], List[int]],
+        model: str = OPENAI_EMBEDDING_MODEL,
+        batch_tokens: int = 4_096,
+        batch_inputs: int = 256,
+        concurrency: int = 4,
+        rate_limiter: RateLimiter | None = None,
+        max_retries: int = 6,
+    ) -> None:
+        self.client = client
+        self.count_tokens = count_tokens
+        self.model = model
+        self.batch_tokens = batch_tokens
+        self.batch_inputs = batch_inputs
+        self.rate_limiter = rate_limiter or RateLimiter(0, 0)
+        self.max_retries = max_retries
+        self.retries = 0
+        self._executor = ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="openai-embed")
+
+    def _request(self, texts: List[str], tokens: int) -> List[List[float]]:
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.acquire(tokens)
+            try:
+                out = self.client.embeddings.create(model=self.model, input=texts)
+                return [d.embedding for d in sorted(out.data, key=lambda d: d.index)]
+            except Exception as exc:
+                if attempt == self.max_retries or not is_retryable(exc):
+                    raise
+                delay = retry_delay(exc, attempt + 1)
+                self.retries += 1
+                logger.warning(
+                    "Embeddings request failed (%s); retry %d/%d in %.1fs",
+                    type(exc).__name__, attempt + 1, self.max_retries, delay,
+                )
+                time.sleep(delay)
+        raise AssertionError("unreachable")
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        counts = self.count_tokens(texts)
+        batches = pack_batches(counts, self.batch_tokens, self.batch_inputs)
+        futures = [
+            self._executor.submit(self._request, [texts[i] for i in batch], sum(counts[i] for i in batch))
+            for batch in batches
+        ]
+        vectors: List[List[float]] = [[] for _ in texts]
+        try:
+            for batch, future in zip(batches, futures):
+                for i, vector in zip(batch, future.result()):
+                    vectors[i] = vector
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+        return vectors
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -1,19 +1,144 @@
 from __future__ import annotations
 
-from typing import Dict, List
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List
+import hashlib
+import ipaddress
 import logging
+import os
+import re
+import threading
 
-from presidio_analyzer import AnalyzerEngine, RecognizerResult
-from presidio_anonymizer import AnonymizerEngine
-from presidio_anonymizer.entities import OperatorConfig
-from presidio_analyzer.nlp_engine import NlpEngineProvider
+from src.core.config import settings
+from src.core.metrics import PII_ENTITIES
+
+
+REDACTED_ENTITIES = ("PERSON", "EMAIL_ADDRESS", "IP_ADDRESS")
+
+REPLACEMENTS: Dict[str, str] = {
+    "PERSON": "<PERSON>",
+    "EMAIL_ADDRESS": "<EMAIL>",
+    "IP_ADDRESS": "<IP>",
+}
+
+# Redaction policies precomputed at ingest, keyed by the skipped entity set,
+# mapped to the chunk property that stores that variant of ``content``
+REDACTION_VARIANTS: Dict[tuple[str, ...], str] = {
+    (): "content_redacted",
+    ("PERSON",): "content_redacted_keep_person",
+}
+
+_EMAIL = re.compile(r"(?<![\w.+-])[A-Za-z0-9._%+-]+@[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*\.[A-Za-z]{2,}\b")
+# Candidates only; ipaddress decides what is a valid v4 or v6 address
+_IP_CANDIDATE = re.compile(
+    r"(?<![\w.])\d{1,3}(?:\.\d{1,3}){3}(?![\w]|\.\d)"
+    r"|(?<![\w:])(?:[0-9A-Fa-f]{0,4}:){2,7}(?:[0-9A-Fa-f]{1,4}|\d{1,3}(?:\.\d{1,3}){3})?(?![\w:])"
+)
+_HAS_DIGIT = re.compile(r"\d")
+# A word of letters in any script, with inner apostrophes or hyphens: "Smith", "O'Neil", "Jean-Luc", "Álvarez"
+_WORD = re.compile(r"(?<![\w'’-])[^\W\d_]+(?:['’-][^\W\d_]+)*(?![\w'’-])")
+# Between two tokens of one name: whitespace, optionally around a middle initial
+_NAME_GAP = re.compile(r"[ \t]+(?:[^\W\d_]\.[ \t]+)?")
+_HONORIFICS = frozenset({"Mr", "Mrs", "Ms", "Miss", "Dr", "Prof", "Sir", "Dame"})
+# Capitalized words that are never (part of) a name on their own: sentence starters
+# and function words. Deliberately short; words like May, Will or Bill stay candidates.
+_STOPWORDS = frozenset(
+    """A About After All Also An And Any Are As At Be Because Before Both But By Can Could Do Does
+    Each Either Every For From Had Has Have He Her Here His How However If In Into Is It Its Least
+    More Most Must My No Nor Not Of On Once One Only Or Other Our Per Shall She Should Since So Some
+    Such Than That The Their Then There These They This Those Through To Under Unless Until Upon Us
+    We Were What When Where Whether Which While Who Whom Why With Within Without Would Yes You Your""".split()
+)
+
+
+def variant_property(skip_entities: list[str] | None) -> str | None:
+    """Chunk property holding the precomputed redaction for this policy, if any."""
+    return REDACTION_VARIANTS.get(tuple(sorted(set(skip_entities or []))))
+
+
+def presidio_enabled() -> bool:
+    """ENABLE_PRESIDIO, re-read from the environment so it can change without reloading settings."""
+    value = os.environ.get("ENABLE_PRESIDIO")
+    if value is None:
+        return settings.ENABLE_PRESIDIO
+    return value.strip().lower() not in ("0", "false", "no", "off")
+
+
+def regex_spans(text: str, entities: tuple[str, ...]) -> List[tuple[int, int, str]]:
+    """Email and IP address spans, each pattern run only if its trigger characters occur."""
+    spans: List[tuple[int, int, str]] = []
+    if "EMAIL_ADDRESS" in entities and "@" in text:
+        spans.extend((m.start(), m.end(), "EMAIL_ADDRESS") for m in _EMAIL.finditer(text))
+    if "IP_ADDRESS" in entities and ("." in text or ":" in text) and _HAS_DIGIT.search(text):
+        for m in _IP_CANDIDATE.finditer(text):
+            try:
+                ipaddress.ip_address(m.group())
+            except ValueError:
+                continue
+            spans.append((m.start(), m.end(), "IP_ADDRESS"))
+    return spans
+
+
+def _name_tokens(text: str, all_caps: bool = False) -> Iterator[re.Match[str]]:
+    """Words starting with an upper-case letter ("José", "McDonald") that are not stopwords.
+
+    All-caps words ("SMITH") count only with ``all_caps``; otherwise they are
+    taken for acronyms and headings.
+    """
+    for m in _WORD.finditer(text):
+        word = m.group()
+        if len(word) < 2 or not word[0].isupper() or word.title() in _STOPWORDS:
+            continue
+        if not all_caps and word.isupper():
+            continue
+        yield m
+
+
+def may_contain_person(text: str) -> bool:
+    """Cheap gate in front of NER: any capitalized or all-caps word that is not a stopword.
+
+    Errs towards recall: a text it rejects is never shown to NER.
+    """
+    return next(_name_tokens(text, all_caps=True), None) is not None
+
+
+def person_spans(text: str) -> List[tuple[int, int, str]]:
+    """Regex-only PERSON detection: runs of two or more capitalized words, or an honorific and a name.
+
+    A rough stand-in for NER (ENABLE_PRESIDIO=false) that errs towards over-redacting.
+    """
+    spans: List[tuple[int, int, str]] = []
+    run: List[re.Match[str]] = []
+
+    def _close() -> None:
+        if len(run) >= 2:
+            spans.append((run[0].start(), run[-1].end(), "PERSON"))
+        run.clear()
+
+    for m in _name_tokens(text):
+        if m.group() in _HONORIFICS:
+            _close()
+        elif run and not _NAME_GAP.fullmatch(text, run[-1].end(), m.start()):
+            if run[-1].group() in _HONORIFICS and text.startswith(".", run[-1].end()):
+                # "Dr. Smith": the period after the honorific joins the two
+                if _NAME_GAP.fullmatch(text, run[-1].end() + 1, m.start()):
+                    run.append(m)
+                    continue
+            _close()
+        run.append(m)
+    _close()
+    return spans
 
 
 class PIIRedactionService:
-    """Detects and redacts PII using Microsoft Presidio.
+    """Detects and redacts PII in tiers, using Microsoft Presidio only where needed.
 
-    This service initializes Presidio's Analyzer and Anonymizer engines and
-    provides a single method to redact common PII entities from input text.
+    Emails and IP addresses are found by compiled patterns (each run only when
+    its trigger characters occur). PERSON needs NER: a text goes to Presidio's
+    spaCy pipeline only if it has a capitalized or all-caps word that is not a stopword.
+    With ENABLE_PRESIDIO=false names come from a regex heuristic instead and
+    Presidio is never imported. Texts are redacted one at a time
+    (``redact_text``) or in batches (``redact_many``), memoized per text.
 
     Entities redacted:
     - PERSON → <PERSON>
@@ -21,8 +146,30 @@ class PIIRedactionService:
     - IP_ADDRESS → <IP>
     """
 
-    def __init__(self, logger: logging.Logger | None = None) -> None:
+    def __init__(
+        self,
+        logger: logging.Logger | None = None,
+        cache_size: int = 4096,
+        batch_size: int = 32,
+        enable_presidio: bool | None = None,
+        person_gate: bool = True,
+    ) -> None:
         self.logger = logger or logging.getLogger("uvicorn.error")
+        self.cache_size = cache_size
+        self.batch_size = batch_size
+        self.person_gate = person_gate
+        self.ner_texts = 0
+        self.ner_skipped = 0
+        self._cache: OrderedDict[tuple[str, tuple[str, ...]], str] = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.presidio_enabled = presidio_enabled() if enable_presidio is None else enable_presidio
+        self.batch_analyzer: Any = None
+        if not self.presidio_enabled:
+            self.logger.info("PII redaction in regex-only mode (ENABLE_PRESIDIO=false)")
+            return
+
+        from presidio_analyzer import AnalyzerEngine, BatchAnalyzerEngine
+        from presidio_analyzer.nlp_engine import NlpEngineProvider
 
         # Initialize NLP engine for Presidio (spaCy). Requires the en_core_web_sm model at runtime.
         nlp_configuration: Dict[str, object] = {
@@ -34,16 +181,7 @@ class PIIRedactionService:
         nlp_engine = provider.create_engine()
 
         self.analyzer = AnalyzerEngine(nlp_engine=nlp_engine, supported_languages=["en"])
-        self.anonymizer = AnonymizerEngine()
-
-        # Configure replacements per entity type
-        # Operator configurations for current Presidio versions
-        self._operators_config: Dict[str, OperatorConfig] = {
-            "PERSON": OperatorConfig(operator_name="replace", params={"new_value": "<PERSON>"}),
-            "EMAIL_ADDRESS": OperatorConfig(operator_name="replace", params={"new_value": "<EMAIL>"}),
-            "IP_ADDRESS": OperatorConfig(operator_name="replace", params={"new_value": "<IP>"}),
-            "DEFAULT": OperatorConfig(operator_name="replace", params={"new_value": "<REDACTED>"}),
-        }
+        self.batch_analyzer = BatchAnalyzerEngine(analyzer_engine=self.analyzer)
 
     def redact_text(self, text: str, skip_entities: list[str] | None = None) -> str:
         """Redact PII from text and log a concise audit trail.
@@ -52,38 +190,152 @@ class PIIRedactionService:
         """
         if not text:
             return text
+        return self.redact_many([text], skip_entities=skip_entities)[0]
+
+    def redact_many(self, texts: List[str], skip_entities: list[str] | None = None) -> List[str]:
+        """Redact a batch of texts, sending only the ones that may name a person through NER.
 
+        Results are memoized by (text hash, entity set), and only distinct
+        uncached texts are analyzed, batched through spaCy's ``nlp.pipe``.
+        """
+        entities = tuple(e for e in REDACTED_ENTITIES if e not in set(skip_entities or []))
+        if not entities:
+            return list(texts)
+        out: List[str | None] = [None] * len(texts)
+        pending: Dict[str, List[int]] = {}
+        with self._cache_lock:
+            for i, text in enumerate(texts):
+                if not text:
+                    out[i] = text
+                    continue
+                key = self._cache_key(text, entities)
+                cached = self._cache.get(key)
+                if cached is not None:
+                    self._cache.move_to_end(key)
+                    out[i] = cached
+                else:
+                    pending.setdefault(text, []).append(i)
+
+        if pending:
+            distinct = list(pending)
+            spans = [regex_spans(t, entities) for t in distinct]
+            ok = True
+            if "PERSON" in entities:
+                ok = self._add_person_spans(distinct, spans)
+            redacted_texts = [self._anonymize(t, s) for t, s in zip(distinct, spans)]
+            if ok:
+                with self._cache_lock:
+                    for text, redacted in zip(distinct, redacted_texts):
+                        self._cache[self._cache_key(text, entities)] = redacted
+                    while len(self._cache) > self.cache_size:
+                        self._cache.popitem(last=False)
+            for text, redacted in zip(distinct, redacted_texts):
+                for i in pending[text]:
+                    out[i] = redacted
+        return out  # type: ignore[return-value]
+
+    def _add_person_spans(self, texts: List[str], spans: List[List[tuple[int, int, str]]]) -> bool:
+        """Append PERSON spans to ``spans``; False if NER failed (the result must not be cached)."""
+        if not self.presidio_enabled:
+            for text, found in zip(texts, spans):
+                found.extend(person_spans(text))
+            return True
+        candidates = [i for i, t in enumerate(texts) if not self.person_gate or may_contain_person(t)]
+        self.ner_texts += len(candidates)
+        self.ner_skipped += len(texts) - len(candidates)
+        if not candidates:
+            return True
         try:
-            entities = ["PERSON", "EMAIL_ADDRESS", "IP_ADDRESS"]
-            if skip_entities:
-                entities = [e for e in entities if e not in set(skip_entities)]
-            results: List[RecognizerResult] = self.analyzer.analyze(
-                text=text,
+            results = self.batch_analyzer.analyze_iterator(
+                texts=[texts[i] for i in candidates],
                 language="en",
-                entities=entities,
+                batch_size=self.batch_size,
+                entities=["PERSON"],
             )
-
-            redacted = self.anonymizer.anonymize(
-                text=text,
-                analyzer_results=results,
-                operators=self._operators_config,
-            ).text
+            for i, found in zip(candidates, results):
+                spans[i].extend((r.start, r.end, r.entity_type) for r in found)
         except Exception as exc:
-            # Never break the pipeline due to redaction; log and return original
+            # Never break the pipeline due to redaction; log and keep the pattern matches
             self.logger.warning("PII redaction error: %s", exc)
+            return False
+        return True
+
+    def redact_variants(self, texts: List[str]) -> Dict[str, List[str]]:
+        """Redact texts under every precomputed policy: {property name: redacted texts}."""
+        return {
+            prop: self.redact_many(texts, skip_entities=list(skipped))
+            for skipped, prop in REDACTION_VARIANTS.items()
+        }
+
+    @staticmethod
+    def _cache_key(text: str, entities: tuple[str, ...]) -> tuple[str, tuple[str, ...]]:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest(), entities
+
+    def _anonymize(self, text: str, spans: List[tuple[int, int, str]]) -> str:
+        if not spans:
             return text
+        # Earliest first and, at the same start, longest first; overlapping spans are dropped
+        kept: List[tuple[int, int, str]] = []
+        for start, end, entity in sorted(spans, key=lambda s: (s[0], -s[1])):
+            if kept and start < kept[-1][1]:
+                continue
+            kept.append((start, end, entity))
+        parts: List[str] = []
+        position = 0
+        counts: Dict[str, int] = {}
+        for start, end, entity in kept:
+            parts.append(text[position:start])
+            parts.append(REPLACEMENTS.get(entity, "<REDACTED>"))
+            position = end
+            counts[entity] = counts.get(entity, 0) + 1
+        parts.append(text[position:])
+        redacted = "".join(parts)
+        for entity, count in counts.items():
+            PII_ENTITIES.labels(entity=entity).inc(count)
 
-        if results:
-            counts: Dict[str, int] = {}
-            for r in results:
-                counts[r.entity_type] = counts.get(r.entity_type, 0) + 1
-            summary = ", ".join(f"{k}:{v}" for k, v in sorted(counts.items()))
-            self.logger.info(
-                "PII redaction applied | entities=%s | original_len=%d | redacted_len=%d",
-                summary,
-                len(text),
-                len(redacted),
-            )
+        summary = ", ".join(f"{k}:{v}" for k, v in sorted(counts.items()))
+        self.logger.info(
+            "PII redaction applied | entities=%s | original_len=%d | redacted_len=%d",
+            summary,
+            len(text),
+            len(redacted),
+        )
         return redacted
 
 
+# A sentence ends at terminal punctuation followed by whitespace, or at a newline.
+# Initials and honorifics ("John F. Kennedy", "Dr. Smith") are not boundaries, so a
+# name is never split across two redaction calls.
+_SENTENCE_END = re.compile(
+    r"(?<!\b[A-Z])(?<!\bMr)(?<!\bMs)(?<!\bDr)(?<!\bMrs)(?<!\bProf)[.!?](?=\s)|\n"
+)
+
+
+class StreamingRedactor:
+    """Redacts a token stream one complete sentence at a time.
+
+    Tokens are buffered until a sentence boundary, and only whole sentences are
+    passed through ``redact_text``, so an entity split across tokens is never
+    emitted unredacted. ``flush`` releases whatever remains at end of stream.
+    """
+
+    def __init__(self, pii_service: PIIRedactionService, skip_entities: list[str] | None = None) -> None:
+        self.pii_service = pii_service
+        self.skip_entities = skip_entities
+        self._buffer = ""
+
+    def feed(self, token: str) -> List[str]:
+        self._buffer += token
+        last_end = -1
+        for match in _SENTENCE_END.finditer(self._buffer):
+            last_end = match.end()
+        if last_end < 0:
+            return []
+        ready, self._buffer = self._buffer[:last_end], self._buffer[last_end:]
+        return [self.pii_service.redact_text(ready, skip_entities=self.skip_entities)]
+
+    def flush(self) -> List[str]:
+        if not self._buffer:
+            return []
+        remaining, self._buffer = self._buffer, ""
+        return [self.pii_service.redact_text(remaining, skip_entities=self.skip_entities)]
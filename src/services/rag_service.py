@@ -1,180 +1,197 @@
-import weaviate
-from sentence_transformers import CrossEncoder, SentenceTransformer
-from openai import OpenAI
+from src.core.concurrency import run_cpu, run_io
 from src.core.config import settings
-from src.models.api import Citation
-from typing import List
-from weaviate.connect import ConnectionParams
-from tenacity import retry, stop_after_attempt, wait_fixed
-import weaviate.classes as wvc
-from src.services.pii_service import PIIRedactionService
-import os
+from src.core.metrics import CACHE_REQUESTS
+from src.core.registry import ModelRegistry, get_registry
+from src.core.tracing import Trace, annotate, current_trace, span, start_trace
+from src.models.api import CacheInfo, Citation
+from typing import Any, Iterator, List
+from src.services.embeddings import embedding_model_id
+from src.services.pii_service import PIIRedactionService, StreamingRedactor, variant_property
+from src.services.reranking import prune_candidates, score_pairs
+from src.services.retrieval import RetrievalPlanner, RetrievalStrategy, normalize_source
+from src.services.vector_store import VectorStore
+import logging
+import math
+import time
+import numpy as np
+from uuid import uuid4
+from openai import OpenAIError
+
+# Number of reranked chunks used as prompt context and returned as citations
+TOP_K = 3
 
 class RAGService:
-    def __init__(self, pii_service: PIIRedactionService | None = None):
-        self.weaviate_client = self._connect_with_retry()
-        self.openai_client = OpenAI(api_key=settings.OPENAI_API_KEY)
+    def __init__(self, pii_service: PIIRedactionService | None = None, registry: ModelRegistry | None = None):
+        self.registry = registry or get_registry()
+        self.logger = logging.getLogger("uvicorn.error")
+        self.store: VectorStore = self.registry.vector_store
+        self.openai_client = self.registry.openai_client
         # Embeddings backend
         self.use_openai_embeddings = bool(settings.USE_OPENAI_EMBEDDINGS)
-        if not self.use_openai_embeddings:
-            self.embedding_model = SentenceTransformer(settings.EMBEDDING_MODEL, device="cpu")
+        self.embedding_model_name = (
+            "text-embedding-3-large"
+            if self.use_openai_embeddings
+            else embedding_model_id(settings.EMBEDDING_MODEL, settings.EMBEDDING_BACKEND)
+        )
+        self.embedding_cache = self.registry.embedding_cache if settings.EMBEDDING_CACHE_ENABLED else None
         # Reranker backend
         self.use_openai_reranker = bool(settings.USE_OPENAI_RERANKER)
-        if not self.use_openai_reranker:
-            self.reranker = CrossEncoder(settings.RERANKER_MODEL)
-        self.collection_name = "ComplianceDocument"
-        self.pii_service = pii_service or PIIRedactionService()
-
-    @retry(stop=stop_after_attempt(10), wait=wait_fixed(2))
-    def _connect_with_retry(self):
-        weaviate_url = os.environ.get("WEAVIATE_URL", "").strip()
-        if weaviate_url:
-            client = weaviate.WeaviateClient(ConnectionParams.from_url(weaviate_url))
-            client.connect()
-            return client
-        client = weaviate.WeaviateClient(ConnectionParams.from_params(
-            http_host="weaviate",
-            http_port=8080,
-            http_secure=False,
-            grpc_host="weaviate",
-            grpc_port=50051,
-            grpc_secure=False,
-        ))
-        client.connect()
-        return client
+        self.pii_service = pii_service or self.registry.pii_service
+        self.planner = RetrievalPlanner()
+        self.answer_cache = self.registry.answer_cache if settings.ANSWER_CACHE_ENABLED else None
+        self._last_cache_info = CacheInfo()
+        self._last_trace: Trace | None = None
+
+    @property
+    def embedding_model(self) -> Any:
+        # Models are resolved on first use: a cached answer needs neither
+        return self.registry.embedding_model
+
+    @property
+    def reranker(self) -> Any:
+        return self.registry.reranker
+
+    @property
+    def last_trace(self) -> Trace | None:
+        """Trace of the most recent query on this service (None before the first)."""
+        return self._last_trace
+
+    @property
+    def last_cache_info(self) -> CacheInfo:
+        """How the answer cache served the most recent query."""
+        return self._last_cache_info
 
     def _embed(self, text: str) -> list[float]:
+        with span("embed", model=self.embedding_model_name):
+            if self.embedding_cache is not None:
+                computed: list[str] = []
+
+                def compute(texts: list[str]) -> list[list[float]]:
+                    computed.extend(texts)
+                    return [self._compute_embedding(texts[0])]
+
+                vector = self.embedding_cache.embed(self.embedding_model_name, [text], compute)[0]
+                annotate(cached=not computed)
+                return vector
+            return self._compute_embedding(text)
+
+    def _compute_embedding(self, text: str) -> list[float]:
         if self.use_openai_embeddings:
             v = self.openai_client.embeddings.create(model="text-embedding-3-large", input=text).data[0].embedding
             return v
         return self.embedding_model.encode(text, normalize_embeddings=True).tolist()
 
-    def _rerank(self, query: str, docs: list[str]) -> list[float]:
+    def _rerank(
+        self,
+        query: str,
+        docs: list[str],
+        doc_vectors: list[list[float]] | None = None,
+        query_vector: list[float] | None = None,
+    ) -> list[float]:
         if self.use_openai_reranker:
             # Use direct relevance scoring via embeddings cosine similarity as a light proxy
-            qv = self._embed(query)
-            import numpy as np
-            q = np.array(qv, dtype=float)
-            scores = []
-            for d in docs:
-                dv = self.openai_client.embeddings.create(model="text-embedding-3-large", input=d).data[0].embedding
-                v = np.array(dv, dtype=float)
-                sim = float(q @ v / (np.linalg.norm(q) * np.linalg.norm(v) + 1e-8))
-                scores.append(sim)
-            return scores
-        # Fallback to CrossEncoder
-        return self.reranker.predict([[query, d] for d in docs]).tolist()
+            return self._cosine_rerank(query, docs, doc_vectors, query_vector)
+        # Fallback to the local cross-encoder, length-bucketed and truncated
+        return score_pairs(self.reranker, query, docs, settings.RERANK_BATCH_SIZE, settings.RERANK_MAX_LENGTH).tolist()
 
-    def query(self, query: str, source: str | None = None, strict_privacy: bool = True) -> tuple[str, List[Citation], str, float]:
+    def _cosine_rerank(
+        self,
+        query: str,
+        docs: list[str],
+        doc_vectors: list[list[float]] | None,
+        query_vector: list[float] | None,
+    ) -> list[float]:
+        """Score docs by cosine similarity to the query in one vectorized pass.
+
+        Reuses the vectors Weaviate already stores when every candidate has one
+        (they share the query embedding's space); otherwise embeds the query and
+        all docs in a single batched embeddings call.
+        """
+        if not docs:
+            return []
+        if query_vector is not None and doc_vectors is not None and len(doc_vectors) == len(docs) and all(doc_vectors):
+            q = np.asarray(query_vector, dtype=np.float32)
+            m = np.asarray(doc_vectors, dtype=np.float32)
+        else:
+            out = self.openai_client.embeddings.create(model="text-embedding-3-large", input=[query, *docs])
+            vectors = [d.embedding for d in sorted(out.data, key=lambda d: d.index)]
+            q = np.asarray(vectors[0], dtype=np.float32)
+            m = np.asarray(vectors[1:], dtype=np.float32)
+        denom = np.linalg.norm(m, axis=1) * np.linalg.norm(q) + 1e-8
+        return (m @ q / denom).tolist()
+
+    def _retrieve(self, query: str, source: str | None, query_embedding: list[float] | None = None) -> tuple[List[dict], list[float]]:
+        """Embed (unless given the embedding), search and rerank.
+
+        Returns deduplicated results, best first, and the query embedding.
+        """
         # 1. Get query embedding
-        query_embedding = self._embed(query)
-
-        # 2. Hybrid Search
-        collection = self.weaviate_client.collections.get(self.collection_name)
-        
-        # Prepare DB-level filters if a specific source is targeted (try basename first, then full path)
-        filter_basename = None
-        filter_fullpath = None
-        src_name = None
-        if source:
-            src_name = os.path.basename(source)
-            filter_basename = wvc.query.Filter.by_property("source").equal(src_name)
-            filter_fullpath = wvc.query.Filter.by_property("source").equal(source)
-
-        def run_hybrid(alpha: float, filters: object | None):
-            return collection.query.hybrid(
-                query=query,
-                vector=query_embedding,
-                alpha=alpha,
+        if query_embedding is None:
+            query_embedding = self._embed(query)
+        search_results = self._search(query, source, query_embedding)
+        return self._rank(query, search_results, query_embedding), query_embedding
+
+    def _search(self, query: str, source: str | None, query_embedding: list[float]) -> List[dict]:
+        # 2. Hybrid Search (single source filter; fallbacks only run concurrently on a miss)
+        def run_hybrid() -> List[dict]:
+            return self.store.hybrid_search(
+                query,
+                query_embedding,
+                alpha=0.5,
                 limit=50,
-                filters=filters,
-                return_metadata=wvc.query.MetadataQuery(score=True)
+                source=source,
+                # Stored vectors let the OpenAI reranker skip re-embedding candidates
+                include_vector=self.use_openai_reranker,
             )
 
-        # Try basename filter first, then fullpath, then no filter
-        response = run_hybrid(alpha=0.5, filters=filter_basename)
+        def fetch_by_source() -> List[dict]:
+            results = [r for r in self.store.fetch_by_source(source, limit=10) if r.get("content")]  # type: ignore[arg-type]
+            results.sort(key=lambda x: int(x.get("page_number", 9999)))
+            return results
 
-        search_results = []
-        if response.objects:
-            for o in response.objects:
-                result = o.properties
-                result['score'] = o.metadata.score
-                search_results.append(result)
+        strategies = [RetrievalStrategy("hybrid", run_hybrid)]
+        if source:
+            strategies.append(RetrievalStrategy("fetch_by_source", fetch_by_source))
+        with span("search", filtered=bool(source)):
+            _, search_results = self.planner.execute(strategies)
 
-        # Fallback BM25-only with filter
-        if not search_results:
-            response = run_hybrid(alpha=0.0, filters=filter_basename)
-            if response.objects:
-                for o in response.objects:
-                    result = o.properties
-                    result['score'] = o.metadata.score
-                    search_results.append(result)
-
-        # Fallback hybrid with fullpath
-        if not search_results and filter_fullpath is not None:
-            response = run_hybrid(alpha=0.5, filters=filter_fullpath)
-            if response.objects:
-                for o in response.objects:
-                    result = o.properties
-                    result['score'] = o.metadata.score
-                    search_results.append(result)
-
-        # Fallback hybrid without filter
-        if not search_results and (filter_basename is not None or filter_fullpath is not None):
-            response = run_hybrid(alpha=0.5, filters=None)
-            if response.objects:
-                for o in response.objects:
-                    result = o.properties
-                    result['score'] = o.metadata.score
-                    search_results.append(result)
-
-        # Fallback fetch by source
-        if not search_results and (filter_basename is not None or filter_fullpath is not None):
-            try:
-                fetched = collection.query.fetch_objects(limit=10, filters=filter_basename or filter_fullpath)
-                if (not fetched.objects) and (filter_fullpath is not None):
-                    fetched = collection.query.fetch_objects(limit=10, filters=filter_fullpath)
-                if fetched.objects:
-                    for o in fetched.objects:
-                        search_results.append({**o.properties})
-                    search_results.sort(key=lambda x: int(x.get("page_number", 9999)))
-            except Exception:
-                pass
-
-        if not search_results and source:
-            try:
-                broad = collection.query.fetch_objects(limit=100)
-                candidates: list[dict] = []
-                if broad.objects:
-                    src_name = os.path.basename(source)
-                    for o in broad.objects:
-                        props = o.properties or {}
-                        src_val = str(props.get("source", ""))
-                        if not src_val:
-                            continue
-                        if src_val == source or os.path.basename(src_val) == src_name or src_val.endswith(f"/{src_name}"):
-                            if props.get("content"):
-                                candidates.append(props)
-                if candidates:
-                    candidates.sort(key=lambda x: int(x.get("page_number", 9999)))
-                    search_results = candidates[:10]
-            except Exception:
-                pass
-
-        if source and search_results:
-            src_name = os.path.basename(source)
-            search_results = [
-                r for r in search_results
-                if os.path.basename(r.get("source", "")) == src_name or r.get("source", "") == source
-            ]
+            if source and search_results:
+                src_name = normalize_source(source)
+                search_results = [
+                    r for r in search_results
+                    if normalize_source(str(r.get("source", ""))) == src_name
+                ]
+                annotate(results=len(search_results))
+        return search_results
 
+    def _rank(self, query: str, search_results: List[dict], query_embedding: list[float]) -> List[dict]:
         # 3. Reranking
         if not search_results:
-            return "No results found.", [], self._new_trace_id(), 0.0
+            return []
+        candidates = len(search_results)
+        search_results = prune_candidates(search_results, settings.RERANK_TOP_N)
+        started = time.perf_counter()
         docs = [r["content"] for r in search_results]
-        cross_scores = self._rerank(query, docs)
+        with span(
+            "rerank",
+            candidates=candidates,
+            scored=len(docs),
+            backend="openai" if self.use_openai_reranker else settings.RERANKER_BACKEND,
+        ):
+            if self.use_openai_reranker:
+                cross_scores = self._rerank(
+                    query,
+                    docs,
+                    doc_vectors=[r.get("vector") for r in search_results],
+                    query_vector=query_embedding,
+                )
+            else:
+                cross_scores = self._rerank(query, docs)
         for result, score in zip(search_results, cross_scores):
             result["rerank_score"] = float(score)
+        self.logger.debug(
+            "Reranked %d of %d candidates in %.1f ms", len(docs), candidates, (time.perf_counter() - started) * 1000
+        )
         reranked_results = sorted(search_results, key=lambda x: x["rerank_score"], reverse=True)
 
         # Dedupe
@@ -188,20 +205,38 @@ class RAGService:
                 seen.add(key)
                 unique.append(r)
             return unique
-        reranked_results = _dedupe(reranked_results)
+        return _dedupe(reranked_results)
 
-        # 4. Prompt
-        top_k = 3
-        selected = reranked_results[:top_k]
-        redacted_context_parts: List[str] = []
+    @staticmethod
+    def _skip_entities(query: str, strict_privacy: bool) -> list[str]:
         lower_q = query.lower()
-        skip_entities: list[str] = []
         if not strict_privacy and any(word in lower_q for word in ["author", "who is", "who's", "person", "name"]):
-            skip_entities = ["PERSON"]
-        for result in selected:
-            content = result["content"]
-            redacted_content = self.pii_service.redact_text(content, skip_entities=skip_entities)
-            redacted_context_parts.append(f"Source: {result['source']}, Page: {result['page_number']}\nContent: {redacted_content}")
+            return ["PERSON"]
+        return []
+
+    def _redact_selected(self, selected: List[dict], skip_entities: list[str]) -> List[str]:
+        """Redacted content for each selected chunk, shared by the prompt context and the citations.
+
+        Uses the variant precomputed at ingest when the chunk has one; any
+        remaining chunks go through a single batched NER pass.
+        """
+        prop = variant_property(skip_entities)
+        redacted = [r.get(prop) if prop else None for r in selected]
+        missing = [i for i, text in enumerate(redacted) if text is None]
+        with span("redact_context", chunks=len(selected), precomputed=len(selected) - len(missing)):
+            if missing:
+                computed = self.pii_service.redact_many([selected[i]["content"] for i in missing], skip_entities=skip_entities)
+                for i, text in zip(missing, computed):
+                    redacted[i] = text
+        return redacted  # type: ignore[return-value]
+
+    def _build_messages(self, query: str, selected: List[dict], redacted_contents: List[str]) -> list[dict]:
+        redacted_context_parts: List[str] = []
+        for result, redacted_content in zip(selected, redacted_contents):
+            section = f", Section: {result['section']}" if result.get("section") else ""
+            redacted_context_parts.append(
+                f"Source: {result['source']}, Page: {result['page_number']}{section}\nContent: {redacted_content}"
+            )
         context = "\n".join(redacted_context_parts)
         prompt = f"""
         You are the Compliance Copilot. Answer the user's query based on the following context.
@@ -214,40 +249,264 @@ class RAGService:
 
         Answer:
         """
+        return [
+            {"role": "system", "content": "You are a helpful assistant that provides answers with citations."},
+            {"role": "user", "content": prompt},
+        ]
 
-        llm_response = self.openai_client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant that provides answers with citations."},
-                {"role": "user", "content": prompt},
-            ],
-            temperature=0.0,
-        )
-        raw_answer = llm_response.choices[0].message.content or "No answer found."
-        answer = self.pii_service.redact_text(raw_answer, skip_entities=skip_entities)
-
-        citations = [
+    @staticmethod
+    def _citations(selected: List[dict], redacted_contents: List[str], strict_privacy: bool) -> List[Citation]:
+        return [
             Citation(
                 source=result["source"],
                 page_number=result["page_number"],
-                text=self.pii_service.redact_text(result["content"], skip_entities=skip_entities) if strict_privacy else result["content"],
+                text=redacted_content if strict_privacy else result["content"],
                 score=float(result["rerank_score"]),
+                page_end=result.get("page_end"),
+                section=result.get("section") or None,
             )
-            for result in reranked_results[:top_k]
+            for result, redacted_content in zip(selected, redacted_contents)
         ]
 
-        import math
-        scores = [max(-20.0, min(20.0, float(r.get("rerank_score", 0.0)))) for r in reranked_results[:top_k]]
-        if scores:
-            exps = [math.exp(s - max(scores)) for s in scores]
-            sm = [e / (sum(exps) or 1.0) for e in exps]
-            groundedness = float(sum(sm) / len(sm))
-        else:
-            groundedness = 0.0
+    @staticmethod
+    def _groundedness(selected: List[dict]) -> float:
+        scores = [max(-20.0, min(20.0, float(r.get("rerank_score", 0.0)))) for r in selected]
+        if not scores:
+            return 0.0
+        exps = [math.exp(s - max(scores)) for s in scores]
+        sm = [e / (sum(exps) or 1.0) for e in exps]
+        return float(sum(sm) / len(sm))
+
+    def _cache_lookup(
+        self, query: str, source: str | None, strict_privacy: bool, skip_entities: list[str]
+    ) -> tuple[dict | None, list[float] | None]:
+        """Cached answer for this request, if any, plus the query embedding if the lookup computed one."""
+        self._last_cache_info = CacheInfo()
+        if self.answer_cache is None:
+            return None, None
+        with span("cache_lookup"):
+            entry, embedding = self.answer_cache.lookup(
+                query,
+                normalize_source(source) if source else None,
+                strict_privacy,
+                ",".join(skip_entities),
+                embed=self._embed,
+                model=self.embedding_model_name,
+                min_similarity=settings.ANSWER_CACHE_SIMILARITY,
+            )
+            annotate(hit=entry is not None)
+            CACHE_REQUESTS.labels(cache="answer", result="hit" if entry is not None else "miss").inc()
+            if entry is not None:
+                annotate(match=entry["match"])
+                self._last_cache_info = CacheInfo(
+                    hit=True, match=entry["match"], similarity=entry["similarity"], age_seconds=entry["age_seconds"]
+                )
+        return entry, embedding
+
+    def _cache_store(
+        self,
+        query: str,
+        source: str | None,
+        strict_privacy: bool,
+        skip_entities: list[str],
+        answer: str,
+        citations: List[Citation],
+        groundedness: float,
+        query_embedding: list[float],
+    ) -> None:
+        if self.answer_cache is None:
+            return
+        with span("cache_store"):
+            self.answer_cache.put(
+                query,
+                normalize_source(source) if source else None,
+                strict_privacy,
+                ",".join(skip_entities),
+                answer,
+                [c.model_dump() for c in citations],
+                groundedness,
+                embedding=query_embedding,
+                model=self.embedding_model_name,
+            )
+
+    def _from_cache(self, entry: dict) -> tuple[str, List[Citation], str, float]:
+        return entry["answer"], [Citation(**c) for c in entry["citations"]], self._trace_id(), entry["groundedness"]
+
+    def query(self, query: str, source: str | None = None, strict_privacy: bool = True) -> tuple[str, List[Citation], str, float]:
+        with start_trace("query", filtered=bool(source), strict_privacy=strict_privacy) as trace:
+            self._last_trace = trace
+            return self._query(query, source, strict_privacy)
 
-        trace_id = self._new_trace_id()
+    def _query(self, query: str, source: str | None, strict_privacy: bool) -> tuple[str, List[Citation], str, float]:
+        skip_entities = self._skip_entities(query, strict_privacy)
+        cached, query_embedding = self._cache_lookup(query, source, strict_privacy, skip_entities)
+        if cached is not None:
+            return self._from_cache(cached)
+
+        reranked_results, query_embedding = self._retrieve(query, source, query_embedding)
+        if not reranked_results:
+            return "No results found.", [], self._trace_id(), 0.0
+
+        # 4. Prompt
+        selected = reranked_results[:TOP_K]
+        redacted_contents = self._redact_selected(selected, skip_entities)
+        citations = self._citations(selected, redacted_contents, strict_privacy)
+        groundedness = self._groundedness(selected)
+        trace_id = self._trace_id()
+        with span("llm", model="gpt-4o"):
+            llm_response = self.openai_client.chat.completions.create(
+                model="gpt-4o",
+                messages=self._build_messages(query, selected, redacted_contents),
+                temperature=0.0,
+            )
+        raw_answer = llm_response.choices[0].message.content or "No answer found."
+        with span("redact_answer"):
+            answer = self.pii_service.redact_text(raw_answer, skip_entities=skip_entities)
+        self._cache_store(query, source, strict_privacy, skip_entities, answer, citations, groundedness, query_embedding)
         return answer, citations, trace_id, groundedness
 
-    def _new_trace_id(self) -> str:
-        from uuid import uuid4
-        return str(uuid4())
+    async def aquery(self, query: str, source: str | None = None, strict_privacy: bool = True) -> tuple[str, List[Citation], str, float]:
+        """Non-blocking ``query``: model work runs on the bounded CPU executor,
+        Weaviate calls on the I/O executor and the LLM call on the async OpenAI client."""
+        with start_trace("query", filtered=bool(source), strict_privacy=strict_privacy) as trace:
+            self._last_trace = trace
+            return await self._aquery(query, source, strict_privacy)
+
+    async def _aquery(self, query: str, source: str | None, strict_privacy: bool) -> tuple[str, List[Citation], str, float]:
+        run_embed = run_io if self.use_openai_embeddings else run_cpu
+        run_rerank = run_io if self.use_openai_reranker else run_cpu
+        skip_entities = self._skip_entities(query, strict_privacy)
+        cached, query_embedding = await run_embed(self._cache_lookup, query, source, strict_privacy, skip_entities)
+        if cached is not None:
+            return self._from_cache(cached)
+
+        if query_embedding is None:
+            query_embedding = await run_embed(self._embed, query)
+        search_results = await run_io(self._search, query, source, query_embedding)
+        reranked_results = await run_rerank(self._rank, query, search_results, query_embedding)
+        if not reranked_results:
+            return "No results found.", [], self._trace_id(), 0.0
+
+        selected = reranked_results[:TOP_K]
+        redacted_contents = await run_cpu(self._redact_selected, selected, skip_entities)
+        messages = self._build_messages(query, selected, redacted_contents)
+        citations = self._citations(selected, redacted_contents, strict_privacy)
+        groundedness = self._groundedness(selected)
+        with span("llm", model="gpt-4o"):
+            llm_response = await self.registry.async_openai_client.chat.completions.create(
+                model="gpt-4o",
+                messages=messages,
+                temperature=0.0,
+            )
+        raw_answer = llm_response.choices[0].message.content or "No answer found."
+        with span("redact_answer"):
+            answer = await run_cpu(self.pii_service.redact_text, raw_answer, skip_entities=skip_entities)
+        await run_io(
+            self._cache_store, query, source, strict_privacy, skip_entities, answer, citations, groundedness, query_embedding
+        )
+        return answer, citations, self._trace_id(), groundedness
+
+    def query_stream(
+        self, query: str, source: str | None = None, strict_privacy: bool = True, debug: bool = False
+    ) -> Iterator[tuple[str, Any]]:
+        """Streaming variant of ``query`` yielding ``(event, data)`` pairs.
+
+        Emits ``citations`` as soon as reranking finishes, then ``token`` events
+        with answer text released one redacted sentence at a time, then ``done``
+        with the trace id, groundedness and cache metadata (and the spans, with
+        ``debug``). A cached answer is sent as a single ``token`` event.
+        """
+        # The consumer may resume this generator from another context, so the
+        # trace is activated around each stretch of work, never across a yield
+        trace = Trace("query", filtered=bool(source), strict_privacy=strict_privacy, streamed=True)
+        self._last_trace = trace
+        try:
+            yield from self._query_stream(trace, query, source, strict_privacy, debug)
+        except GeneratorExit:
+            trace.finish(error="cancelled")
+            raise
+        except BaseException as exc:
+            trace.finish(error=f"{type(exc).__name__}: {exc}")
+            raise
+
+    def _query_stream(
+        self, trace: Trace, query: str, source: str | None, strict_privacy: bool, debug: bool
+    ) -> Iterator[tuple[str, Any]]:
+        with trace.activate():
+            skip_entities = self._skip_entities(query, strict_privacy)
+            cached, query_embedding = self._cache_lookup(query, source, strict_privacy, skip_entities)
+        if cached is not None:
+            yield "citations", cached["citations"]
+            yield "token", cached["answer"]
+            yield "done", self._stream_done(trace, cached["groundedness"], debug)
+            return
+
+        with trace.activate():
+            reranked_results, query_embedding = self._retrieve(query, source, query_embedding)
+        if not reranked_results:
+            yield "citations", []
+            yield "token", "No results found."
+            yield "done", self._stream_done(trace, 0.0, debug)
+            return
+
+        with trace.activate():
+            selected = reranked_results[:TOP_K]
+            redacted_contents = self._redact_selected(selected, skip_entities)
+            citations = self._citations(selected, redacted_contents, strict_privacy)
+        yield "citations", [c.model_dump() for c in citations]
+
+        started = time.perf_counter()
+        try:
+            stream = self.openai_client.chat.completions.create(
+                model="gpt-4o",
+                messages=self._build_messages(query, selected, redacted_contents),
+                temperature=0.0,
+                stream=True,
+            )
+        except OpenAIError as exc:
+            trace.record("llm", time.perf_counter() - started, model="gpt-4o").error = f"{type(exc).__name__}: {exc}"
+            raise
+        redactor = StreamingRedactor(self.pii_service, skip_entities=skip_entities)
+        segments: List[str] = []
+        first_token: float | None = None
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content or ""
+            if first_token is None and delta:
+                first_token = time.perf_counter() - started
+            for segment in redactor.feed(delta):
+                segments.append(segment)
+                yield "token", segment
+        for segment in redactor.flush():
+            segments.append(segment)
+            yield "token", segment
+        # Includes the time the consumer spent on each token event
+        trace.record(
+            "llm",
+            time.perf_counter() - started,
+            model="gpt-4o",
+            first_token_ms=round((first_token or 0.0) * 1000, 3),
+            segments=len(segments),
+        )
+        if not segments:
+            segments.append("No answer found.")
+            yield "token", segments[0]
+        with trace.activate():
+            groundedness = self._groundedness(selected)
+            self._cache_store(
+                query, source, strict_privacy, skip_entities, "".join(segments), citations, groundedness, query_embedding
+            )
+        yield "done", self._stream_done(trace, groundedness, debug)
+
+    def _stream_done(self, trace: Trace, groundedness: float, debug: bool) -> dict:
+        trace.finish()
+        done: dict = {"trace_id": trace.trace_id, "groundedness": groundedness, "cache": self._last_cache_info.model_dump()}
+        if debug:
+            done["spans"] = trace.to_dicts()
+        return done
+
+    @staticmethod
+    def _trace_id() -> str:
+        trace = current_trace()
+        return trace.trace_id if trace is not None else str(uuid4())
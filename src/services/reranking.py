@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+from typing import Any, List
+
+import numpy as np
+
+# torch: fp32 CrossEncoder; int8: torch dynamic int8 quantization of its Linear
+# layers; onnx / onnx-int8: exported once to ONNX_CACHE_DIR and run on ONNX Runtime
+RERANKER_BACKENDS = ("torch", "int8", "onnx", "onnx-int8")
+
+
+def prune_candidates(results: List[dict], top_n: int) -> List[dict]:
+    """Keep the ``top_n`` candidates by first-stage (hybrid) score before reranking.
+
+    Results without a score (the fetch-by-source fallback) keep their order.
+    ``top_n`` <= 0 disables pruning.
+    """
+    if top_n <= 0 or len(results) <= top_n:
+        return results
+    if all(r.get("score") is not None for r in results):
+        return sorted(results, key=lambda r: float(r["score"]), reverse=True)[:top_n]
+    return results[:top_n]
+
+
+def pair_lengths(tokenizer: Any, query: str, docs: List[str], max_length: int) -> List[int]:
+    """Truncated token length of each (query, doc) pair; character length without a tokenizer."""
+    if tokenizer is None:
+        return [len(query) + len(d) for d in docs]
+    encoded = tokenizer([query] * len(docs), docs, truncation="longest_first", max_length=max_length, return_length=True)
+    return [int(n) for n in encoded["length"]]
+
+
+def score_pairs(model: Any, query: str, docs: List[str], batch_size: int, max_length: int) -> np.ndarray:
+    """Cross-encoder scores for ``(query, doc)`` pairs, in input order.
+
+    Pairs are sorted by token length before batching, so each batch pads to
+    similar lengths instead of to the longest candidate overall.
+    """
+    if not docs:
+        return np.zeros(0, dtype=np.float32)
+    order = np.argsort(pair_lengths(getattr(model, "tokenizer", None), query, docs, max_length), kind="stable")
+    sorted_scores = model.predict([[query, docs[i]] for i in order], batch_size=batch_size, show_progress_bar=False)
+    scores = np.empty(len(docs), dtype=np.float32)
+    scores[order] = np.asarray(sorted_scores, dtype=np.float32).ravel()
+    return scores
+
+
+def load_cross_encoder(model_name: str, backend: str = "torch", max_length: int = 512) -> Any:
+    if backend not in RERANKER_BACKENDS:
+        raise ValueError(f"Unknown RERANKER_BACKEND {backend!r} (expected one of {', '.join(RERANKER_BACKENDS)})")
+    from sentence_transformers import CrossEncoder
+
+    model = CrossEncoder(model_name, max_length=max_length, device="cpu")
+    config = model.model.config
+    # RoBERTa-family models reserve two position ids for padding
+    positions = config.max_position_embeddings - (2 if "roberta" in config.model_type else 0)
+    if positions < max_length:
+        model.max_length = positions
+    if backend == "int8":
+        import torch
+
+        torch.quantization.quantize_dynamic(model.model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    elif backend.startswith("onnx"):
+        from src.services.onnx_backend import OnnxCrossEncoder
+
+        return OnnxCrossEncoder.from_cross_encoder(model, model_name, quantize=backend == "onnx-int8")
+    return model
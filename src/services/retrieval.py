@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import contextvars
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List
+
+import weaviate.classes as wvc
+
+from src.core.metrics import RETRIEVALS
+from src.core.tracing import annotate, span
+
+
+def normalize_source(source: str) -> str:
+    """Canonical form of a document source as stored at ingest time: its basename."""
+    return os.path.basename(source.strip())
+
+
+def source_filter(source: str) -> Any:
+    """DB-level filter for a single source.
+
+    ``source`` is a word-tokenized property, so an equality match on the
+    normalized basename also covers legacy objects stored under a full path.
+    """
+    return wvc.query.Filter.by_property("source").equal(normalize_source(source))
+
+
+class RetrievalStrategy:
+    """A named way of fetching candidate chunks; ``run`` returns result dicts."""
+
+    def __init__(self, name: str, run: Callable[[], List[dict]]) -> None:
+        self.name = name
+        self.run = run
+
+    def traced(self) -> List[dict]:
+        with span(f"strategy.{self.name}"):
+            results = self.run()
+            annotate(results=len(results))
+        return results
+
+
+class RetrievalPlanner:
+    """Runs a primary retrieval strategy and, only on a miss, all fallbacks at once.
+
+    Fallbacks are dispatched concurrently and the first non-empty one in plan
+    order wins, so a miss costs one extra round trip rather than one per
+    fallback. The answering strategy is logged and returned.
+    """
+
+    def __init__(self, logger: logging.Logger | None = None, max_workers: int = 4) -> None:
+        self.logger = logger or logging.getLogger("uvicorn.error")
+        self.max_workers = max_workers
+
+    def execute(self, strategies: List[RetrievalStrategy]) -> tuple[str | None, List[dict]]:
+        if not strategies:
+            return None, []
+        primary, *fallbacks = strategies
+        results = primary.traced()
+        if results or not fallbacks:
+            return self._answered(primary.name if results else None, results, fallback=False)
+
+        with ThreadPoolExecutor(max_workers=min(len(fallbacks), self.max_workers)) as pool:
+            # One context copy per task: a context can only be entered by one thread at a time
+            futures = [(s.name, pool.submit(contextvars.copy_context().run, s.traced)) for s in fallbacks]
+            for name, future in futures:
+                try:
+                    results = future.result()
+                except Exception as exc:
+                    self.logger.warning("Retrieval strategy %s failed: %s", name, exc)
+                    continue
+                if results:
+                    return self._answered(name, results, fallback=True)
+        return self._answered(None, [], fallback=True)
+
+    def _answered(self, name: str | None, results: List[dict], fallback: bool) -> tuple[str | None, List[dict]]:
+        self.logger.info("Retrieval answered | strategy=%s | results=%d", name or "none", len(results))
+        annotate(strategy=name or "none", fallback=fallback, results=len(results))
+        RETRIEVALS.labels(strategy=name or "none", fallback=str(fallback).lower()).inc()
+        return name, results
@@ -0,0 +1,255 @@
+from __future__ import annotations
+
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterator, List
+
+import weaviate.classes as wvc
+from weaviate.exceptions import WeaviateBatchError
+
+from src.services.manifest import IngestManifest
+from src.services.pii_service import REDACTION_VARIANTS
+from src.services.retrieval import normalize_source, source_filter
+
+COLLECTION_NAME = "ComplianceDocument"
+
+# Bounded retry policy for objects a batch insert reports as failed
+WRITE_ATTEMPTS = 3
+WRITE_BACKOFF_BASE = 0.5
+WRITE_BACKOFF_MAX = 4.0
+# Objects per page when listing a source's chunk ids
+EXISTING_IDS_PAGE = 1000
+
+
+class VectorStore(ABC):
+    """Chunk storage used by ingestion and retrieval.
+
+    Objects are chunk properties (``content``, ``source``, ``page_number`` and
+    the redacted variants) plus one vector, addressed by a caller-chosen uuid.
+    ``manifest`` holds the per-source ingest manifest (``get``/``put``).
+    Search results are property dicts with a ``score`` and, when requested,
+    the stored ``vector``. A backend missing any abstract method fails when it
+    is created; ``save`` and ``close`` are optional hooks.
+    """
+
+    manifest: Any
+
+    @abstractmethod
+    def create_schema(self) -> None:
+        ...
+
+    @abstractmethod
+    def hybrid_search(
+        self,
+        query: str,
+        vector: List[float],
+        alpha: float,
+        limit: int,
+        source: str | None = None,
+        include_vector: bool = False,
+    ) -> List[dict]:
+        """Fused keyword (BM25) and vector search; ``alpha`` = 1 is pure vector."""
+
+    @abstractmethod
+    def fetch_by_source(self, source: str, limit: int) -> List[dict]:
+        ...
+
+    @abstractmethod
+    def existing_ids(self, source: str) -> List[str]:
+        ...
+
+    @abstractmethod
+    def write_objects(self, objects: Dict[str, tuple[dict, List[float]]]) -> set[str]:
+        """Upsert ``{uuid: (properties, vector)}``; returns the ids that could not be written."""
+
+    @abstractmethod
+    def delete_ids(self, ids: set[str]) -> int:
+        ...
+
+    @abstractmethod
+    def iter_objects(self) -> Iterator[tuple[str, dict, List[float] | None]]:
+        """Every stored object as ``(uuid, properties, vector)``."""
+
+    def save(self) -> None:  # noqa: B027 - optional hook
+        """Persist pending changes (no-op for stores that write through)."""
+
+    def close(self) -> None:  # noqa: B027 - optional hook
+        pass
+
+
+def _object_vector(o: object) -> List[float] | None:
+    # weaviate-client returns either a bare list or a {name: vector} mapping
+    vector = getattr(o, "vector", None)
+    if isinstance(vector, dict):
+        vector = vector.get("default") or next(iter(vector.values()), None)
+    return list(vector) if vector else None
+
+
+class WeaviateVectorStore(VectorStore):
+    """Chunks in the ``ComplianceDocument`` collection of a connected Weaviate client."""
+
+    def __init__(self, client: Any, collection_name: str = COLLECTION_NAME) -> None:
+        self.client = client
+        self.collection_name = collection_name
+        self.manifest = IngestManifest(client)
+
+    def _collection(self) -> Any:
+        return self.client.collections.get(self.collection_name)
+
+    @staticmethod
+    def _stored_properties() -> list[wvc.config.Property]:
+        # Stored for retrieval only: not searchable, so BM25 keeps scoring the original text
+        return [
+            *(
+                wvc.config.Property(
+                    name=name,
+                    data_type=wvc.config.DataType.TEXT,
+                    index_searchable=False,
+                    index_filterable=False,
+                )
+                for name in REDACTION_VARIANTS.values()
+            ),
+            wvc.config.Property(
+                name="section",
+                data_type=wvc.config.DataType.TEXT,
+                index_searchable=False,
+            ),
+            wvc.config.Property(name="page_end", data_type=wvc.config.DataType.INT),
+        ]
+
+    def create_schema(self) -> None:
+        if not self.client.collections.exists(self.collection_name):
+            self.client.collections.create(
+                name=self.collection_name,
+                properties=[
+                    wvc.config.Property(
+                        name="content",
+                        data_type=wvc.config.DataType.TEXT,
+                        tokenization=wvc.config.Tokenization.WORD,
+                    ),
+                    wvc.config.Property(
+                        name="source", data_type=wvc.config.DataType.TEXT
+                    ),
+                    wvc.config.Property(
+                        name="page_number", data_type=wvc.config.DataType.INT
+                    ),
+                    *self._stored_properties(),
+                ],
+                vectorizer_config=wvc.config.Configure.Vectorizer.none(),
+            )
+        else:
+            # Collections created before these properties existed gain them in place
+            collection = self._collection()
+            existing = {p.name for p in collection.config.get().properties}
+            for prop in self._stored_properties():
+                if prop.name not in existing:
+                    collection.config.add_property(prop)
+        self.manifest.create_schema()
+
+    def hybrid_search(
+        self,
+        query: str,
+        vector: List[float],
+        alpha: float,
+        limit: int,
+        source: str | None = None,
+        include_vector: bool = False,
+    ) -> List[dict]:
+        response = self._collection().query.hybrid(
+            query=query,
+            vector=vector,
+            alpha=alpha,
+            limit=limit,
+            filters=source_filter(source) if source else None,
+            return_metadata=wvc.query.MetadataQuery(score=True),
+            include_vector=include_vector,
+        )
+        results = []
+        for o in response.objects or []:
+            result = dict(o.properties)
+            result["score"] = o.metadata.score
+            if include_vector:
+                result["vector"] = _object_vector(o)
+            results.append(result)
+        return results
+
+    def fetch_by_source(self, source: str, limit: int) -> List[dict]:
+        fetched = self._collection().query.fetch_objects(
+            limit=limit, filters=source_filter(source)
+        )
+        return [{**o.properties} for o in fetched.objects or []]
+
+    def existing_ids(self, source: str) -> List[str]:
+        # Filtered pages, resumed from the last uuid: a single fetch stops at
+        # QUERY_MAXIMUM_RESULTS, which large documents exceed. The filter is a
+        # word match, so the exact (normalized) source is checked here.
+        collection = self._collection()
+        ids: List[str] = []
+        after = None
+        while True:
+            page = (
+                collection.query.fetch_objects(
+                    limit=EXISTING_IDS_PAGE,
+                    after=after,
+                    filters=source_filter(source),
+                    return_properties=["source"],
+                ).objects
+                or []
+            )
+            ids.extend(
+                str(o.uuid)
+                for o in page
+                if normalize_source(str(o.properties.get("source", ""))) == source
+            )
+            if len(page) < EXISTING_IDS_PAGE:
+                return ids
+            after = page[-1].uuid
+
+    def write_objects(self, objects: Dict[str, tuple[dict, List[float]]]) -> set[str]:
+        """Batch-insert objects, retrying only the ones the batch reports as failed.
+
+        Ids are deterministic, so a retried or re-sent object overwrites itself
+        instead of creating a duplicate.
+        """
+        collection = self._collection()
+        pending = dict(objects)
+        for attempt in range(WRITE_ATTEMPTS):
+            if attempt:
+                time.sleep(
+                    min(WRITE_BACKOFF_BASE * 2 ** (attempt - 1), WRITE_BACKOFF_MAX)
+                )
+            try:
+                with collection.batch.dynamic() as batch:
+                    for uuid, (properties, vector) in pending.items():
+                        batch.add_object(
+                            properties=properties, vector=vector, uuid=uuid
+                        )
+            except WeaviateBatchError as e:
+                # A read-only shard (e.g. disk pressure) is transient; anything else is fatal
+                if "read-only" not in str(e).lower():
+                    raise
+                continue
+            failed_uuids = {
+                str(f.object_.uuid) for f in collection.batch.failed_objects
+            }
+            pending = {
+                uuid: item for uuid, item in pending.items() if uuid in failed_uuids
+            }
+            if not pending:
+                break
+        return set(pending)
+
+    def delete_ids(self, ids: set[str], batch_size: int = 500) -> int:
+        collection = self._collection()
+        ids_list = sorted(ids)
+        for start in range(0, len(ids_list), batch_size):
+            collection.data.delete_many(
+                where=wvc.query.Filter.by_id().contains_any(
+                    ids_list[start : start + batch_size]
+                )
+            )
+        return len(ids_list)
+
+    def iter_objects(self) -> Iterator[tuple[str, dict, List[float] | None]]:
+        for obj in self._collection().iterator(include_vector=True):
+            yield str(obj.uuid), dict(obj.properties), _object_vector(obj)
@@ -0,0 +1,67 @@
+import time
+
+from src.services.answer_cache import AnswerCache, normalize_query
+
+CITATIONS = [{"source": "a.pdf", "page_number": 1, "text": "Keep data 30 days.", "score": 0.9}]
+
+
+def _put(cache, query="What is the retention policy?", source="a.pdf", embedding=None):
+    cache.put(query, source, True, "", "30 days.", CITATIONS, 0.7, embedding=embedding, model="m")
+
+
+def test_normalized_query_hits_exactly():
+    cache = AnswerCache(":memory:")
+    _put(cache)
+
+    entry, embedding = cache.lookup("  what is the RETENTION policy ", "a.pdf", True, "")
+
+    assert normalize_query("What is X?") == "what is x"
+    assert entry["answer"] == "30 days."
+    assert entry["citations"] == CITATIONS
+    assert entry["match"] == "exact"
+    assert embedding is None
+    assert cache.lookup("what is the retention policy", "a.pdf", False, "")[0] is None
+    assert cache.lookup("what is the retention policy", "a.pdf", True, "PERSON")[0] is None
+    assert cache.stats()["hits"] == 1
+
+
+def test_similar_query_hits_within_threshold_only():
+    cache = AnswerCache(":memory:")
+    _put(cache, embedding=[1.0, 0.0])
+
+    entry, embedding = cache.lookup(
+        "how long do we keep data", "a.pdf", True, "", embed=lambda q: [0.99, 0.1], model="m", min_similarity=0.95
+    )
+    assert entry["match"] == "similar"
+    assert entry["similarity"] > 0.95
+    assert embedding == [0.99, 0.1]
+
+    entry, _ = cache.lookup(
+        "who is the dpo", "a.pdf", True, "", embed=lambda q: [0.0, 1.0], model="m", min_similarity=0.95
+    )
+    assert entry is None
+
+
+def test_ttl_and_size_eviction():
+    cache = AnswerCache(":memory:", max_entries=2, ttl_seconds=0.05)
+    _put(cache, "q1")
+    time.sleep(0.1)
+    assert cache.lookup("q1", "a.pdf", True, "")[0] is None
+
+    cache.ttl_seconds = 60
+    for q in ("q2", "q3", "q4"):
+        _put(cache, q)
+    assert cache.lookup("q2", "a.pdf", True, "")[0] is None
+    assert cache.lookup("q4", "a.pdf", True, "")[0] is not None
+
+
+def test_reingest_invalidates_source_and_unfiltered_answers():
+    cache = AnswerCache(":memory:")
+    _put(cache, "q", source="a.pdf")
+    _put(cache, "q", source="b.pdf")
+    _put(cache, "q", source=None)
+
+    assert cache.invalidate_source("a.pdf") == 2
+    assert cache.lookup("q", "a.pdf", True, "")[0] is None
+    assert cache.lookup("q", None, True, "")[0] is None
+    assert cache.lookup("q", "b.pdf", True, "")[0] is not None
@@ -0,0 +1,80 @@
+import fitz  # PyMuPDF
+import pytest
+from openai import OpenAI
+
+from benchmarks import suites
+from benchmarks.run import compare
+from benchmarks.synthetic import synthetic_chunks, synthetic_pages, synthetic_queries, write_pdf
+from src.core.config import settings
+from src.scripts.openai_stub import StubServer, StubState
+
+
+def test_synthetic_inputs_are_seeded_and_scans_have_no_text_layer(tmp_path):
+    assert synthetic_pages(3, seed=1) == synthetic_pages(3, seed=1)
+    assert synthetic_chunks(5, seed=1) == synthetic_chunks(5, seed=1)
+    assert synthetic_queries(5, seed=1) != synthetic_queries(5, seed=2)
+    path = tmp_path / "scan.pdf"
+
+    write_pdf(str(path), synthetic_pages(3, seed=1), image_pages={1})
+
+    with fitz.open(str(path)) as doc:
+        assert doc[0].get_text().strip().startswith("Article 1")
+        assert doc[1].get_text().strip() == ""
+        assert doc[1].get_images()
+
+
+@pytest.fixture
+def stub():
+    server = StubServer(state=StubState(dimensions=8)).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_stub_chat_quotes_the_first_source(stub):
+    client = OpenAI(api_key="x", base_url=stub.base_url, max_retries=0)
+    messages = [{
+        "role": "user",
+        "content": "Context:\nSource: policy.pdf, Page: 4\nContent: Backups are encrypted.\n\nQuestion: Are backups encrypted?",
+    }]
+
+    answer = client.chat.completions.create(model="gpt-4o-mini", messages=messages).choices[0].message.content
+    streamed = client.chat.completions.create(model="gpt-4o-mini", messages=messages, stream=True)
+
+    assert "Backups are encrypted." in answer
+    assert "[Source: policy.pdf, Page: 4]" in answer
+    assert "".join(chunk.choices[0].delta.content or "" for chunk in streamed) == answer
+    assert stub.state.chat_requests == 2
+
+
+def test_suites_run_offline_and_restore_settings(tmp_path):
+    store_before = settings.VECTOR_STORE
+    chunks = synthetic_chunks(40, seed=0, sources=4)
+    texts = [str(c["content"]) for c in chunks]
+    queries = synthetic_queries(4, seed=0)
+
+    with suites.offline_backends(str(tmp_path), dimensions=16) as (registry, stub):
+        ingest = suites.bench_ingest(registry, str(tmp_path), pages=3, documents=1, image_every=2, seed=0)
+        rerank = suites.bench_rerank(registry, texts, queries, seed=0)
+        suites.load_corpus(registry, str(tmp_path), chunks)
+        query = suites.bench_query(registry, chunks, queries)
+
+    assert ingest["text"]["pages"] == 3 and ingest["text"]["chunks"] > 0
+    assert "extract" in ingest["text"]["stage_seconds"]
+    assert rerank["latency"]["count"] == len(queries)
+    assert query["corpus_chunks"] == len(chunks)
+    assert query["filtered"]["latency"]["count"] == len(queries)
+    assert {"embed", "llm", "total"} <= set(query["unfiltered"]["stage_mean_ms"])
+    assert stub.state.chat_requests > 0 and stub.state.errors == 0
+    assert settings.VECTOR_STORE == store_before
+
+
+def test_compare_knows_which_direction_is_better():
+    baseline = {"results": {"query": {"latency": {"p95_ms": 100.0, "count": 40}, "queries_per_s": 10.0}}}
+    current = {"results": {"query": {"latency": {"p95_ms": 80.0, "count": 40}, "queries_per_s": 8.0}}}
+
+    rows = {row["metric"]: row for row in compare(baseline, current)}
+
+    assert set(rows) == {"query.latency.p95_ms", "query.queries_per_s"}
+    assert rows["query.latency.p95_ms"]["change"] == -0.2 and rows["query.latency.p95_ms"]["better"]
+    assert rows["query.queries_per_s"]["change"] == -0.2 and not rows["query.queries_per_s"]["better"]
@@ -0,0 +1,70 @@
+import pytest
+
+from src.services.chunking import (
+    Chunker,
+    StructuredChunker,
+    approximate_token_counter,
+    heading_level,
+    recursive_chunks,
+)
+
+
+def _words(texts):
+    return [len(t.split()) for t in texts]
+
+
+def test_heading_levels():
+    assert heading_level("CHAPTER IV") == (1, "CHAPTER IV")
+    assert heading_level("Article 32 - Security of processing")[0] == 2
+    assert heading_level("4.2 Access control") == (3, "4.2 Access control")
+    assert heading_level("## Retention") == (2, "Retention")
+    # Numbered sentences are clauses, not headings
+    assert heading_level("1. The controller shall keep records of all processing activities.") is None
+    assert heading_level("12") is None
+
+
+def test_chunks_carry_section_paths():
+    pages = ["CHAPTER I\nGeneral\n1 Scope\nApplies to all staff.\n2 Retention\nKeep data briefly."]
+    chunks = StructuredChunker(_words, chunk_tokens=50, overlap_tokens=5, min_tokens=2).split(pages)
+
+    assert [c.section_path for c in chunks] == ["CHAPTER I", "CHAPTER I > 1 Scope", "CHAPTER I > 2 Retention"]
+    assert chunks[2].text == "2 Retention\nKeep data briefly."
+
+
+def test_chunks_span_pages_and_keep_page_range():
+    pages = ["Intro\nThe policy continues", "onto the next page here."]
+    (chunk,) = StructuredChunker(_words, chunk_tokens=50, overlap_tokens=5).split(pages)
+
+    assert (chunk.page_start, chunk.page_end) == (1, 2)
+
+    per_page = StructuredChunker(_words, chunk_tokens=50, overlap_tokens=5, cross_pages=False).split(pages)
+    assert [(c.page_start, c.page_end) for c in per_page] == [(1, 1), (2, 2)]
+
+
+def test_chunks_respect_token_budget_with_overlap():
+    clauses = "\n".join(f"({chr(97 + i)}) clause number {i} has exactly seven words" for i in range(20))
+    chunks = StructuredChunker(_words, chunk_tokens=30, overlap_tokens=8).split([clauses])
+
+    assert len(chunks) > 1
+    assert all(c.tokens <= 30 for c in chunks)
+    # The last clause of one chunk opens the next
+    assert chunks[1].text.startswith(chunks[0].text.splitlines()[-1])
+
+
+def test_oversized_paragraph_is_split_by_sentences():
+    text = " ".join(f"Sentence {i} is about retention." for i in range(40))
+    chunks = StructuredChunker(_words, chunk_tokens=40, overlap_tokens=0).split([text])
+
+    assert all(c.tokens <= 40 for c in chunks)
+    assert " ".join(c.text for c in chunks) == text
+
+
+def test_recursive_strategy_keeps_per_page_chunks():
+    chunks = recursive_chunks(["a" * 100, "b" * 100], chunk_size=80, chunk_overlap=0)
+    assert {c.page_start for c in chunks} == {1, 2}
+    assert all(c.page_start == c.page_end for c in chunks)
+
+
+def test_unknown_strategy_is_rejected():
+    with pytest.raises(ValueError):
+        Chunker("semantic", count_tokens=approximate_token_counter)
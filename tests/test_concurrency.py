@@ -0,0 +1,142 @@
+import asyncio
+import threading
+
+import pytest
+
+from src.core import concurrency
+from src.core.concurrency import iterate_io, prefetch, run_cpu, run_in, shutdown_executors
+
+
+def test_blocking_work_runs_on_named_executor():
+    async def main():
+        cpu_thread = await run_cpu(lambda: threading.current_thread().name)
+        ingest_thread = await run_in("ingest", lambda: threading.current_thread().name)
+        return cpu_thread, ingest_thread
+
+    try:
+        cpu_thread, ingest_thread = asyncio.run(main())
+    finally:
+        shutdown_executors()
+
+    assert cpu_thread.startswith("cpu")
+    assert ingest_thread.startswith("ingest")
+
+
+def test_event_loop_stays_responsive_during_blocking_work():
+    release = threading.Event()
+
+    async def main():
+        blocked = asyncio.ensure_future(run_in("ingest", release.wait, 5))
+        await asyncio.sleep(0.01)
+        ticked = not blocked.done()
+        release.set()
+        await blocked
+        return ticked
+
+    try:
+        assert asyncio.run(main())
+    finally:
+        shutdown_executors()
+        assert concurrency._executors == {}
+
+
+def test_prefetch_preserves_order_and_bounds_lookahead():
+    produced = []
+
+    def numbers():
+        for i in range(10):
+            produced.append(i)
+            yield i
+
+    items = prefetch(numbers(), depth=2)
+    assert next(items) == 0
+    threading.Event().wait(0.2)
+    # One item handed over, two queued and one blocked on the full queue
+    assert len(produced) <= 4
+    assert [0, *items] == list(range(10))
+
+
+def test_prefetch_reraises_producer_errors():
+    def failing():
+        yield 1
+        raise ValueError("bad page")
+
+    items = prefetch(failing(), depth=2)
+    assert next(items) == 1
+    with pytest.raises(ValueError, match="bad page"):
+        next(items)
+
+
+def test_closing_prefetch_stops_the_producer():
+    closed = threading.Event()
+
+    def endless():
+        try:
+            i = 0
+            while True:
+                yield i
+                i += 1
+        finally:
+            closed.set()
+
+    items = prefetch(endless(), depth=1)
+    assert next(items) == 0
+    items.close()
+    assert closed.is_set()
+
+
+def test_iterate_io_steps_on_the_io_executor_and_closes_early_exits():
+    closed = []
+
+    def numbers():
+        try:
+            for i in range(5):
+                yield i, threading.current_thread().name
+        finally:
+            closed.append(True)
+
+    async def main():
+        seen = []
+        async for i, thread in iterate_io(numbers()):
+            seen.append((i, thread))
+            if i == 2:
+                break
+        await asyncio.sleep(0)  # let the abandoned async generator be finalized
+        return seen
+
+    try:
+        seen = asyncio.run(main())
+    finally:
+        shutdown_executors()
+
+    assert [i for i, _ in seen] == [0, 1, 2]
+    assert all(thread.startswith("io") for _, thread in seen)
+    assert closed == [True]
+
+
+def test_query_stream_holds_a_query_slot_until_it_ends(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from src.api.v1 import endpoints
+    from src.main import app
+
+    monkeypatch.setattr(concurrency.settings, "MAX_CONCURRENT_QUERIES", 2)
+    free = []
+
+    class Service:
+        def query_stream(self, query, source=None, strict_privacy=True, debug=False):
+            free.append(concurrency._query_slots._value)
+            yield "token", "a"
+            free.append(concurrency._query_slots._value)
+            yield "done", {}
+
+    shutdown_executors()
+    app.dependency_overrides[endpoints.get_rag_service] = Service
+    try:
+        body = TestClient(app).post("/api/v1/query/stream", json={"query": "q"}).text
+    finally:
+        app.dependency_overrides.clear()
+        shutdown_executors()
+
+    assert "event: token" in body and "event: done" in body
+    assert free == [1, 1]
@@ -0,0 +1,37 @@
+from src.services.embedding_cache import EmbeddingCache
+
+
+def test_embed_computes_only_misses_and_counts_hits():
+    cache = EmbeddingCache(":memory:")
+    computed = []
+
+    def compute(texts):
+        computed.append(list(texts))
+        return [[float(len(t)), 1.0] for t in texts]
+
+    first = cache.embed("m", ["a", "bb", "a"], compute)
+    second = cache.embed("m", ["bb", "  a ", "ccc"], compute)
+
+    assert first == [[1.0, 1.0], [2.0, 1.0], [1.0, 1.0]]
+    assert second == [[2.0, 1.0], [1.0, 1.0], [3.0, 1.0]]
+    assert computed == [["a", "bb"], ["ccc"]]
+    assert cache.hits == 2  # "bb" and whitespace-normalized "a"
+    assert cache.misses == 4
+
+
+def test_keys_are_scoped_by_model():
+    cache = EmbeddingCache(":memory:")
+    cache.put_many("m1", ["x"], [[1.0]])
+
+    assert cache.get_many("m2", ["x"]) == [None]
+    assert cache.get_many("m1", ["x"]) == [[1.0]]
+
+
+def test_lru_eviction_keeps_recently_used(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite"), max_entries=2)
+    cache.put_many("m", ["old"], [[1.0]])
+    cache.put_many("m", ["kept"], [[2.0]])
+    cache.get_many("m", ["old"])  # touch
+    cache.put_many("m", ["new"], [[3.0]])
+
+    assert cache.get_many("m", ["old", "kept", "new"]) == [[1.0], None, [3.0]]
@@ -0,0 +1,57 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from src.services.embeddings import embedding_model_id, load_sentence_encoder
+from src.services.onnx_backend import OnnxSentenceEncoder, pool_embeddings
+
+
+class _FakeTokenizer:
+    def __call__(self, texts, padding=True, truncation=True, max_length=None, return_tensors="np"):
+        width = max(len(t) for t in texts)
+        ids = np.array([[len(t)] * width for t in texts])
+        mask = np.array([[1] * len(t) + [0] * (width - len(t)) for t in texts])
+        return {"input_ids": ids, "attention_mask": mask}
+
+
+class _FakeSession:
+    """Every token's hidden state is ``[text length, 1]``."""
+
+    def get_inputs(self):
+        return [SimpleNamespace(name="input_ids"), SimpleNamespace(name="attention_mask")]
+
+    def run(self, outputs, feeds):
+        ids = feeds["input_ids"].astype(np.float32)
+        return [np.stack([ids, np.ones_like(ids)], axis=-1)]
+
+
+def test_pool_embeddings_cls_and_mean():
+    hidden = np.array([[[1.0, 0.0], [3.0, 2.0], [9.0, 9.0]]])
+    mask = np.array([[1, 1, 0]])
+
+    assert pool_embeddings(hidden, mask, "cls").tolist() == [[1.0, 0.0]]
+    assert pool_embeddings(hidden, mask, "mean").tolist() == [[2.0, 1.0]]
+    with pytest.raises(ValueError):
+        pool_embeddings(hidden, mask, "max")
+
+
+def test_onnx_encoder_keeps_input_order():
+    encoder = OnnxSentenceEncoder(_FakeSession(), _FakeTokenizer(), max_seq_length=32, pooling="mean")
+
+    vectors = encoder.encode(["ab", "abcd", "a"], batch_size=2)
+
+    assert vectors[:, 0].tolist() == [2.0, 4.0, 1.0]
+    single = encoder.encode("abc", normalize_embeddings=True)
+    assert single.shape == (2,)
+    assert float(np.linalg.norm(single)) == pytest.approx(1.0)
+
+
+def test_quantized_backends_get_their_own_cache_key():
+    assert embedding_model_id("m", "torch") == "m"
+    assert embedding_model_id("m", "onnx-int8") == "m@onnx-int8"
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        load_sentence_encoder("any/model", backend="gpu")
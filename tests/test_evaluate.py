@@ -0,0 +1,126 @@
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+import pytest
+
+from src.scripts.evaluate import check_latency_gate, collect_answers, latency_summary, main
+
+
+class _QueryHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        state = self.server.state
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with state["lock"]:
+            state["in_flight"] += 1
+            state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+            state["asked"].append(body["query"])
+        time.sleep(0.05)
+        with state["lock"]:
+            state["in_flight"] -= 1
+        if body["query"] in state["fail"]:
+            self.send_response(500)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        payload = json.dumps({
+            "answer": f"answer to {body['query']}",
+            "citations": [{"text": "context"}],
+            "trace_id": "t",
+            "cache": {"hit": body["query"].endswith("cached")},
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+@pytest.fixture
+def api():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _QueryHandler)
+    server.daemon_threads = True
+    server.state = {"lock": threading.Lock(), "in_flight": 0, "max_in_flight": 0, "asked": [], "fail": set()}
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _questions(n):
+    return pd.DataFrame({"question": [f"q{i}" for i in range(n)], "ground_truth_answer": ["gt"] * n})
+
+
+def test_questions_are_asked_concurrently_in_csv_order(api):
+    base = f"http://127.0.0.1:{api.server_address[1]}"
+
+    records, stats = collect_answers(_questions(8), base, None, True, parallelism=4)
+
+    assert [r["question"] for r in records] == [f"q{i}" for i in range(8)]
+    assert records[3]["answer"] == "answer to q3" and records[3]["contexts"] == ["context"]
+    assert all(r["latency_ms"] >= 50 for r in records)
+    assert api.state["max_in_flight"] > 1
+    assert stats["answered"] == 8 and stats["throughput_qps"] > 0
+
+
+def test_interrupted_run_resumes_from_checkpoint(api, tmp_path):
+    base = f"http://127.0.0.1:{api.server_address[1]}"
+    checkpoint = str(tmp_path / "answers.jsonl")
+    api.state["fail"] = {"q2", "q4"}
+
+    _, first = collect_answers(_questions(6), base, None, True, parallelism=2, checkpoint=checkpoint)
+    assert sorted(first["errors"]) == [2, 4]
+    with open(checkpoint, "a") as f:
+        f.write('{"index": 5, "quest')  # torn last line
+
+    api.state["fail"] = set()
+    api.state["asked"].clear()
+    records, second = collect_answers(_questions(6), base, None, True, parallelism=2, checkpoint=checkpoint)
+
+    assert sorted(api.state["asked"]) == ["q2", "q4"]
+    assert (second["resumed"], second["answered"]) == (4, 2)
+    assert [r["index"] for r in records] == list(range(6))
+    # Only the two questions timed by this run count towards its latency
+    assert sum(bool(r.get("resumed")) for r in records) == 4
+    assert latency_summary(records)["all"]["count"] == 2
+
+
+def test_completed_run_discards_its_checkpoint(api, tmp_path, monkeypatch):
+    base = f"http://127.0.0.1:{api.server_address[1]}"
+    csv = tmp_path / "golden.csv"
+    _questions(3).to_csv(csv, index=False)
+    argv = ["evaluate", "--csv", str(csv), "--api-base", base, "--skip-ragas", "--parallelism", "3"]
+    monkeypatch.setattr(sys, "argv", argv)
+
+    main()
+    api.state["asked"].clear()
+    main()
+
+    # The second run asked everything again instead of reusing the first run's answers
+    assert sorted(api.state["asked"]) == ["q0", "q1", "q2"]
+    assert not (tmp_path / "golden_answers.jsonl").exists()
+    report = json.loads((tmp_path / "golden_report.json").read_text())
+    assert report["run"]["resumed"] == 0 and report["latency"]["all"]["count"] == 3
+
+
+def test_latency_summary_and_gate():
+    records = [{"latency_ms": float(ms), "cache_hit": False} for ms in range(1, 101)]
+    records += [{"latency_ms": 1.0, "cache_hit": True}] * 50
+    latency = latency_summary(records)
+
+    assert latency["uncached"]["p50_ms"] == pytest.approx(50.5)
+    assert latency["uncached"]["p99_ms"] == pytest.approx(99.0, abs=0.1)
+    assert latency["cached"]["count"] == 50
+
+    assert check_latency_gate(latency, max_p95_ms=100)[0]
+    ok, reasons = check_latency_gate(latency, max_p95_ms=90)
+    assert not ok and reasons[0].startswith("p95")
+    baseline = {"uncached": {"p50_ms": 30.0, "p95_ms": 95.0, "p99_ms": 99.0}}
+    ok, reasons = check_latency_gate(latency, baseline=baseline, tolerance=0.2)
+    assert not ok and len(reasons) == 1 and reasons[0].startswith("p50")
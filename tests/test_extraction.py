@@ -0,0 +1,38 @@
+import fitz
+
+from src.services.extraction import iter_pages, read_metadata, resolve_workers
+
+
+def _make_pdf(path, pages):
+    doc = fitz.open()
+    for text in pages:
+        page = doc.new_page()
+        page.insert_text((72, 72), text)
+    doc.set_metadata({"title": "Retention Policy"})
+    doc.save(str(path))
+    doc.close()
+
+
+def test_iter_pages_in_order_across_workers(tmp_path):
+    texts = [f"Section {i}: data retention rules apply." for i in range(1, 7)]
+    pdf = tmp_path / "policy.pdf"
+    _make_pdf(pdf, texts)
+
+    pages = list(iter_pages(str(pdf), workers=2))
+
+    assert [p.page_number for p in pages] == [1, 2, 3, 4, 5, 6]
+    assert [p.text.strip() for p in pages] == texts
+    assert not any(p.ocr for p in pages)
+    assert all(p.seconds >= 0 for p in pages)
+    page_count, metadata = read_metadata(str(pdf))
+    assert page_count == 6 and metadata.get("title") == "Retention Policy"
+
+
+def test_single_worker_runs_inline(tmp_path):
+    pdf = tmp_path / "one.pdf"
+    _make_pdf(pdf, ["Only page with enough text."])
+
+    pages = list(iter_pages(str(pdf), workers=4))
+
+    assert resolve_workers(4, 1) == 1
+    assert pages[0].text.strip() == "Only page with enough text."
@@ -0,0 +1,140 @@
+import threading
+import time
+
+import pytest
+
+from src.core.concurrency import shutdown_executors
+from src.services.ingest_jobs import IngestJobQueue, IngestJobStore, IngestQueueFull
+
+
+class _FakeService:
+    def __init__(self, gate: threading.Event | None = None):
+        self.gate = gate
+
+    def ingest_document(self, file_path, progress, source=None):
+        self.seen = open(file_path, "rb").read() if source else None
+        progress.stage("extracting")
+        progress.update(pages_total=2, pages_extracted=2, ocr_pages=1)
+        if self.gate is not None:
+            while not self.gate.wait(0.01):
+                progress.check_cancelled()
+        progress.stage("writing")
+        progress.update(chunks_total=3, chunks_embedded=3, objects_written=3)
+        self._last_chunks_count = 3
+        self._last_ocr_pages = 1
+        self._last_inserted_count = 3
+        return file_path
+
+
+def _wait_for(jobs, job_id, statuses=("succeeded", "failed", "cancelled")):
+    deadline = time.time() + 5
+    while time.time() < deadline:
+        job = jobs.status(job_id)
+        if job["status"] in statuses:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} stuck in {jobs.status(job_id)}")
+
+
+@pytest.fixture(autouse=True)
+def _executors():
+    yield
+    shutdown_executors()
+
+
+def test_job_runs_in_background_and_reports_result():
+    jobs = IngestJobQueue(IngestJobStore(":memory:"), _FakeService, max_pending=2)
+
+    job = jobs.submit("/app/data/uploads/policy.pdf")
+    assert job["document_id"] == "policy.pdf"
+
+    done = _wait_for(jobs, job["job_id"])
+    assert done["status"] == "succeeded"
+    assert done["progress"]["objects_written"] == 3
+    assert done["progress"]["ocr_pages"] == 1
+    assert done["result"]["chunks_count"] == 3
+    assert done["result"]["document_id"] == "policy.pdf"
+
+
+def test_full_queue_pushes_back_and_running_job_can_be_cancelled():
+    gate = threading.Event()
+    jobs = IngestJobQueue(IngestJobStore(":memory:"), lambda: _FakeService(gate), max_pending=1)
+
+    job = jobs.submit("a.pdf")
+    with pytest.raises(IngestQueueFull):
+        jobs.submit("b.pdf")
+
+    _wait_for(jobs, job["job_id"], statuses=("running",))
+    jobs.cancel(job["job_id"])
+    assert _wait_for(jobs, job["job_id"])["status"] == "cancelled"
+
+
+def test_handled_ingest_failure_is_reported():
+    class _Failing:
+        def ingest_document(self, file_path, progress, source=None):
+            return f"No text could be extracted from {file_path}."
+
+    jobs = IngestJobQueue(IngestJobStore(":memory:"), _Failing, max_pending=1)
+    job = _wait_for(jobs, jobs.submit("empty.pdf")["job_id"])
+
+    assert job["status"] == "failed"
+    assert "No text" in job["error"]
+
+
+def test_uploads_keep_their_name_and_are_deleted_when_the_job_ends(tmp_path):
+    gate = threading.Event()
+    services = []
+
+    def factory():
+        services.append(_FakeService(gate))
+        return services[-1]
+
+    jobs = IngestJobQueue(IngestJobStore(":memory:"), factory, max_pending=1)
+    first, second = tmp_path / "a1-policy.pdf", tmp_path / "b2-policy.pdf"
+    first.write_bytes(b"v1")
+    second.write_bytes(b"v2")
+
+    job = jobs.submit(str(first), source="policy.pdf", delete_after=True)
+    with pytest.raises(IngestQueueFull):
+        jobs.submit(str(second), source="policy.pdf", delete_after=True)
+    assert not second.exists()  # a rejected upload is not left behind
+    gate.set()
+    done = _wait_for(jobs, job["job_id"])
+
+    assert job["document_id"] == done["result"]["document_id"] == "policy.pdf"
+    assert services[0].seen == b"v1"
+    deadline = time.time() + 5
+    while first.exists() and time.time() < deadline:  # removed right after the final status update
+        time.sleep(0.01)
+    assert not first.exists()
+
+
+def test_close_stops_running_and_queued_jobs_before_closing_the_store(tmp_path):
+    path = str(tmp_path / "jobs.sqlite")
+    jobs = IngestJobQueue(IngestJobStore(path), lambda: _FakeService(threading.Event()), max_pending=2)
+    running = jobs.submit("a.pdf")["job_id"]
+    queued = jobs.submit("b.pdf")["job_id"]
+    _wait_for(jobs, running, statuses=("running",))
+
+    jobs.close()
+
+    store = IngestJobStore(path)
+    for job_id in (running, queued):
+        assert (store.get(job_id)["status"], store.get(job_id)["error"]) == ("failed", "Interrupted by shutdown")
+    with pytest.raises(IngestQueueFull):
+        jobs.submit("c.pdf")
+
+
+def test_cancel_and_job_start_cannot_both_win():
+    store = IngestJobStore(":memory:")
+    jobs = IngestJobQueue(store, _FakeService, max_pending=2)
+    # A worker claims the job just before the cancel lands: it keeps running and sees the flag
+    claimed = store.create("a.pdf")
+    assert store.transition(claimed, "queued", status="running", stage="starting")
+    job = jobs.cancel(claimed)
+    assert (job["status"], job["cancel_requested"]) == ("running", True)
+    # The cancel lands first: the worker's claim fails and it never runs the job
+    cancelled = store.create("b.pdf")
+    assert jobs.cancel(cancelled)["status"] == "cancelled"
+    jobs._ingest(cancelled, "b.pdf", None)
+    assert store.get(cancelled)["status"] == "cancelled"
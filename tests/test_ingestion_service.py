@@ -0,0 +1,250 @@
+from types import SimpleNamespace
+
+import pytest
+
+from src.core import tracing
+from src.core.config import settings
+from src.core.registry import ModelRegistry
+from src.services.chunking import Chunker, approximate_token_counter
+from src.services.embedding_cache import EmbeddingCache
+from src.services import ingestion_service, vector_store
+from src.services.ingestion_service import IngestionService, chunk_uuid
+from src.services.manifest import diff_chunk_ids, file_sha256
+from src.services.vector_store import WeaviateVectorStore
+
+
+class _FakeBatch:
+    def __init__(self, collection):
+        self.collection = collection
+
+    def __enter__(self):
+        self.collection.batch.failed_objects = []
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def add_object(self, properties, vector, uuid):
+        c = self.collection
+        c.attempts.append(uuid)
+        if c.fail_once.pop(uuid, False):
+            c.batch.failed_objects.append(
+                SimpleNamespace(object_=SimpleNamespace(uuid=uuid), message="boom")
+            )
+        else:
+            c.stored[uuid] = properties
+
+
+class _FakeCollection:
+    def __init__(self, fail_once=()):
+        self.stored: dict = {}
+        self.attempts: list = []
+        self.fail_once = {u: True for u in fail_once}
+        self.batch = SimpleNamespace(failed_objects=[], dynamic=lambda: _FakeBatch(self))
+        self.properties = [SimpleNamespace(name=n) for n in ("content", "source", "page_number")]
+        self.config = SimpleNamespace(
+            get=lambda: SimpleNamespace(properties=self.properties),
+            add_property=self.properties.append,
+        )
+
+
+def _client(collection):
+    return SimpleNamespace(collections=SimpleNamespace(exists=lambda name: True, get=lambda name: collection))
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setattr(vector_store, "WRITE_BACKOFF_BASE", 0.0)
+    registry = ModelRegistry()
+    registry.set("embedding_cache", EmbeddingCache(":memory:"))
+    registry.set("vector_store", WeaviateVectorStore(_client(_FakeCollection())))
+    return IngestionService(registry=registry)
+
+
+def _chunks():
+    return [
+        {"content": "alpha", "source": "a.pdf", "page_number": 1},
+        {"content": "beta", "source": "a.pdf", "page_number": 2},
+    ]
+
+
+def test_chunk_uuid_is_deterministic():
+    a, b = _chunks()
+    assert chunk_uuid(a) == chunk_uuid(dict(a))
+    assert chunk_uuid(a) != chunk_uuid(b)
+
+
+def test_write_retries_only_failed_objects(service):
+    chunks = _chunks()
+    flaky = chunk_uuid(chunks[1])
+    collection = _FakeCollection(fail_once=[flaky])
+    service.store = WeaviateVectorStore(_client(collection))
+
+    inserted, failed = service._write_objects(chunks, [[0.0], [1.0]])
+
+    assert (inserted, failed) == (2, set())
+    assert collection.attempts == [chunk_uuid(chunks[0]), flaky, flaky]
+    assert len(collection.stored) == 2
+
+
+def test_diff_chunk_ids_inserts_new_and_deletes_stale():
+    to_insert, stale = diff_chunk_ids(["a", "b", "c"], ["b", "c", "d"])
+    assert to_insert == {"a"}
+    assert stale == {"d"}
+
+    to_insert, stale = diff_chunk_ids(["a"], None)
+    assert to_insert == {"a"}
+    assert stale == set()
+
+
+def test_unchanged_file_is_skipped(service, tmp_path, monkeypatch):
+    pdf = tmp_path / "a.pdf"
+    pdf.write_bytes(b"%PDF-1.4 same bytes")
+    stored = {"file_hash": file_sha256(str(pdf)), "chunk_ids": ["x", "y"]}
+    service.manifest = SimpleNamespace(get=lambda source: stored)
+    monkeypatch.setattr(ingestion_service, "iter_pages", lambda *a, **k: pytest.fail("re-extracted"))
+
+    assert service.ingest_document(str(pdf)) == str(pdf)
+    assert service._last_unchanged is True
+    assert service._last_chunks_count == 2
+    assert service._last_inserted_count == 0
+
+
+class _Manifest:
+    def __init__(self, entry=None):
+        self.entry = entry
+        self.puts = []
+
+    def get(self, source):
+        return self.entry
+
+    def put(self, source, file_hash, chunk_ids):
+        self.puts.append((file_hash, list(chunk_ids)))
+
+
+def _stream_pages(monkeypatch, count, events, fail_at=None):
+    def iter_pages(file_path, workers=0, ocr_dpi=72):
+        for n in range(1, count + 1):
+            if n == fail_at:
+                raise RuntimeError("corrupt page")
+            events.append(("page", n))
+            yield ingestion_service.PageText(n, f"Clause {n}. " + f"page {n} words " * 200, False, 0.0)
+
+    monkeypatch.setattr(ingestion_service, "iter_pages", iter_pages)
+    monkeypatch.setattr(ingestion_service, "read_metadata", lambda path: (count, {"title": "Streamed"}))
+
+
+@pytest.fixture
+def streaming_service(service, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "PRECOMPUTE_REDACTION", False)
+    monkeypatch.setattr(settings, "INGEST_PIPELINE_DEPTH", 1)
+    monkeypatch.setattr(ingestion_service, "EMBED_BATCH_SIZE", 4)
+    service.registry.set("chunker", Chunker("structured", count_tokens=approximate_token_counter))
+    service.manifest = _Manifest({"file_hash": "old", "chunk_ids": []})
+    service.store.save = lambda: None
+    service._compute_embeddings = lambda texts: [[1.0, 0.0]] * len(texts)
+    pdf = tmp_path / "big.pdf"
+    pdf.write_bytes(b"%PDF-1.4 streamed")
+    return service, str(pdf)
+
+
+def test_ingest_streams_pages_into_writes(streaming_service, monkeypatch):
+    service, pdf = streaming_service
+    events = []
+    _stream_pages(monkeypatch, 30, events)
+    write_objects = service.store.write_objects
+
+    def recording_write(objects):
+        events.append(("write", len(objects)))
+        return write_objects(objects)
+
+    service.store.write_objects = recording_write
+
+    assert service.ingest_document(pdf) == pdf
+    # The first batch is written long before extraction finishes, and ids are written once each
+    assert events.index(("write", 4)) < events.index(("page", 30))
+    stored = service.store.client.collections.get("ComplianceDocument").stored
+    file_hash, chunk_ids = service.manifest.puts[-1]
+    assert file_hash == file_sha256(pdf)
+    assert set(chunk_ids) == set(stored) and len(chunk_ids) == service._last_chunks_count
+    assert any(p["page_number"] == 0 for p in stored.values())  # the metadata chunk
+    assert service._last_inserted_count == len(stored)
+
+
+def test_ingest_trace_has_a_span_per_stage_and_batch(streaming_service, monkeypatch):
+    service, pdf = streaming_service
+    traces = []
+    monkeypatch.setattr(tracing, "_listeners", [traces.append])
+    _stream_pages(monkeypatch, 10, [])
+
+    service.ingest_document(pdf)
+
+    (trace,) = traces
+    spans = trace.to_dicts()
+    names = [s["name"] for s in spans]
+    assert service._last_trace_id == trace.trace_id
+    assert {"hashing", "metadata", "extract", "finalize"} <= set(names)
+    batches = -(-service._last_inserted_count // ingestion_service.EMBED_BATCH_SIZE)
+    assert names.count("embed") == names.count("write") == batches
+    # Spans from the pipeline threads hang off the ingest root
+    assert all(s["parent_id"] == spans[0]["span_id"] for s in spans[1:])
+    assert spans[0]["attributes"]["pages"] == 10
+
+
+def test_failed_extraction_keeps_written_chunks_in_manifest(streaming_service, monkeypatch):
+    service, pdf = streaming_service
+    _stream_pages(monkeypatch, 30, [], fail_at=25)
+
+    result = service.ingest_document(pdf)
+
+    assert result.startswith("Error reading file") and "corrupt page" in result
+    stored = service.store.client.collections.get("ComplianceDocument").stored
+    assert stored
+    # No hash, so the retry re-ingests and can remove these partial chunks as stale
+    assert service.manifest.puts == [("", sorted(stored))]
+
+
+def test_existing_collection_gains_redacted_properties(service):
+    props = {p.name for p in service.store.client.collections.get("ComplianceDocument").properties}
+    assert {"content_redacted", "content_redacted_keep_person"} <= props
+
+
+def test_redacted_variants_are_added_to_chunks(service):
+    class _Redactor:
+        def redact_variants(self, texts):
+            return {
+                "content_redacted": [f"strict:{t}" for t in texts],
+                "content_redacted_keep_person": [f"keep:{t}" for t in texts],
+            }
+
+    service.registry.set("pii_service", _Redactor())
+    chunks = _chunks()
+    service._add_redacted_variants(chunks, ingestion_service.IngestProgress())
+
+    assert chunks[0]["content_redacted"] == "strict:alpha"
+    assert chunks[1]["content_redacted_keep_person"] == "keep:beta"
+    assert chunk_uuid(chunks[0]) == chunk_uuid(_chunks()[0])
+
+
+def test_existing_ids_pages_filtered_fetches_past_the_fetch_limit(monkeypatch):
+    monkeypatch.setattr(vector_store, "EXISTING_IDS_PAGE", 1000)
+    collection = _FakeCollection()
+    # What the source filter lets through: a.pdf chunks, plus a word-match on "/old/a.pdf x"
+    matches = [
+        SimpleNamespace(uuid=f"id-{i:05d}", properties={"source": "a.pdf x" if i % 1000 == 7 else "/old/a.pdf"})
+        for i in range(2500)
+    ]
+    calls = []
+
+    def fetch_objects(limit, after, filters, return_properties):
+        assert filters is not None and return_properties == ["source"]
+        calls.append(after)
+        start = 0 if after is None else next(i for i, o in enumerate(matches) if o.uuid == after) + 1
+        return SimpleNamespace(objects=matches[start:start + limit])
+
+    collection.query = SimpleNamespace(fetch_objects=fetch_objects)
+
+    ids = WeaviateVectorStore(_client(collection)).existing_ids("a.pdf")
+
+    assert len(ids) == 2497 and "id-00007" not in ids
+    assert calls == [None, "id-00999", "id-01999"]
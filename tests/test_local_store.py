@@ -0,0 +1,111 @@
+import numpy as np
+import pytest
+
+from src.services.local_store import BM25Index, LocalVectorStore
+
+
+def _objects():
+    return {
+        "a": ({"content": "Retention policy: keep records seven years", "source": "policy.pdf", "page_number": 1}, [1.0, 0.0]),
+        "b": ({"content": "The DPO is the data protection officer", "source": "policy.pdf", "page_number": 2}, [0.0, 1.0]),
+        "c": ({"content": "Retention of backups is thirty days", "source": "/old/path/backup.pdf", "page_number": 1}, [0.7, 0.7]),
+    }
+
+
+def test_bm25_ranks_matching_terms():
+    index = BM25Index.build(["retention policy", "data protection officer", "retention retention backups"])
+    scores = index.scores("Retention?")
+
+    assert scores[1] == 0.0
+    assert scores[2] > scores[0] > 0.0
+
+
+def test_hybrid_search_fuses_keyword_and_vector_scores(tmp_path):
+    store = LocalVectorStore(str(tmp_path / "store"))
+    store.write_objects(_objects())
+
+    vector_only = store.hybrid_search("dpo", [0.0, 1.0], alpha=1.0, limit=3)
+    keyword_only = store.hybrid_search("retention policy", [0.0, 1.0], alpha=0.0, limit=3)
+    filtered = store.hybrid_search("retention", [1.0, 0.0], alpha=0.5, limit=3, source="backup.pdf", include_vector=True)
+
+    assert vector_only[0]["page_number"] == 2
+    assert keyword_only[0]["content"].startswith("Retention policy")
+    assert [r["source"] for r in filtered] == ["/old/path/backup.pdf"]
+    assert filtered[0]["vector"] == pytest.approx([0.7, 0.7])
+
+
+def test_save_and_load_roundtrip(tmp_path):
+    store = LocalVectorStore(str(tmp_path / "store"))
+    store.write_objects(_objects())
+    store.manifest.put("policy.pdf", "hash", ["a", "b"])
+    assert store.delete_ids({"b"}) == 1
+    store.save()
+
+    loaded = LocalVectorStore(str(tmp_path / "store"))
+    assert len(loaded) == 2
+    assert isinstance(loaded._vectors, np.memmap)
+    assert loaded.manifest.get("policy.pdf")["file_hash"] == "hash"
+    assert loaded.existing_ids("policy.pdf") == ["a"]
+    assert loaded.hybrid_search("backups", [0.7, 0.7], alpha=0.5, limit=1)[0]["page_number"] == 1
+
+    # Another process's save is picked up by a store with no unsaved changes
+    store.write_objects({"d": ({"content": "new", "source": "n.pdf", "page_number": 1}, [1.0, 1.0])})
+    store.save()
+    assert len(loaded) == 3
+
+
+def test_unsaved_batches_are_searchable_and_overwrites_replace_rows(tmp_path):
+    store = LocalVectorStore(str(tmp_path / "store"))
+    for i in range(100):
+        store.write_objects({f"id-{i}": ({"content": f"clause {i}", "source": "big.pdf", "page_number": i}, [1.0, float(i)])})
+    store.write_objects({"id-7": ({"content": "amended retention clause", "source": "big.pdf", "page_number": 7}, [0.0, 1.0])})
+
+    assert len(store) == 100
+    # Buffers grow geometrically instead of being copied per batch
+    assert len(store._vectors) == 128
+    assert store.hybrid_search("amended", [0.0, 1.0], alpha=0.0, limit=1)[0]["page_number"] == 7
+    assert [r for r in store.hybrid_search("7", [1.0, 0.0], alpha=0.0, limit=5) if r["score"] > 0] == []
+    assert [r["content"] for r in store.fetch_by_source("big.pdf", limit=200) if r["page_number"] == 7] == [
+        "amended retention clause"
+    ]
+
+    store.save()
+    loaded = LocalVectorStore(str(tmp_path / "store"))
+    assert len(loaded) == 100
+    assert loaded.hybrid_search("amended", [0.0, 1.0], alpha=0.0, limit=1)[0]["page_number"] == 7
+    # The overwritten row's old text ("clause 7") no longer matches
+    for searched in (store, loaded):
+        assert [r for r in searched.hybrid_search("7", [1.0, 0.0], alpha=0.0, limit=5) if r["score"] > 0] == []
+
+
+def test_saves_from_two_processes_merge_instead_of_overwriting(tmp_path):
+    path = str(tmp_path / "store")
+    base = LocalVectorStore(path)
+    base.write_objects(_objects())
+    base.save()
+    first, second = LocalVectorStore(path), LocalVectorStore(path)
+
+    first.write_objects({"d": ({"content": "first worker", "source": "d.pdf", "page_number": 1}, [1.0, 1.0])})
+    first.manifest.put("d.pdf", "hash-d", ["d"])
+    second.write_objects({"e": ({"content": "second worker", "source": "e.pdf", "page_number": 1}, [1.0, 0.5])})
+    second.delete_ids({"b"})
+    second.manifest.put("e.pdf", "hash-e", ["e"])
+    first.save()
+    second.save()
+
+    merged = LocalVectorStore(path)
+    assert sorted(uuid for uuid, _, _ in merged.iter_objects()) == ["a", "c", "d", "e"]
+    assert merged.manifest.get("d.pdf")["file_hash"] == "hash-d"
+    assert merged.manifest.get("e.pdf")["file_hash"] == "hash-e"
+    assert merged.hybrid_search("worker", [1.0, 1.0], alpha=0.0, limit=2)[0]["content"] in {"first worker", "second worker"}
+
+
+def test_incomplete_backend_fails_when_created():
+    from src.services.vector_store import VectorStore
+
+    class _NoSearch(VectorStore):
+        def create_schema(self):
+            pass
+
+    with pytest.raises(TypeError, match="hybrid_search"):
+        _NoSearch()
@@ -0,0 +1,111 @@
+import logging
+import os
+import subprocess
+import sys
+
+import torch
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from src.core import metrics
+from src.core.tracing import Trace
+from src.main import app
+from src.services.pii_service import PIIRedactionService
+from src.services.retrieval import RetrievalPlanner, RetrievalStrategy
+
+
+def _value(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_finished_traces_feed_the_stage_histograms():
+    before = (
+        _value("veritas_query_stage_seconds_count", stage="rerank"),
+        _value("veritas_query_stage_seconds_count", stage="total"),
+    )
+    trace = Trace("query")
+    trace.record("rerank", 0.02)
+    trace.record("rerank", 0.03)
+    trace.finish()
+
+    metrics.observe_trace(trace)
+
+    assert _value("veritas_query_stage_seconds_count", stage="rerank") == before[0] + 2
+    assert _value("veritas_query_stage_seconds_count", stage="total") == before[1] + 1
+
+
+def test_hot_paths_count_fallbacks_and_pii_entities():
+    fallback = _value("veritas_retrievals_total", strategy="fetch_by_source", fallback="true")
+    emails = _value("veritas_pii_entities_redacted_total", entity="EMAIL_ADDRESS")
+
+    RetrievalPlanner().execute([
+        RetrievalStrategy("hybrid", lambda: []),
+        RetrievalStrategy("fetch_by_source", lambda: [{"content": "x"}]),
+    ])
+    PIIRedactionService(logger=logging.getLogger("test"), cache_size=0, enable_presidio=False).redact_many(
+        ["mail a@example.com or b@example.com", "nothing here"]
+    )
+
+    assert _value("veritas_retrievals_total", strategy="fetch_by_source", fallback="true") == fallback + 1
+    assert _value("veritas_pii_entities_redacted_total", entity="EMAIL_ADDRESS") == emails + 2
+
+
+def test_model_memory_counts_parameters_and_buffers():
+    layer = torch.nn.BatchNorm1d(4)  # 8 parameters, 9 buffer values (one int64)
+    assert metrics.model_memory_bytes(layer) == 8 * 4 + 8 * 4 + 8
+    assert metrics.model_memory_bytes(type("Onnx", (), {"model_bytes": 123})()) == 123
+    assert metrics.model_memory_bytes(object()) is None
+
+
+_WORKER = """
+import os
+from src.core import metrics
+metrics.OCR_PAGES.inc(2)
+metrics.INGESTS_RUNNING.inc()
+metrics.RESIDENT_MEMORY.set(1000)
+print(os.getpid())
+"""
+
+
+def test_multiprocess_mode_sums_workers_and_drops_dead_workers_gauges(tmp_path, monkeypatch):
+    from prometheus_client import multiprocess
+
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path), "OPENAI_API_KEY": "x"}
+    pids = [
+        int(subprocess.run([sys.executable, "-c", _WORKER], env=env, capture_output=True, text=True, check=True).stdout)
+        for _ in range(2)
+    ]
+    multiprocess.mark_process_dead(pids[0], str(tmp_path))
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+
+    text = metrics.render().decode()
+
+    assert "veritas_ocr_pages_total 4.0" in text
+    assert "veritas_ingests_running 1.0" in text
+    assert f'veritas_process_resident_memory_bytes{{pid="{pids[1]}"}} 1000.0' in text
+    assert f'pid="{pids[0]}"' not in text
+
+
+def test_metrics_endpoint_serves_the_text_format():
+    local = _value("veritas_ocr_pages_total")
+
+    response = TestClient(app).get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=")
+    assert f"veritas_ocr_pages_total {local}" in response.text
+    # The scrape itself is in flight while the metrics are rendered
+    assert 'veritas_requests_in_flight{route="/metrics"} 1.0' in response.text
+
+
+def test_memory_sampler_logs_failures(caplog):
+    class Broken:
+        def is_loaded(self, name):
+            raise RuntimeError("registry closed")
+
+    with caplog.at_level(logging.ERROR, logger="uvicorn.error"):
+        sampler = metrics.MemorySampler(Broken(), interval=60)
+        sampler.close()
+
+    assert "Sampling memory metrics failed" in caplog.text
+    assert "registry closed" in caplog.text
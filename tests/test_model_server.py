@@ -0,0 +1,89 @@
+import os
+import threading
+
+import numpy as np
+import pytest
+
+from src.core.config import settings
+from src.services.model_server import (
+    ModelServer,
+    ModelServerClient,
+    RemoteCrossEncoder,
+    RemoteEncoder,
+    socket_path,
+)
+from src.services.reranking import score_pairs
+
+
+class _FakeEncoder:
+    def encode(self, texts, batch_size=32, normalize_embeddings=False):
+        return np.array([[float(len(t)), 1.0] for t in texts])
+
+
+class _FakeCrossEncoder:
+    def predict(self, pairs, batch_size=32, show_progress_bar=None):
+        if any(d == "boom" for _, d in pairs):
+            raise ValueError("bad pair")
+        return np.array([float(len(d)) for _, d in pairs])
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setenv("MODEL_SERVER_AUTHKEY", "test-key")
+    path = str(tmp_path / "models.sock")
+    server = ModelServer(path, _FakeEncoder(), _FakeCrossEncoder())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield ModelServerClient(path, connect_timeout=5)
+    server.close()
+
+
+def test_remote_encoder_matches_local_shapes(client):
+    encoder = RemoteEncoder(client)
+
+    assert encoder.encode(["ab", "abcd"]).tolist() == [[2.0, 1.0], [4.0, 1.0]]
+    assert encoder.encode("abc").tolist() == [3.0, 1.0]
+
+
+def test_remote_cross_encoder_works_with_score_pairs(client):
+    scores = score_pairs(RemoteCrossEncoder(client), "q", ["long document", "a"], batch_size=2, max_length=16)
+
+    assert scores.tolist() == [13.0, 1.0]
+
+
+def test_server_errors_are_raised_in_the_worker(client):
+    with pytest.raises(RuntimeError, match="bad pair"):
+        RemoteCrossEncoder(client).predict([["q", "boom"]])
+    # The connection stays usable after an error
+    assert client.call("ping") == "pong"
+
+
+def test_concurrent_callers_get_their_own_answers(client):
+    encoder = RemoteEncoder(client)
+    results = {}
+
+    def _call(n):
+        results[n] = encoder.encode(["x" * n])[0][0]
+
+    threads = [threading.Thread(target=_call, args=(n,)) for n in range(1, 9)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results == {n: float(n) for n in range(1, 9)}
+
+
+def test_default_socket_lives_in_a_private_runtime_directory(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "MODEL_SERVER_SOCKET", "")
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+
+    path = socket_path()
+
+    assert path == str(tmp_path / "veritas" / "models.sock")
+    assert os.stat(tmp_path / "veritas").st_mode & 0o777 == 0o700
+    os.chmod(tmp_path / "veritas", 0o777)
+    with pytest.raises(RuntimeError, match="mode 0700"):
+        socket_path()
+    monkeypatch.setattr(settings, "MODEL_SERVER_SOCKET", str(tmp_path / "explicit.sock"))
+    assert socket_path() == str(tmp_path / "explicit.sock")
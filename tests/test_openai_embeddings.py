@@ -0,0 +1,89 @@
+import numpy as np
+import openai
+import pytest
+from openai import OpenAI
+
+from src.services import openai_embeddings
+from src.services.chunking import approximate_token_counter
+from src.services.openai_embeddings import OpenAIEmbedder, RateLimiter, pack_batches
+from src.scripts.openai_stub import StubServer, StubState, stub_vector
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    monkeypatch.setattr(openai_embeddings, "RETRY_BACKOFF_BASE", 0.0)
+    server = StubServer(state=StubState(dimensions=8)).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _embedder(stub, **kwargs):
+    client = OpenAI(api_key="x", base_url=stub.base_url, max_retries=0)
+    return OpenAIEmbedder(client, approximate_token_counter, **kwargs)
+
+
+def test_pack_batches_respects_token_and_input_budgets():
+    assert pack_batches([3, 3, 3, 3], max_tokens=6, max_inputs=10) == [[0, 1], [2, 3]]
+    assert pack_batches([1] * 5, max_tokens=100, max_inputs=2) == [[0, 1], [2, 3], [4]]
+    # An input over the budget is sent on its own
+    assert pack_batches([2, 50, 2], max_tokens=10, max_inputs=10) == [[0], [1], [2]]
+
+
+def test_rate_limiter_waits_for_refill():
+    now = [0.0]
+    slept = []
+    limiter = RateLimiter(60, 600, clock=lambda: now[0], sleep=slept.append)
+
+    assert limiter.acquire(500) == 0.0
+    # 100 tokens left at 10 tokens/s: a 150-token request waits 5s
+    assert limiter.acquire(150) == pytest.approx(5.0)
+    now[0] = 20.0
+    assert limiter.acquire(10) == 0.0
+    assert slept == [pytest.approx(5.0)]
+
+
+def test_embedder_batches_concurrently_in_input_order(stub):
+    stub.state.latency = 0.05
+    embedder = _embedder(stub, batch_tokens=20, concurrency=4)
+    texts = [f"clause {i} " * 5 for i in range(40)]
+
+    vectors = embedder.embed(texts)
+
+    assert len(vectors) == 40
+    for text, vector in zip(texts, vectors):
+        assert np.allclose(vector, stub_vector(text, 8), atol=1e-6)
+    assert stub.state.requests > 1
+    assert stub.state.max_in_flight > 1
+    embedder.close()
+
+
+def test_embedder_retries_rate_limits_and_server_errors(stub):
+    stub.state.fail_next = [429, 500, 503]
+    embedder = _embedder(stub, concurrency=1)
+
+    vectors = embedder.embed(["alpha", "beta"])
+
+    assert np.allclose(vectors[1], stub_vector("beta", 8), atol=1e-6)
+    assert embedder.retries == 3
+    embedder.close()
+
+
+def test_embedder_does_not_retry_client_errors(stub):
+    stub.state.fail_next = [400]
+    embedder = _embedder(stub)
+
+    with pytest.raises(openai.BadRequestError):
+        embedder.embed(["alpha"])
+    assert stub.state.requests == 1
+    embedder.close()
+
+
+def test_embedder_gives_up_after_max_retries(stub):
+    stub.state.fail_next = [500] * 5
+    embedder = _embedder(stub, max_retries=2)
+
+    with pytest.raises(openai.InternalServerError):
+        embedder.embed(["alpha"])
+    assert stub.state.requests == 3
+    embedder.close()
@@ -1,6 +1,6 @@
 import os
 
-from src.services.pii_service import PIIRedactionService
+from src.services.pii_service import PIIRedactionService, StreamingRedactor, may_contain_person
 
 
 def test_redact_text_regex_fallback_person_email_ip():
@@ -28,3 +28,126 @@ def test_redact_text_skip_person():
     assert "<EMAIL>" in redacted
     assert "Alice Smith" in redacted
 
+
+class _RecordingRedactor:
+    def __init__(self):
+        self.calls = []
+
+    def redact_text(self, text, skip_entities=None):
+        self.calls.append(text)
+        return text.replace("John Smith", "<PERSON>")
+
+
+def test_streaming_redactor_buffers_until_sentence_end():
+    pii = _RecordingRedactor()
+    redactor = StreamingRedactor(pii)
+
+    out = []
+    for token in ["Contact John", " Smith", ". Dr", ". John Smith", " approved it"]:
+        out.extend(redactor.feed(token))
+    out.extend(redactor.flush())
+
+    assert out == ["Contact <PERSON>.", " Dr. <PERSON> approved it"]
+    assert "John" not in "".join(out)
+
+
+def test_redact_many_batches_distinct_texts_and_memoizes(monkeypatch):
+    import presidio_analyzer
+    from presidio_analyzer import RecognizerResult
+    from presidio_analyzer.nlp_engine import NlpEngineProvider
+
+    batches = []
+
+    class _BatchAnalyzer:
+        def analyze_iterator(self, texts, language, batch_size, entities):
+            batches.append(list(texts))
+            return [
+                [RecognizerResult("PERSON", 0, 4, 0.9)] if t.startswith("Jane") else []
+                for t in texts
+            ]
+
+    # No spaCy model in unit tests: the service gets the fake batch analyzer instead
+    monkeypatch.setattr(NlpEngineProvider, "create_engine", lambda self: None)
+    monkeypatch.setattr(presidio_analyzer, "AnalyzerEngine", lambda **kwargs: None)
+    monkeypatch.setattr(presidio_analyzer, "BatchAnalyzerEngine", lambda analyzer_engine: _BatchAnalyzer())
+    service = PIIRedactionService(cache_size=8, batch_size=4, enable_presidio=True)
+
+    first = service.redact_many(["Jane wrote", "policy", "Jane wrote", ""])
+    second = service.redact_many(["policy", "Jane wrote"])
+
+    assert first == ["<PERSON> wrote", "policy", "<PERSON> wrote", ""]
+    assert second == ["policy", "<PERSON> wrote"]
+    # "policy" has no capitalized word, so it never reaches NER
+    assert batches == [["Jane wrote"]]
+    assert (service.ner_texts, service.ner_skipped) == (1, 1)
+
+
+class _NamesAnalyzer:
+    def __init__(self, fail=False):
+        self.texts = []
+        self.fail = fail
+
+    def analyze_iterator(self, texts, language, batch_size, entities):
+        from types import SimpleNamespace
+
+        assert entities == ["PERSON"]
+        self.texts.extend(texts)
+        if self.fail:
+            raise RuntimeError("spaCy unavailable")
+        return [
+            [SimpleNamespace(start=t.find("Jane Roe"), end=t.find("Jane Roe") + 8, entity_type="PERSON")]
+            if "Jane Roe" in t else []
+            for t in texts
+        ]
+
+
+def _tiered_service(analyzer):
+    service = PIIRedactionService(enable_presidio=False)
+    service.presidio_enabled = True
+    service.batch_analyzer = analyzer
+    return service
+
+
+def test_ner_runs_only_on_texts_that_may_name_a_person():
+    analyzer = _NamesAnalyzer()
+    service = _tiered_service(analyzer)
+
+    out = service.redact_many([
+        "retention applies to logs from 10.0.0.1 and mail to dpo@example.org",
+        "Jane Roe approved the policy",
+    ])
+
+    assert out == ["retention applies to logs from <IP> and mail to <EMAIL>", "<PERSON> approved the policy"]
+    assert analyzer.texts == ["Jane Roe approved the policy"]
+
+
+def test_ner_failure_keeps_pattern_redaction_uncached():
+    service = _tiered_service(_NamesAnalyzer(fail=True))
+
+    assert service.redact_text("Jane Roe at jane@example.org") == "Jane Roe at <EMAIL>"
+    assert not service._cache
+
+
+def test_regex_spans_validate_ip_addresses():
+    service = PIIRedactionService(enable_presidio=False)
+
+    out = service.redact_text("hosts 2001:db8::1, 172.16.0.1 and 999.1.1.1 at 10:30:00 (v1.2.3)")
+
+    assert out == "hosts <IP>, <IP> and 999.1.1.1 at 10:30:00 (v1.2.3)"
+
+
+def test_person_heuristic_handles_honorifics_and_initials():
+    service = PIIRedactionService(enable_presidio=False)
+
+    assert service.redact_text("Ask Dr. Smith or Mary J. Watson.") == "Ask <PERSON> or <PERSON>."
+    assert may_contain_person("the controller shall notify") is False
+
+
+def test_person_gate_recalls_non_ascii_inner_capital_and_all_caps_names():
+    names = ["witness: José Álvarez", "McDonald approved", "signed by JOHN SMITH", "cc ÉMILE"]
+    analyzer = _NamesAnalyzer()
+
+    _tiered_service(analyzer).redact_many(names + ["retention: 30 days, see § 4(b)", "The controller shall notify"])
+
+    assert analyzer.texts == names
+    assert PIIRedactionService(enable_presidio=False).redact_text("witness: José Álvarez") == "witness: <PERSON>"
@@ -0,0 +1,99 @@
+from types import SimpleNamespace
+
+import pytest
+
+from src.core.config import settings
+from src.core.registry import ModelRegistry
+from src.services.answer_cache import AnswerCache
+from src.services.embedding_cache import EmbeddingCache
+from src.services.rag_service import RAGService
+
+
+class _FakeEmbeddings:
+    def __init__(self) -> None:
+        self.calls: list[list[str]] = []
+
+    def create(self, model: str, input: list[str]):
+        self.calls.append(list(input))
+        table = {"q": [1.0, 0.0], "near": [0.9, 0.1], "far": [0.0, 1.0]}
+        data = [SimpleNamespace(index=i, embedding=table[t]) for i, t in enumerate(input)]
+        return SimpleNamespace(data=list(reversed(data)))
+
+
+@pytest.fixture
+def rag(monkeypatch):
+    monkeypatch.setattr(settings, "USE_OPENAI_RERANKER", True)
+    monkeypatch.setattr(settings, "USE_OPENAI_EMBEDDINGS", True)
+    registry = ModelRegistry()
+    registry.set("embedding_cache", EmbeddingCache(":memory:"))
+    registry.set("answer_cache", AnswerCache(":memory:"))
+    registry.set("vector_store", object())
+    registry.set("openai_client", SimpleNamespace(embeddings=_FakeEmbeddings()))
+    registry.set("pii_service", object())
+    return RAGService(registry=registry)
+
+
+def test_openai_rerank_uses_single_batched_call(rag):
+    scores = rag._rerank("q", ["near", "far"])
+
+    assert rag.openai_client.embeddings.calls == [["q", "near", "far"]]
+    assert scores[0] > scores[1]
+
+
+def test_openai_rerank_reuses_stored_vectors(rag):
+    scores = rag._rerank(
+        "q", ["a", "b"], doc_vectors=[[0.0, 1.0], [1.0, 0.0]], query_vector=[1.0, 0.0]
+    )
+
+    assert rag.openai_client.embeddings.calls == []
+    assert scores[1] == pytest.approx(1.0, abs=1e-6)
+    assert scores[0] == pytest.approx(0.0, abs=1e-6)
+
+
+def test_redaction_prefers_precomputed_variants(rag):
+    calls = []
+
+    class _Pii:
+        def redact_many(self, texts, skip_entities=None):
+            calls.append((list(texts), skip_entities))
+            return [f"runtime:{t}" for t in texts]
+
+    rag.pii_service = _Pii()
+    selected = [
+        {"content": "Jane wrote this", "content_redacted": "<PERSON> wrote this"},
+        {"content": "legacy chunk"},
+    ]
+
+    assert rag._redact_selected(selected, []) == ["<PERSON> wrote this", "runtime:legacy chunk"]
+    assert calls == [(["legacy chunk"], [])]
+
+
+def test_repeated_query_is_served_from_answer_cache(rag, monkeypatch):
+    calls = []
+
+    def fake_search(query, source, emb):
+        calls.append(query)
+        return [{"content": "keep data 30 days", "source": "a.pdf", "page_number": 1, "vector": [0.9, 0.1]}]
+
+    def fake_create(**kwargs):
+        message = SimpleNamespace(content="Data is kept for 30 days.")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    monkeypatch.setattr(rag, "_search", fake_search)
+    monkeypatch.setattr(rag, "_embed", lambda text: [1.0, 0.0])
+    rag.openai_client.chat = SimpleNamespace(completions=SimpleNamespace(create=fake_create))
+    rag.pii_service = SimpleNamespace(
+        redact_many=lambda texts, skip_entities=None: list(texts),
+        redact_text=lambda text, skip_entities=None: text,
+    )
+
+    first = rag.query("What is the retention policy?", source="a.pdf")
+    assert rag.last_cache_info.hit is False
+    second = rag.query("what is the retention policy", source="a.pdf")
+
+    assert calls == ["What is the retention policy?"]
+    assert rag.last_cache_info.hit is True
+    assert rag.last_cache_info.match == "exact"
+    assert second[0] == first[0]
+    assert second[1] == first[1]
+    assert second[2] != first[2]
@@ -1,32 +1,41 @@
-import os
+import pytest
+from openai import OpenAI
+
+from src.core.config import settings
+from src.core.registry import ModelRegistry
+from src.scripts.openai_stub import StubServer, StubState
+from src.services.ingestion_service import chunk_uuid
+from src.services.local_store import LocalVectorStore
+from src.services.pii_service import PIIRedactionService
 from src.services.rag_service import RAGService
-from src.services.ingestion_service import IngestionService, LOCAL_STORE
 
 
-def test_in_memory_query_roundtrip(monkeypatch, tmp_path):
-    # Ensure in-memory mode by clearing WEAVIATE_URL
-    if "WEAVIATE_URL" in os.environ:
-        del os.environ["WEAVIATE_URL"]
+@pytest.fixture
+def stub():
+    server = StubServer(state=StubState(dimensions=10)).start()
+    yield server
+    server.shutdown()
+    server.server_close()
 
-    # Create a tiny fake PDF via plain text and ingest using pypdf-friendly bytes
-    # We simulate by writing a minimal text PDF (pypdf reads plain text pages only if valid)
-    pdf_path = tmp_path / "tiny.pdf"
-    pdf_path.write_bytes(b"%PDF-1.4\n1 0 obj<<>>endobj\ntrailer<<>>\n%%EOF")
 
-    ingester = IngestionService()
-    # LOCAL_STORE should remain empty if pypdf can't extract text; inject a synthetic chunk instead
-    LOCAL_STORE.clear()
-    LOCAL_STORE.append({
+def test_in_memory_query_roundtrip(monkeypatch, tmp_path, stub):
+    monkeypatch.setattr(settings, "ANSWER_CACHE_ENABLED", False)
+    # Query the embedded store with a synthetic chunk; the LLM is the local OpenAI stub
+    chunk = {
         "content": "Author: Test Person\nTitle: Minimal Doc\nRetention policy: keep data only as long as necessary.",
         "source": "tiny.pdf",
         "page_number": 0,
-        "vector": [0.1] * 10,  # dummy; won't be used by embed if OpenAI is on, but in-memory path compares vectors
-    })
+    }
+    store = LocalVectorStore(str(tmp_path / "store"))
+    store.write_objects({chunk_uuid(chunk): (chunk, [0.1] * 10)})
+    registry = ModelRegistry()
+    registry.set("vector_store", store)
+    registry.set("embedding_cache", None)
+    registry.set("openai_client", OpenAI(api_key="x", base_url=stub.base_url, max_retries=0))
 
-    # Query in-memory
-    rag = RAGService()
+    rag = RAGService(pii_service=PIIRedactionService(enable_presidio=False), registry=registry)
 
-    # Avoid calling remote OpenAI in unit test: monkeypatch embed & rerank
+    # Avoid local model downloads in unit test: monkeypatch embed & rerank
     def fake_embed(text: str):
         return [0.1] * 10
 
@@ -44,4 +53,4 @@ def test_in_memory_query_roundtrip(monkeypatch, tmp_path):
     assert citations and citations[0].source == "tiny.pdf"
     assert 0.0 <= groundedness <= 1.0
     assert len(trace_id) > 0
-
+    assert stub.state.chat_requests == 1
@@ -0,0 +1,37 @@
+from src.core.registry import ModelRegistry
+
+
+class _Closable:
+    def __init__(self) -> None:
+        self.closed = False
+
+    def close(self) -> None:
+        self.closed = True
+
+
+def test_component_loaded_once_and_timed():
+    registry = ModelRegistry()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return object()
+
+    first = registry._get_or_load("thing", loader)
+    second = registry._get_or_load("thing", loader)
+
+    assert first is second
+    assert len(calls) == 1
+    assert "thing" in registry.load_times
+
+
+def test_close_releases_clients():
+    registry = ModelRegistry()
+    client = _Closable()
+    registry.set("weaviate_client", client)
+
+    assert registry.weaviate_client is client
+    registry.close()
+
+    assert client.closed
+    assert not registry.is_loaded("weaviate_client")
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from src.services.reranking import load_cross_encoder, prune_candidates, score_pairs
+
+
+class _FakeCrossEncoder:
+    tokenizer = None
+
+    def __init__(self) -> None:
+        self.seen: list[list[str]] = []
+
+    def predict(self, pairs, batch_size=32, show_progress_bar=None):
+        self.seen = [d for _, d in pairs]
+        return np.array([float(len(d)) for _, d in pairs])
+
+
+def test_prune_keeps_top_scored_candidates():
+    results = [{"content": "a", "score": 0.1}, {"content": "b", "score": 0.9}, {"content": "c", "score": 0.5}]
+
+    assert [r["content"] for r in prune_candidates(results, 2)] == ["b", "c"]
+    assert prune_candidates(results, 0) == results
+
+
+def test_prune_without_scores_keeps_order():
+    results = [{"content": "a"}, {"content": "b"}, {"content": "c"}]
+
+    assert [r["content"] for r in prune_candidates(results, 2)] == ["a", "b"]
+
+
+def test_score_pairs_batches_by_length_and_restores_order():
+    model = _FakeCrossEncoder()
+    docs = ["long document", "a", "mid doc"]
+
+    scores = score_pairs(model, "q", docs, batch_size=2, max_length=16)
+
+    assert model.seen == ["a", "mid doc", "long document"]
+    assert scores.tolist() == [13.0, 1.0, 7.0]
+
+
+def test_score_pairs_empty():
+    assert score_pairs(_FakeCrossEncoder(), "q", [], batch_size=2, max_length=16).size == 0
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        load_cross_encoder("any/model", backend="tpu")
@@ -0,0 +1,45 @@
+from src.services.retrieval import RetrievalPlanner, RetrievalStrategy, normalize_source
+
+
+def test_normalize_source_uses_basename():
+    assert normalize_source(" /app/data/uploads/policy.pdf ") == "policy.pdf"
+    assert normalize_source("policy.pdf") == "policy.pdf"
+
+
+def test_primary_hit_skips_fallbacks():
+    calls = []
+
+    def fallback():
+        calls.append("fallback")
+        return [{"content": "b"}]
+
+    planner = RetrievalPlanner()
+    name, results = planner.execute([
+        RetrievalStrategy("hybrid", lambda: [{"content": "a"}]),
+        RetrievalStrategy("fetch_by_source", fallback),
+    ])
+
+    assert name == "hybrid"
+    assert results == [{"content": "a"}]
+    assert calls == []
+
+
+def test_miss_returns_first_non_empty_fallback_in_plan_order():
+    def boom():
+        raise RuntimeError("down")
+
+    planner = RetrievalPlanner()
+    name, results = planner.execute([
+        RetrievalStrategy("hybrid", lambda: []),
+        RetrievalStrategy("broken", boom),
+        RetrievalStrategy("empty", lambda: []),
+        RetrievalStrategy("fetch_by_source", lambda: [{"content": "c"}]),
+    ])
+
+    assert name == "fetch_by_source"
+    assert results == [{"content": "c"}]
+
+
+def test_total_miss():
+    planner = RetrievalPlanner()
+    assert planner.execute([RetrievalStrategy("hybrid", lambda: [])]) == (None, [])
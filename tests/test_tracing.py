@@ -0,0 +1,261 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+from openai import APIConnectionError
+
+from src.api.v1 import endpoints
+from src.core import tracing
+from src.core.concurrency import run_io
+from src.core.config import settings
+from src.core.registry import ModelRegistry
+from src.core.tracing import Trace, TraceExporter, annotate, otlp_payload, span, start_trace
+from src.main import app
+from src.services.rag_service import RAGService
+from src.services.retrieval import RetrievalPlanner, RetrievalStrategy
+
+
+@pytest.fixture
+def finished(monkeypatch):
+    traces = []
+    monkeypatch.setattr(tracing, "_listeners", [traces.append])
+    return traces
+
+
+def _names(trace):
+    return [s["name"] for s in trace.to_dicts()]
+
+
+def _by_name(trace, name):
+    return next(s for s in trace.to_dicts() if s["name"] == name)
+
+
+def test_spans_nest_and_are_noops_outside_a_trace(finished):
+    with span("orphan") as orphan:
+        annotate(ignored=True)
+    assert orphan is None
+
+    with start_trace("query", filtered=False) as trace:
+        with span("search"):
+            with span("strategy.hybrid", results=3):
+                pass
+            annotate(strategy="hybrid")
+
+    assert finished == [trace]
+    spans = {s["name"]: s for s in trace.to_dicts()}
+    assert spans["search"]["parent_id"] == spans["query"]["span_id"]
+    assert spans["strategy.hybrid"]["parent_id"] == spans["search"]["span_id"]
+    assert spans["search"]["attributes"] == {"strategy": "hybrid"}
+    assert spans["strategy.hybrid"]["attributes"] == {"results": 3}
+
+
+def test_failed_span_and_trace_record_the_error(finished):
+    with pytest.raises(ValueError):
+        with start_trace("ingest") as trace:
+            with span("extract"):
+                raise ValueError("bad page")
+
+    assert _by_name(trace, "extract")["error"] == "ValueError: bad page"
+    assert trace.root.error == "ValueError: bad page"
+
+
+def test_spans_follow_work_onto_executor_and_fallback_threads(finished):
+    planner = RetrievalPlanner()
+
+    async def run():
+        with start_trace("query") as trace:
+            with span("search"):
+                await run_io(
+                    planner.execute,
+                    [RetrievalStrategy("hybrid", lambda: []), RetrievalStrategy("fetch_by_source", lambda: [{"content": "x"}])],
+                )
+        return trace
+
+    trace = asyncio.run(run())
+
+    search = _by_name(trace, "search")
+    assert search["attributes"] == {"strategy": "fetch_by_source", "fallback": True, "results": 1}
+    for name, results in (("strategy.hybrid", 0), ("strategy.fetch_by_source", 1)):
+        strategy = _by_name(trace, name)
+        assert strategy["parent_id"] == search["span_id"]
+        assert strategy["attributes"] == {"results": results}
+
+
+def test_span_cap_counts_dropped_spans(monkeypatch, finished):
+    monkeypatch.setattr(tracing, "MAX_SPANS", 3)
+    with start_trace("ingest") as trace:
+        for i in range(5):
+            with span("write", batch=i):
+                pass
+
+    assert len(trace.spans) == 3
+    assert trace.root.attributes["dropped_spans"] == 3
+
+
+def test_exporter_appends_json_lines(tmp_path):
+    path = tmp_path / "traces" / "out.jsonl"
+    exporter = TraceExporter(jsonl_path=str(path))
+    trace = Trace("query")
+    trace.record("embed", 0.01, cached=True)
+    trace.finish()
+
+    exporter(trace)
+    exporter(trace)
+    exporter.close()
+
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert len(records) == 2
+    assert records[0]["trace_id"] == trace.trace_id
+    assert [s["name"] for s in records[0]["spans"]] == ["query", "embed"]
+    assert records[0]["spans"][1]["duration_ms"] == pytest.approx(10.0, abs=1.0)
+
+
+def test_exporter_posts_otlp_json_to_a_collector():
+    bodies = []
+
+    class _Collector(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            bodies.append((self.path, json.loads(self.rfile.read(int(self.headers["Content-Length"])))))
+            self.send_response(200)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Collector)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        exporter = TraceExporter(otlp_endpoint=f"http://127.0.0.1:{server.server_address[1]}/v1/traces", service_name="test")
+        trace = Trace("query", filtered=True)
+        with trace.activate():
+            with span("rerank", candidates=50):
+                pass
+        trace.finish()
+        exporter(trace)
+        exporter.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    path, body = bodies[0]
+    assert path == "/v1/traces"
+    assert body == otlp_payload([trace], "test")
+    resource = body["resourceSpans"][0]
+    assert resource["resource"]["attributes"] == [{"key": "service.name", "value": {"stringValue": "test"}}]
+    root, rerank = resource["scopeSpans"][0]["spans"]
+    assert root["traceId"] == rerank["traceId"] == trace.trace_id.replace("-", "")
+    assert len(root["traceId"]) == 32 and len(rerank["spanId"]) == 16
+    assert rerank["parentSpanId"] == root["spanId"]
+    assert rerank["attributes"] == [{"key": "candidates", "value": {"intValue": "50"}}]
+    assert int(rerank["endTimeUnixNano"]) >= int(rerank["startTimeUnixNano"])
+
+
+@pytest.fixture
+def rag(monkeypatch):
+    monkeypatch.setattr(settings, "ANSWER_CACHE_ENABLED", False)
+    monkeypatch.setattr(settings, "USE_OPENAI_RERANKER", False)
+    registry = ModelRegistry()
+    registry.set("embedding_cache", None)
+    hits = [{"content": "keep data 30 days", "source": "a.pdf", "page_number": 1}]
+    # The hybrid search misses, so the source fetch fallback answers
+    registry.set("vector_store", SimpleNamespace(
+        hybrid_search=lambda *args, **kwargs: [],
+        fetch_by_source=lambda source, limit: hits,
+    ))
+    registry.set("openai_client", SimpleNamespace())
+    registry.set("pii_service", SimpleNamespace(
+        redact_many=lambda texts, skip_entities=None: list(texts),
+        redact_text=lambda text, skip_entities=None: text,
+    ))
+    service = RAGService(registry=registry)
+    monkeypatch.setattr(service, "_embed", lambda text: [1.0, 0.0])
+    monkeypatch.setattr(service, "_rerank", lambda query, docs: [1.0] * len(docs))
+    return service
+
+
+def _chat(create):
+    return SimpleNamespace(completions=SimpleNamespace(create=create))
+
+
+def test_query_trace_covers_each_stage_and_the_llm_error(rag, finished):
+    def fail(**kwargs):
+        raise APIConnectionError(request=None)  # type: ignore[arg-type]
+
+    rag.openai_client.chat = _chat(fail)
+
+    with pytest.raises(APIConnectionError):
+        rag.query("How long is data kept?", source="a.pdf")
+
+    trace = rag.last_trace
+    assert finished == [trace]
+    assert _names(trace) == [
+        "query", "search", "strategy.hybrid", "strategy.fetch_by_source", "rerank", "redact_context", "llm"
+    ]
+    assert _by_name(trace, "search")["attributes"]["strategy"] == "fetch_by_source"
+    assert _by_name(trace, "rerank")["attributes"] == {"candidates": 1, "scored": 1, "backend": settings.RERANKER_BACKEND}
+    assert _by_name(trace, "llm")["error"].startswith("APIConnectionError")
+    assert _by_name(trace, "query")["error"].startswith("APIConnectionError")
+
+
+def test_query_endpoint_returns_spans_only_in_debug(rag, finished):
+    async def create(**kwargs):
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="30 days."))])
+
+    rag.registry.set("async_openai_client", SimpleNamespace(chat=_chat(create)))
+    app.dependency_overrides[endpoints.get_rag_service] = lambda: rag
+    try:
+        client = TestClient(app)
+        plain = client.post("/api/v1/query", json={"query": "retention?", "source": "a.pdf"}).json()
+        debug = client.post("/api/v1/query", json={"query": "retention?", "source": "a.pdf", "debug": True}).json()
+    finally:
+        app.dependency_overrides.clear()
+
+    assert plain["spans"] is None
+    names = [s["name"] for s in debug["spans"]]
+    assert names[0] == "query" and {"search", "rerank", "llm", "redact_answer"} <= set(names)
+    assert debug["trace_id"] == finished[-1].trace_id
+    assert all(s["duration_ms"] >= 0 for s in debug["spans"])
+
+
+def test_stream_done_event_carries_spans_in_debug(rag, finished):
+    chunk = SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content="Thirty days."))])
+    rag.openai_client.chat = _chat(lambda **kwargs: iter([chunk]))
+    rag.pii_service.redact_text = lambda text, skip_entities=None: text
+
+    events = list(rag.query_stream("retention?", source="a.pdf", debug=True))
+
+    event, done = events[-1]
+    assert event == "done" and done["trace_id"] == finished[0].trace_id
+    names = [s["name"] for s in done["spans"]]
+    assert names[:2] == ["query", "search"] and names[-1] == "llm"
+    llm = done["spans"][-1]
+    assert llm["parent_id"] == done["spans"][0]["span_id"]
+    assert llm["attributes"]["segments"] >= 1
+
+
+def test_llm_errors_surface_as_a_502_and_a_stream_error_event(rag, finished):
+    async def fail_async(**kwargs):
+        raise APIConnectionError(request=None)  # type: ignore[arg-type]
+
+    def fail(**kwargs):
+        raise APIConnectionError(request=None)  # type: ignore[arg-type]
+
+    rag.registry.set("async_openai_client", SimpleNamespace(chat=_chat(fail_async)))
+    rag.openai_client.chat = _chat(fail)
+    app.dependency_overrides[endpoints.get_rag_service] = lambda: rag
+    try:
+        client = TestClient(app)
+        response = client.post("/api/v1/query", json={"query": "retention?", "source": "a.pdf"})
+        stream = client.post("/api/v1/query/stream", json={"query": "retention?", "source": "a.pdf"}).text
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 502
+    assert "event: citations" in stream and "event: error" in stream
+    assert "event: token" not in stream and "event: done" not in stream
+    assert all(t.root.error for t in finished)